@@ -1,7 +1,8 @@
 from .config import Config
 from .algorithm import BaseAlgorithm
 from cygnus_ai.registry import (register_model, register_algorithm,
-                                set_models_for_algorithm, list_models_for_algorithm)
+                                set_models_for_algorithm, list_models_for_algorithm, list_resident_models,
+                                set_model_backend)
 from .api import create_app
 import cygnus_ai.models
 
@@ -12,7 +13,9 @@ __all__ = [
     "register_algorithm",
     "create_app",
     "set_models_for_algorithm",
-    "list_models_for_algorithm"
+    "list_models_for_algorithm",
+    "list_resident_models",
+    "set_model_backend"
 ]
 
 
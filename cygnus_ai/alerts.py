@@ -0,0 +1,258 @@
+import json
+import os
+import time
+from collections import deque
+from threading import Condition, Lock, Thread
+
+_publishers = {}
+_publishers_lock = Lock()
+
+
+class AlertPublisher:
+    """
+    Non-blocking Kafka alert delivery shared by every processor talking to
+    the same Kafka server.
+
+    `publish` only appends to a bounded in-memory buffer; a background
+    thread hands the alerts to one KafkaProducer, which batches them
+    according to `linger_ms`, `batch_size` and `compression_type`. Delivery
+    errors come back through the producer's callbacks and are retried. When
+    the broker is unreachable and the buffer fills up, alerts are appended
+    to a spill file in `spill_dir` (replayed once the broker is back) or, if
+    no spill directory is configured, the oldest alerts are shed.
+
+    Per-frame detection metadata (`publish_metadata`) goes through the same
+    producer but has a buffer of its own, `metadata_buffer_size` messages,
+    and is sent after the alerts. It is only useful while it is fresh: when
+    the buffer is full the oldest metadata is shed, and metadata that fails
+    to deliver is dropped rather than retried or spilled, so a busy stream
+    can never crowd alerts out.
+    """
+
+    def __init__(self, server: str, linger_ms: int = 50, batch_size: int = 16384, compression_type: str = None,
+                 buffer_size: int = 1000, spill_dir: str = None, retry_backoff_s: float = 1.0, producer=None,
+                 metadata_buffer_size: int = 100):
+        self.server = server
+        self.producer_options = {
+            "linger_ms": linger_ms,
+            "batch_size": batch_size,
+            "compression_type": compression_type,
+            # Never let the sender block for long on a missing broker
+            "max_block_ms": 5000,
+        }
+        self.buffer_size = buffer_size
+        self.metadata_buffer_size = metadata_buffer_size
+        self.spill_path = None
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+            self.spill_path = os.path.join(spill_dir, f"alerts-{_safe_name(server)}.jsonl")
+        self.retry_backoff_s = retry_backoff_s
+        self.refcount = 0
+        # A ready producer may be passed in, e.g. a local stand-in for benchmarks
+        self.producer = producer
+
+        self.published = 0
+        self.delivered = 0
+        self.errors = 0
+        self.shed = 0
+        self.spilled = 0
+        self.replayed = 0
+        self.metadata_published = 0
+        self.metadata_shed = 0
+        self._healthy = True
+        self._last_error_at = 0.0
+
+        self._buffer = deque()
+        self._metadata = deque()
+        self._cond = Condition()
+        self._spill_lock = Lock()
+        self._stopped = False
+        self._thread = Thread(target=self._run, name=f"alerts-{server}", daemon=True)
+        self._thread.start()
+
+    def publish(self, topic: str, alert: dict):
+        """Queue one alert for delivery. Never blocks on Kafka."""
+        self._enqueue((topic, json.dumps(alert).encode("utf-8")))
+        self.published += 1
+
+    def publish_metadata(self, topic: str, message: dict):
+        """Queue one detection metadata message. Never blocks, and never delays or displaces alerts."""
+        item = (topic, json.dumps(message).encode("utf-8"))
+        with self._cond:
+            if len(self._metadata) >= self.metadata_buffer_size:
+                self._metadata.popleft()
+                self.metadata_shed += 1
+            self._metadata.append(item)
+            self._cond.notify()
+        self.metadata_published += 1
+
+    def _enqueue(self, item, front: bool = False):
+        with self._cond:
+            if len(self._buffer) >= self.buffer_size:
+                overflow = self._buffer.pop() if front else self._buffer.popleft()
+                if self.spill_path:
+                    self._spill(overflow)
+                else:
+                    self.shed += 1
+            if front:
+                self._buffer.appendleft(item)
+            else:
+                self._buffer.append(item)
+            self._cond.notify()
+
+    def _spill(self, item):
+        topic, value = item
+        with self._spill_lock:
+            with open(self.spill_path, "a") as spill:
+                spill.write(json.dumps({"topic": topic, "value": value.decode("utf-8")}) + "\n")
+        self.spilled += 1
+
+    def _replay_spill(self):
+        if not self._has_spill():
+            return
+        replay_path = self.spill_path + ".replay"
+        with self._spill_lock:
+            os.replace(self.spill_path, replay_path)
+        with open(replay_path) as spill:
+            entries = [json.loads(line) for line in spill if line.strip()]
+        os.remove(replay_path)
+        for index, entry in enumerate(entries):
+            try:
+                self._send((entry["topic"], entry["value"].encode("utf-8")))
+            except Exception:
+                # Still unreachable: put the rest back on disk
+                for remaining in entries[index:]:
+                    self._spill((remaining["topic"], remaining["value"].encode("utf-8")))
+                    self.spilled -= 1
+                raise
+            self.replayed += 1
+
+    def _has_spill(self) -> bool:
+        return bool(self.spill_path) and os.path.exists(self.spill_path)
+
+    def _connect(self):
+        from kafka import KafkaProducer
+        self.producer = KafkaProducer(bootstrap_servers=[self.server], **self.producer_options)
+
+    def _send(self, item, metadata: bool = False):
+        topic, value = item
+        future = self.producer.send(topic, value)
+        future.add_callback(self._on_delivered)
+        future.add_errback(self._on_error, item, metadata)
+
+    def _on_delivered(self, metadata):
+        self.delivered += 1
+        self._healthy = True
+
+    def _on_error(self, item, metadata, exception):
+        if self._healthy:
+            print(f"Failed to deliver alert to Kafka ({self.server}): {exception}")
+        self.errors += 1
+        self._healthy = False
+        self._last_error_at = time.monotonic()
+        if metadata:
+            self.metadata_shed += 1
+        elif not self._stopped:
+            self._enqueue(item, front=True)
+
+    def _run(self):
+        # Connect right away so the first alert does not pay for it
+        try:
+            if self.producer is None:
+                self._connect()
+        except Exception as e:
+            print(f"Kafka alert producer unavailable ({self.server}): {e}")
+            self._healthy = False
+            self._last_error_at = time.monotonic()
+        while not self._stopped:
+            with self._cond:
+                while not self._buffer and not self._metadata and not self._stopped and not self._has_spill():
+                    self._cond.wait(1.0)
+                if self._stopped:
+                    break
+            # Back off while the broker is failing instead of spinning on retries
+            if not self._healthy and time.monotonic() - self._last_error_at < self.retry_backoff_s:
+                time.sleep(self.retry_backoff_s)
+            try:
+                if self.producer is None:
+                    self._connect()
+                self._replay_spill()
+                with self._cond:
+                    batch = list(self._buffer)
+                    self._buffer.clear()
+                    metadata = list(self._metadata)
+                    self._metadata.clear()
+                for index, item in enumerate(batch):
+                    try:
+                        self._send(item)
+                    except Exception:
+                        for pending in reversed(batch[index:]):
+                            self._enqueue(pending, front=True)
+                        self.metadata_shed += len(metadata)
+                        raise
+                for index, item in enumerate(metadata):
+                    try:
+                        self._send(item, metadata=True)
+                    except Exception:
+                        self.metadata_shed += len(metadata) - index
+                        raise
+            except Exception as e:
+                print(f"Kafka alert producer unavailable ({self.server}): {e}")
+                self._healthy = False
+                self._last_error_at = time.monotonic()
+
+    def close(self, timeout: float = 5):
+        self._stopped = True
+        with self._cond:
+            self._cond.notify_all()
+        self._thread.join(timeout=timeout)
+        if self.producer is not None:
+            try:
+                self.producer.flush(timeout=timeout)
+                self.producer.close(timeout=timeout)
+            except Exception as e:
+                print(f"Failed to close Kafka alert producer ({self.server}): {e}")
+        # Keep undelivered alerts for the next run if we can
+        if self.spill_path:
+            while self._buffer:
+                self._spill(self._buffer.popleft())
+
+    def stats(self) -> dict:
+        return {
+            "server": self.server,
+            "buffered": len(self._buffer),
+            "published": self.published,
+            "delivered": self.delivered,
+            "errors": self.errors,
+            "shed": self.shed,
+            "spilled": self.spilled,
+            "replayed": self.replayed,
+            "metadata_buffered": len(self._metadata),
+            "metadata_published": self.metadata_published,
+            "metadata_shed": self.metadata_shed,
+            "healthy": self._healthy,
+        }
+
+
+def _safe_name(value: str) -> str:
+    return "".join(c if c.isalnum() else "_" for c in value)
+
+
+def get_alert_publisher(server: str, **options) -> AlertPublisher:
+    """Return the publisher shared by all processors using `server`, creating it on first use."""
+    with _publishers_lock:
+        publisher = _publishers.get(server)
+        if publisher is None:
+            publisher = AlertPublisher(server, **options)
+            _publishers[server] = publisher
+        publisher.refcount += 1
+        return publisher
+
+
+def release_alert_publisher(publisher: AlertPublisher):
+    with _publishers_lock:
+        publisher.refcount -= 1
+        if publisher.refcount > 0:
+            return
+        _publishers.pop(publisher.server, None)
+    publisher.close()
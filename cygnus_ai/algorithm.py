@@ -1,13 +1,17 @@
 import time
 from abc import ABC, abstractmethod
-from threading import Thread
 from cygnus_ai.registry import list_models_for_algorithm
+from cygnus_ai.tracking import BoxTracker
+from cygnus_ai.motion import MotionGate
+from cygnus_ai.tiling import Tiler
 
 
 class BaseAlgorithm(ABC):
+    # Whether `detect` honours `self.tiler` (see set_tiling)
+    supports_tiling = False
 
     def __init__(self, input_uuid: str, algorithm_name:str, model_name:str=None, model_path: str=None,
-                 capture_callback=lambda a: None, alert_callback=lambda a: None):
+                 capture_callback=lambda: None, alert_callback=lambda a: None):
         self.input_uuid=input_uuid
         self.name = algorithm_name
         self.model_name = model_name
@@ -15,6 +19,33 @@ class BaseAlgorithm(ABC):
         self.last_alert = None
         self.capture_callback = capture_callback
         self.alert_callback = alert_callback
+        # Seconds before a label can alert again; see set_alert_cooldown
+        self.alert_cooldown_s = 15.0
+        self.label_cooldowns = {}
+        self._last_alert_by_label = {}
+        # Seconds-returning time source of the cooldowns; see set_clock
+        self.clock = time.time
+
+        # Detection stride: run `detect` every N frames, track boxes in between
+        self.detection_stride = 1
+        self.detector_fps = None
+        self.input_fps = None
+        self.frame_index = 0
+        self.detector_calls = 0
+        self.tracker = BoxTracker()
+        # Optional MotionGate: skip the detector while the scene does not change
+        self.motion_gate = None
+        self._detected = None
+        # Optional Tiler: detect on overlapping full-resolution tiles instead of the downscaled frame
+        self.tiler = None
+        self._last_detection_index = None
+        self._frame_shape = None
+        # StreamMetrics of the processor running this algorithm, if any
+        self.metrics = None
+        # Detections drawn on the last frame (detected or tracked), for batch output and metadata
+        self.last_detections = None
+        # Off when nobody watches the video output: detections are still made, just not drawn
+        self.annotate_output = True
 
         model_list=list_models_for_algorithm(algorithm_name)
         if model_list and not self.model_path:
@@ -25,12 +56,186 @@ class BaseAlgorithm(ABC):
     def check_and_trigger_alert(self, alerts: list):
         if not alerts:
             return
-        current_time = time.time()
-        if self.last_alert is None or current_time - self.last_alert >= 15:
-            self.last_alert = current_time
-            Thread(target=self.capture_callback).start()
-            self.alert_callback(alerts)
+        current_time = self.clock()
+        due = []
+        for alert in alerts:
+            label = alert.get("label")
+            last = self._last_alert_by_label.get(label)
+            if last is None or current_time - last >= self.label_cooldowns.get(label, self.alert_cooldown_s):
+                due.append(alert)
+        if len(due) < len(alerts):
+            self.count("alerts_suppressed", len(alerts) - len(due))
+        if not due:
+            return
+        for alert in due:
+            self._last_alert_by_label[alert.get("label")] = current_time
+        self.last_alert = current_time
+        # Only schedules the clip; cutting and uploading it happen off the video thread
+        self.capture_callback()
+        self.alert_callback(due)
+
+    def set_alert_cooldown(self, seconds: float = 15, per_label: dict = None):
+        """
+        Minimum time between two alerts of the same label, `seconds` unless
+        `per_label` (label -> seconds) says otherwise. Labels cool down
+        independently: smoke can alert while fire is still cooling down.
+        """
+        cooldowns = dict(per_label or {})
+        if float(seconds) < 0 or any(float(value) < 0 for value in cooldowns.values()):
+            raise ValueError("Alert cooldowns cannot be negative.")
+        self.alert_cooldown_s = float(seconds)
+        self.label_cooldowns = {label: float(value) for label, value in cooldowns.items()}
+
+    def set_clock(self, clock=time.time):
+        """
+        Time source for alert cooldowns, a callable returning seconds. Offline
+        runs pass the position in the video, so which alerts get through does
+        not depend on how fast the machine processes it.
+        """
+        self.clock = clock
+
+
+    def set_detection_stride(self, stride: int = 1, detector_fps: float = None):
+        """
+        Run the detector only every `stride` frames, or as close to
+        `detector_fps` detections per second as the input frame rate allows.
+        Only applies to algorithms that implement `detect` and `annotate`.
+        """
+        if int(stride) < 1:
+            raise ValueError("Detection stride must be at least 1.")
+        if detector_fps is not None and float(detector_fps) <= 0:
+            raise ValueError("Detector fps must be positive.")
+        self.detection_stride = int(stride)
+        self.detector_fps = float(detector_fps) if detector_fps is not None else None
+
+    def set_motion_gate(self, enabled: bool = True, threshold: float = 0.01, max_stale_s: float = 2.0,
+                        pixel_threshold: int = 25):
+        """
+        Check whether the scene changed before running the detector and reuse
+        the last detections if it did not, refreshing at least every
+        `max_stale_s` seconds. Only applies to algorithms that implement
+        `detect` and `annotate`.
+        """
+        self.motion_gate = MotionGate(threshold, pixel_threshold, max_stale_s) if enabled else None
+
+    def set_tiling(self, enabled: bool = True, tile_size: int = 1024, overlap: float = 0.2, full_frame: bool = True,
+                   focus: bool = False, full_scan_every: int = 10):
+        """
+        Run the detector on overlapping `tile_size` tiles of the full-resolution
+        frame so small objects are not lost to downscaling; see `Tiler`.
+        """
+        if enabled and not self.supports_tiling:
+            raise ValueError(f"'{self.name}' does not support tiled inference.")
+        self.tiler = Tiler(tile_size, overlap, full_frame, focus, full_scan_every) if enabled else None
+
+    def set_input_fps(self, fps: float):
+        self.input_fps = fps
+
+    def effective_stride(self) -> int:
+        if self.detector_fps and self.input_fps:
+            return max(1, round(self.input_fps / self.detector_fps))
+        return self.detection_stride
+
+    def supports_detection(self) -> bool:
+        return type(self).detect is not BaseAlgorithm.detect
 
+    def handle_frame(self, frame, inference_frame=None, letterbox=None):
+        """
+        Entry point used by the stream processor. Algorithms that split their
+        work into `detect` and `annotate` get the detection stride; the boxes
+        of the last detector run are propagated by the tracker on the frames
+        in between. Everything else goes straight to `process_frame`.
+
+        When the decoder also provides a small letterboxed `inference_frame`,
+        detection runs on it and the boxes are mapped back onto `frame` with
+        `letterbox`.
+        """
+        if not self.supports_detection():
+            return self.process_frame(frame)
+
+        detections = self.update_detections(frame, inference_frame, letterbox)
+        if not self.annotate_output:
+            return frame
+        started = time.perf_counter()
+        frame = self.annotate(frame, detections)
+        self.observe("annotate", time.perf_counter() - started)
+        return frame
+
+    def update_detections(self, frame, inference_frame=None, letterbox=None):
+        """
+        Detections for `frame`, from a detector run or from the tracker, as
+        decided by the detection stride and motion gate; see `handle_frame`.
+        Does not draw on the frame.
+        """
+        self.frame_index += 1
+        if frame.shape != self._frame_shape:
+            # Boxes tracked at another resolution are meaningless now
+            self._frame_shape = frame.shape
+            self.tracker.reset()
+            self._last_detection_index = None
+            if self.motion_gate is not None:
+                self.motion_gate.reset()
+        if (self._last_detection_index is None
+                or self.frame_index - self._last_detection_index >= self.effective_stride()):
+            gate_frame = inference_frame if inference_frame is not None else frame
+            if self.motion_gate is None or self.motion_gate.should_detect(gate_frame, self.frame_index,
+                                                                          self.input_fps):
+                # Tiles are cut from the full-resolution frame, never from the letterboxed one
+                if inference_frame is not None and self.tiler is None:
+                    detections = letterbox.rescale(self.detect(inference_frame))
+                else:
+                    detections = self.detect(frame)
+                self.detector_calls += 1
+                self.count("detector_runs")
+                self._detected = detections
+            else:
+                # Unchanged scene: the last detections still hold, and stay put
+                detections = self._detected
+                self.count("detector_skipped")
+            self._last_detection_index = self.frame_index
+            self.tracker.update(detections, self.frame_index)
+        else:
+            detections = self.tracker.predict(self.frame_index, frame.shape)
+        self.last_detections = detections
+        return detections
+
+    def detection_records(self, detections=None) -> list:
+        """`detections` (default: the last frame's) as JSON-ready dicts with label, confidence and box."""
+        detections = self.last_detections if detections is None else detections
+        if detections is None or not len(detections):
+            return []
+        mapping = getattr(self, "classes_mapping", {})
+        class_ids = detections.class_id if detections.class_id is not None else [None] * len(detections)
+        confidences = detections.confidence if detections.confidence is not None else [None] * len(detections)
+        records = []
+        for box, class_id, confidence in zip(detections.xyxy, class_ids, confidences):
+            records.append({
+                "label": mapping.get(int(class_id), int(class_id)) if class_id is not None else None,
+                "confidence": round(float(confidence), 3) if confidence is not None else None,
+                "box": [round(float(value), 1) for value in box],
+            })
+        return records
+
+    def observe(self, stage: str, seconds: float):
+        """Record the duration of one stage (e.g. "inference", "nms") in the stream's metrics."""
+        if self.metrics is not None:
+            self.metrics.observe(stage, seconds)
+
+    def count(self, name: str, amount: int = 1):
+        """Increment one of the stream's counters (e.g. "detector_runs")."""
+        if self.metrics is not None:
+            self.metrics.inc(name, amount)
+
+    def detect(self, frame):
+        """
+        Optional: run the detector on a BGR numpy frame, trigger alerts and
+        return an `sv.Detections`.
+        """
+        raise NotImplementedError
+
+    def annotate(self, frame, detections):
+        """Optional: draw `detections` on the frame and return it."""
+        return frame
 
     @abstractmethod
     def process_frame(self, frame):
@@ -42,4 +247,13 @@ class BaseAlgorithm(ABC):
         """
         Optional hook: load your model (if any) into `self.model` or
         other attributes. Called once during __init__.
-        """
\ No newline at end of file
+        """
+        pass
+
+
+    def teardown(self):
+        """
+        Optional hook: release whatever `setup` acquired. Called once when
+        the stream stops.
+        """
+        pass
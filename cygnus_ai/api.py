@@ -1,54 +1,196 @@
 import uuid
+from functools import partial
 from threading import Thread
-from flask import Flask, request, jsonify
-from .processor import CygnusStreamProcessor
-from cygnus_ai.registry import get_algorithm, get_model_path_for_algorithm
+from flask import Flask, Response, request, jsonify
+from .processor import CygnusStreamProcessor, ANNOTATED
+from .pipeline import DROP_OLDEST
+from .inference import set_batching_defaults
+from cygnus_ai.registry import (get_algorithm, get_model_path_for_algorithm, model_pool, list_resident_models,
+                                set_model_backend)
+from .supervisor import StreamSupervisor, StreamStartError
+from .metrics import collect, render
+from .ingest import list_shared_ingests
+from .warm_pool import WarmPool, ModelPreloader
+from .group import AlgorithmGroup
+
+THREAD_MODE = "thread"
+PROCESS_MODE = "process"
+
+ALERT_DELIVERY_OPTIONS = ("linger_ms", "batch_size", "compression_type", "buffer_size", "spill_dir",
+                          "metadata_buffer_size")
+UPLOAD_OPTIONS = {"upload_workers": "workers", "upload_queue_size": "queue_size", "upload_retries": "retries",
+                  "upload_per_stream": "per_stream_limit"}
+
+
+def configure_algorithm(algorithm, data: dict):
+    """Per-stream detector settings from a /start request."""
+    algorithm.set_detection_stride(data.get("detectionStride", 1), data.get("detectorFps"))
+    algorithm.set_alert_cooldown(data.get("alertCooldownS", 15), data.get("labelCooldowns"))
+    motion_gate = data.get("motionGate")
+    if motion_gate:
+        options = motion_gate if isinstance(motion_gate, dict) else {}
+        algorithm.set_motion_gate(threshold=options.get("threshold", 0.01),
+                                  max_stale_s=options.get("maxStaleS", 2.0),
+                                  pixel_threshold=options.get("pixelThreshold", 25))
+    tiling = data.get("tiling")
+    if tiling:
+        options = tiling if isinstance(tiling, dict) else {}
+        algorithm.set_tiling(tile_size=options.get("tileSize", 1024), overlap=options.get("overlap", 0.2),
+                             full_frame=options.get("fullFrame", True), focus=options.get("focus", False),
+                             full_scan_every=options.get("fullScanEvery", 10))
+
+
+def algorithm_specs(data: dict) -> list:
+    """
+    The algorithms of a /start request: `algorithm` and `model`, or a list
+    under `algorithms` of names or of objects with `algorithm`, `model` and
+    any detector setting that overrides the request's own.
+    """
+    algorithms = data.get("algorithms")
+    if algorithms is None:
+        return [{"algorithm": data.get("algorithm"), "model": data.get("model")}]
+    if not isinstance(algorithms, list) or not algorithms:
+        raise ValueError("'algorithms' must be a non-empty list.")
+    return [spec if isinstance(spec, dict) else {"algorithm": spec} for spec in algorithms]
+
+
+def build_processor(config, data: dict, warm_pool: WarmPool = None) -> CygnusStreamProcessor:
+    """Processor and algorithm(s) for one /start request, ready to run. Raises ValueError/TypeError on bad input."""
+    specs = algorithm_specs(data)
+    input_uuid= data.get("inputUuid")
+    output_uuid= data.get("outputUuid")
+    queue_size = data.get("queueSize", 2)
+    overflow_policy = data.get("overflowPolicy", DROP_OLDEST)
+
+    processor = None
+    if warm_pool is not None and len(specs) == 1:
+        processor = warm_pool.take(specs[0]["algorithm"], specs[0].get("model") or None)
+    if processor is not None:
+        # Model already loaded and clients connected; only the per-stream settings are left
+        try:
+            processor.assign_stream(input_uuid, output_uuid)
+            processor.configure_pipeline(queue_size, overflow_policy, data.get("inferenceSize"))
+            processor.configure_output(data.get("videoOutput", ANNOTATED), bool(data.get("metadata", False)))
+            configure_algorithm(processor.algorithm, {**data, **specs[0]})
+        except (ValueError, TypeError):
+            processor.discard()
+            raise
+        return processor
+
+    kafka_config = config.get_kafka() or {}
+    minio_config = config.get_minio() or {}
+    clips_config = config.get_clips() or {}
+
+    processor=CygnusStreamProcessor(
+        input_uuid=input_uuid,
+        output_uuid=output_uuid,
+        kafka_server=kafka_config.get("server"),
+        kafka_alert_topic=kafka_config.get("alert_topic"),
+        kafka_telemetry_topic=kafka_config.get("telemetry_topic"),
+        kafka_metadata_topic=kafka_config.get("metadata_topic"),
+        minio_server=minio_config.get("server"),
+        minio_key=minio_config.get("key"),
+        minio_secret=minio_config.get("secret"),
+        minio_bucket=minio_config.get("bucket"),
+        minio_folder=minio_config.get("folder"),
+        media_server=config.get_media_server(),
+        queue_size=queue_size,
+        overflow_policy=overflow_policy,
+        inference_size=data.get("inferenceSize"),
+        kafka_options={key: kafka_config[key] for key in ALERT_DELIVERY_OPTIONS if key in kafka_config},
+        clip_pre_roll_s=clips_config.get("pre_roll_s", 5),
+        clip_post_roll_s=clips_config.get("post_roll_s", 10),
+        clip_max_memory_mb=clips_config.get("max_memory_mb", 32),
+        upload_options={option: minio_config[key] for key, option in UPLOAD_OPTIONS.items() if key in minio_config},
+        video_output=data.get("videoOutput", ANNOTATED),
+        publish_metadata=bool(data.get("metadata", False)),
+    )
+
+    try:
+        algorithms = []
+        for spec in specs:
+            algorithm_name = spec.get("algorithm")
+            model_name = spec.get("model") or None
+            model_path=None
+            if model_name:
+                model_path=get_model_path_for_algorithm(algorithm_name, model_name)
+            algorithm=get_algorithm(algorithm_name,input_uuid, algorithm_name, model_name, model_path,
+                                    processor.capture_stream, processor.send_alert)
+            configure_algorithm(algorithm, {**data, **spec})
+            algorithms.append(algorithm)
+        if len(algorithms) > 1:
+            # One decode and one encode for all of them
+            algorithm = AlgorithmGroup(input_uuid, algorithms, processor.capture_stream, processor.send_alert)
+    except (ValueError, TypeError):
+        # Give back the shared Kafka/MinIO clients the processor took
+        processor.stop_app()
+        raise
+
+    processor.set_algorithm(algorithm)
+    return processor
+
+
+def configure_process(config):
+    """Process-wide settings from `config`: inference batching, the model pool and model backends."""
+    inference_config = config.get_inference()
+    if inference_config:
+        set_batching_defaults(**inference_config)
+    model_pool_config = config.get_model_pool()
+    if model_pool_config:
+        model_pool.configure(**model_pool_config)
+    for model, backend in config.get_model_backends().items():
+        set_model_backend(model, **backend)
+
+
+def build_worker_processor(config, data: dict) -> CygnusStreamProcessor:
+    """`build_processor` inside a worker process, which does not inherit the API process's settings."""
+    configure_process(config)
+    return build_processor(config, data)
+
 
 def create_app(config):
     app = Flask(__name__)
+    configure_process(config)
     # Dictionary to hold thread references
     threads = {}
+    # Process mode: every stream runs in its own supervised worker process
+    supervisor = None
+    workers_config = config.get_workers()
+    if workers_config.get("mode") == PROCESS_MODE:
+        options = {key: value for key, value in workers_config.items() if key != "mode"}
+        supervisor = StreamSupervisor(partial(build_worker_processor, config), **options)
+
+    # Warm pool: prepared processors in thread mode; in process mode, models loaded (and exported) before workers start
+    warm_pool = None
+    preloader = None
+    warm_pool_config = config.get_warm_pool()
+    if warm_pool_config.get("algorithms"):
+        if supervisor is not None:
+            preloader = ModelPreloader(warm_pool_config["algorithms"], get_model_path_for_algorithm, model_pool)
+        else:
+            warm_pool = WarmPool(lambda algorithm, model: build_processor(config, {"algorithm": algorithm, "model": model}),
+                                 warm_pool_config["algorithms"], warm_pool_config.get("size", 1))
 
     @app.route("/start", methods=["POST"])
     def start_processing_all():
         data = request.json
-        algorithm_name = data.get("algorithm")
-        model_name = data.get("model") or None
-        input_uuid= data.get("inputUuid")
-        output_uuid= data.get("outputUuid")
-
-        kafka_config = config.get_kafka() or {}
-        minio_config = config.get_minio() or {}
-
-        processor=CygnusStreamProcessor(
-            input_uuid=input_uuid,
-            output_uuid=output_uuid,
-            kafka_server=kafka_config.get("server"),
-            kafka_alert_topic=kafka_config.get("alert_topic"),
-            kafka_telemetry_topic=kafka_config.get("telemetry_topic"),
-            minio_server=minio_config.get("server"),
-            minio_key=minio_config.get("key"),
-            minio_secret=minio_config.get("secret"),
-            minio_bucket=minio_config.get("bucket"),
-            minio_folder=minio_config.get("folder"),
-            media_server=config.get_media_server()
-        )
+        if supervisor is not None:
+            if preloader is not None:
+                # Workers load the exports the preloader makes; never have them race it
+                preloader.ready.wait()
+            try:
+                thread_id = supervisor.start(data)
+            except StreamStartError as e:
+                return jsonify({"status": "error", "message": str(e)}), 400 if e.invalid else 500
+            return jsonify({"status": "success", "message": "Processing started", "thread_id": thread_id}), 200
 
         try:
-            model_path=None
-            if model_name:
-                model_path=get_model_path_for_algorithm(algorithm_name, model_name)
-            algorithm=get_algorithm(algorithm_name,input_uuid, algorithm_name, model_name, model_path,
-                                    processor.capture_stream, processor.send_alert)
-        except ValueError as e:
+            processor = build_processor(config, data, warm_pool)
+        except (ValueError, TypeError) as e:
             return jsonify({"status": "error", "message": str(e)}), 400
 
-        processor.set_algorithm(algorithm)
-
         processor.video_thread = Thread(target=processor.process_video)
         processor.video_thread.start()
-        processor.telemetry_thread = Thread(target=processor.consume_telemetry)
-        processor.telemetry_thread.start()
 
         thread_id = str(uuid.uuid4())  # Generate a unique thread ID
 
@@ -63,6 +205,8 @@ def create_app(config):
         data = request.json
         thread_id = data.get("threadId")
         print("Thread to stop",threads,thread_id)
+        if supervisor is not None and supervisor.stop(thread_id):
+            return jsonify({"status": "success", "message": "Processing stopped"}), 200
         if thread_id in threads:
             processor = threads.get(thread_id)
             processor.stop_app()
@@ -78,6 +222,8 @@ def create_app(config):
 
     @app.route("/stop_all", methods=["POST"])
     def stop_processing_all():
+        if supervisor is not None:
+            supervisor.stop_all()
         if threads:
             for thread_id in threads:
                 processor = threads.get(thread_id)
@@ -85,6 +231,32 @@ def create_app(config):
             threads.clear()
         return jsonify({"status": "success", "message": "Processing stopped"}), 200
 
+    @app.route("/status", methods=["GET"])
+    def status():
+        warm = warm_pool or preloader
+        ready = warm is None or warm.ready.is_set()
+        body = {
+            "status": "ready" if ready else "warming",
+            "mode": PROCESS_MODE if supervisor is not None else THREAD_MODE,
+            "streams": len(supervisor.stats()) if supervisor is not None else len(threads),
+            "resident_models": list_resident_models(),
+            "ingests": list_shared_ingests(),
+        }
+        if warm is not None:
+            body["warm_pool"] = warm.stats()
+        if supervisor is not None:
+            body["workers"] = supervisor.stats()
+        # 503 until warm-up finished, for readiness probes
+        return jsonify(body), 200 if ready else 503
+
+    @app.route("/metrics", methods=["GET"])
+    def metrics():
+        # Prometheus text format: per-stream stage latencies, frame counters and shared services
+        families = collect()
+        if supervisor is not None:
+            families.extend(supervisor.metric_families())
+        return Response(render(families), mimetype="text/plain; version=0.0.4")
+
     return app
 
 
@@ -0,0 +1,107 @@
+"""
+CPU inference backends for the YOLO models.
+
+`torch` runs the registered `.pt` weights through ultralytics as before.
+`onnxruntime` and `openvino` run a copy of the weights exported for that
+runtime, optionally quantized to int8. Exports are made once and cached on
+disk (`CYGNUS_MODEL_CACHE`, default `~/.cache/cygnus_ai/models`), keyed by
+the source file and the export options, so later loads and restarts only
+pay for reading them.
+ultralytics loads the exported copy as well, so algorithms get the same
+result objects whatever the backend.
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+from threading import Lock
+
+BACKENDS = ("torch", "onnxruntime", "openvino")
+
+_export_lock = Lock()
+
+
+def cache_dir() -> str:
+    return os.environ.get("CYGNUS_MODEL_CACHE") or os.path.join(os.path.expanduser("~"), ".cache", "cygnus_ai", "models")
+
+
+def _file_key(path: str) -> str:
+    stat = os.stat(path)
+    return f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def _cache_name(path: str, backend: str, int8: bool, imgsz: int, calibration_data: str = None) -> str:
+    key = _file_key(path)
+    if _calibrated(backend, int8, calibration_data):
+        # A dataset yaml, or a name ultralytics resolves itself
+        key += ":" + (_file_key(calibration_data) if os.path.isfile(calibration_data) else calibration_data)
+    digest = hashlib.sha1(key.encode()).hexdigest()[:12]
+    stem = os.path.splitext(os.path.basename(path))[0]
+    name = f"{stem}-{digest}-{backend}{'-int8' if int8 else ''}-{imgsz}"
+    if backend == "onnxruntime":
+        return name + ".onnx"
+    # ultralytics recognises an OpenVINO model directory by this suffix
+    return name + "_openvino_model"
+
+
+def _calibrated(backend: str, int8: bool, calibration_data: str) -> bool:
+    """Whether `calibration_data` goes into the export; onnxruntime quantizes without calibration."""
+    return backend == "openvino" and int8 and bool(calibration_data)
+
+
+def _export(source: str, backend: str, int8: bool, imgsz: int, calibration_data: str, work_dir: str) -> str:
+    from ultralytics import YOLO
+    # Export from a copy: ultralytics writes next to the weights, which may be read-only package data
+    weights = os.path.join(work_dir, os.path.basename(source))
+    shutil.copyfile(source, weights)
+    model = YOLO(weights)
+    if backend == "onnxruntime":
+        # Dynamic axes so the inference server can run batches of any size
+        exported = model.export(format="onnx", imgsz=imgsz, dynamic=True, simplify=True)
+        if not int8:
+            return exported
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantized = os.path.join(work_dir, "int8.onnx")
+        quantize_dynamic(exported, quantized, weight_type=QuantType.QUInt8)
+        return quantized
+    options = {"int8": int8}
+    if _calibrated(backend, int8, calibration_data):
+        options["data"] = calibration_data
+    return model.export(format="openvino", imgsz=imgsz, dynamic=True, **options)
+
+
+def export_model(path: str, backend: str, int8: bool = False, imgsz: int = 640, calibration_data: str = None) -> str:
+    """
+    Path of `path` converted for `backend`, exporting it on first use. int8
+    uses dynamic quantization for onnxruntime and NNCF post-training
+    quantization for openvino, calibrated on `calibration_data` (an
+    ultralytics dataset yaml; ultralytics' default sample set if omitted).
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}'. Available backends: {list(BACKENDS)}")
+    if backend == "torch":
+        return path
+    cache = cache_dir()
+    target = os.path.join(cache, _cache_name(path, backend, int8, imgsz, calibration_data))
+    with _export_lock:
+        if os.path.exists(target):
+            return target
+        os.makedirs(cache, exist_ok=True)
+        work_dir = tempfile.mkdtemp(dir=cache)
+        try:
+            print(f"Exporting {path} for {backend}{' (int8)' if int8 else ''}, this is done once")
+            exported = _export(path, backend, int8, imgsz, calibration_data, work_dir)
+            # Another process exporting the same model may have finished first
+            if not os.path.exists(target):
+                os.replace(exported, target)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    return target
+
+
+def load_model(path: str, backend: str = "torch", int8: bool = False, imgsz: int = 640, calibration_data: str = None):
+    """An ultralytics model for `path` running on `backend`."""
+    from ultralytics import YOLO
+    if backend == "torch":
+        return YOLO(path)
+    return YOLO(export_model(path, backend, int8, imgsz, calibration_data), task="detect")
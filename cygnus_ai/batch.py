@@ -0,0 +1,296 @@
+"""
+Offline batch processing of recorded video at full speed.
+
+    python -m cygnus_ai.batch YoloFire --model YoloFireNano /data/flights --output-dir /data/annotated
+    python -m cygnus_ai.batch YoloHuman --model YoloHumanNano long.mp4 --output-dir out --segment 120 --workers 16
+
+Every input file (or, with `--segment`, every time range of it) becomes one
+shard. Shards are decoded by ffmpeg without real-time throttling and run
+through the algorithm in parallel worker processes. For each input the job
+writes `<name>.annotated.mp4` and `<name>.detections.jsonl` with one line
+per frame that has detections and one per alert.
+"""
+import argparse
+import importlib
+import json
+import os
+import subprocess
+import sys
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+VIDEO_EXTENSIONS = (".mp4", ".mkv", ".mov", ".avi", ".ts", ".flv", ".webm", ".m4v")
+
+
+class Shard:
+    __slots__ = ("source", "index", "start_s", "duration_s", "fps", "width", "height")
+
+    def __init__(self, source: str, index: int, start_s: float, duration_s: float, fps: float, width: int,
+                 height: int):
+        self.source = source
+        self.index = index
+        self.start_s = start_s
+        self.duration_s = duration_s
+        self.fps = fps
+        self.width = width
+        self.height = height
+
+
+def find_videos(paths) -> list:
+    """Video files among `paths`, expanding directories recursively."""
+    videos = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                videos.extend(os.path.join(root, name) for name in sorted(files)
+                              if name.lower().endswith(VIDEO_EXTENSIONS))
+        else:
+            videos.append(path)
+    return videos
+
+
+def probe(path: str):
+    """(width, height, fps, duration_s) of a local video file."""
+    import cv2
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise ValueError(f"Cannot open video file {path}")
+    try:
+        width = int(capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        fps = capture.get(cv2.CAP_PROP_FPS) or 25.0
+        frames = capture.get(cv2.CAP_PROP_FRAME_COUNT)
+    finally:
+        capture.release()
+    return width, height, fps, frames / fps if frames > 0 else None
+
+
+def plan_shards(videos, segment_s: float = None) -> list:
+    shards = []
+    for source in videos:
+        width, height, fps, duration = probe(source)
+        if not segment_s or not duration or duration <= segment_s:
+            shards.append(Shard(source, 0, 0.0, None, fps, width, height))
+            continue
+        start, index = 0.0, 0
+        while start < duration:
+            shards.append(Shard(source, index, start, min(segment_s, duration - start), fps, width, height))
+            start += segment_s
+            index += 1
+    return shards
+
+
+def _init_worker(threads_per_worker: int):
+    import cv2
+    from .inference import set_batching_defaults
+    # Workers share the CPUs; keep each one from spawning a thread per core
+    os.environ["OMP_NUM_THREADS"] = str(threads_per_worker)
+    cv2.setNumThreads(threads_per_worker)
+    # One stream per worker: nothing to batch with, so never wait for more frames
+    set_batching_defaults(max_batch_size=1, max_wait_ms=0)
+
+
+def _shard_paths(output_dir: str, shard: Shard, parts: int):
+    stem = os.path.splitext(os.path.basename(shard.source))[0]
+    suffix = f".part{shard.index:04d}" if parts > 1 else ""
+    return (os.path.join(output_dir, f"{stem}{suffix}.annotated.mp4"),
+            os.path.join(output_dir, f"{stem}{suffix}.detections.jsonl"))
+
+
+def process_shard(shard: Shard, parts: int, algorithm_name: str, model_name: str, output_dir: str,
+                  detection_stride: int = 1) -> dict:
+    """Decode, process and encode one shard. Runs inside a worker process."""
+    from .registry import get_algorithm, get_model_path_for_algorithm
+    video_path, detections_path = _shard_paths(output_dir, shard, parts)
+    alerts = []
+    model_path = get_model_path_for_algorithm(algorithm_name, model_name) if model_name else None
+    algorithm = get_algorithm(algorithm_name, os.path.basename(shard.source), algorithm_name, model_name, model_path,
+                              lambda: None, alerts.extend)
+    algorithm.set_detection_stride(detection_stride)
+    algorithm.set_input_fps(shard.fps)
+
+    frames = 0
+    # Cooldowns run on video time: the same input always yields the same alerts
+    algorithm.set_clock(lambda: shard.start_s + frames / shard.fps)
+
+    started = time.perf_counter()
+    # Before ffmpeg is started, so a model that fails to load leaves nothing behind
+    algorithm.setup()
+    if "torch" in sys.modules:
+        sys.modules["torch"].set_num_threads(int(os.environ.get("OMP_NUM_THREADS", 1)))
+    decoder = encoder = None
+    try:
+        seek = ["-ss", str(shard.start_s)] if shard.start_s else []
+        limit = ["-t", str(shard.duration_s)] if shard.duration_s else []
+        decoder = subprocess.Popen(
+            ["ffmpeg", "-loglevel", "error", *seek, *limit, "-i", shard.source,
+             "-f", "rawvideo", "-pix_fmt", "bgr24", "-"],
+            stdout=subprocess.PIPE,
+        )
+        encoder = subprocess.Popen(
+            ["ffmpeg", "-y", "-loglevel", "error",
+             "-f", "rawvideo", "-pix_fmt", "bgr24", "-s", f"{shard.width}x{shard.height}", "-r", str(shard.fps),
+             "-i", "-", "-c:v", "libx264", "-preset", "veryfast", "-pix_fmt", "yuv420p", video_path],
+            stdin=subprocess.PIPE,
+        )
+
+        frame = np.empty((shard.height, shard.width, 3), dtype=np.uint8)
+        view = memoryview(frame).cast("B")
+        frame_size = frame.nbytes
+        # Frame numbers and timestamps in the output refer to the whole file, not the shard
+        first_frame = int(round(shard.start_s * shard.fps))
+        with open(detections_path, "w") as detections_file:
+            while True:
+                read = 0
+                while read < frame_size:
+                    count = decoder.stdout.readinto(view[read:])
+                    if not count:
+                        break
+                    read += count
+                if read < frame_size:
+                    break
+                output = algorithm.handle_frame(frame)
+                encoder.stdin.write(np.ascontiguousarray(output).data)
+
+                timestamp = round(shard.start_s + frames / shard.fps, 3)
+                records = algorithm.detection_records()
+                if records:
+                    detections_file.write(json.dumps({"file": shard.source, "frame": first_frame + frames,
+                                                      "time_s": timestamp, "detections": records}) + "\n")
+                for alert in alerts:
+                    detections_file.write(json.dumps({"file": shard.source, "frame": first_frame + frames,
+                                                      "time_s": timestamp, "alert": alert}) + "\n")
+                alerts.clear()
+                frames += 1
+    finally:
+        algorithm.teardown()
+        if encoder is not None:
+            encoder.stdin.close()
+            encoder.wait()
+        if decoder is not None:
+            decoder.stdout.close()
+            decoder.wait()
+
+    return {
+        "source": shard.source,
+        "index": shard.index,
+        "frames": frames,
+        "video_s": frames / shard.fps,
+        "processing_s": time.perf_counter() - started,
+        "video_path": video_path,
+        "detections_path": detections_path,
+    }
+
+
+def _merge(source: str, results: list, output_dir: str):
+    """Join the parts of a sharded file into one annotated video and one detections file."""
+    results = sorted(results, key=lambda result: result["index"])
+    stem = os.path.splitext(os.path.basename(source))[0]
+    video_path = os.path.join(output_dir, f"{stem}.annotated.mp4")
+    detections_path = os.path.join(output_dir, f"{stem}.detections.jsonl")
+    list_path = os.path.join(output_dir, f"{stem}.parts.txt")
+    with open(list_path, "w") as parts:
+        for result in results:
+            parts.write(f"file '{os.path.abspath(result['video_path'])}'\n")
+    subprocess.run(["ffmpeg", "-y", "-loglevel", "error", "-f", "concat", "-safe", "0", "-i", list_path,
+                    "-c", "copy", video_path], check=True)
+    with open(detections_path, "w") as merged:
+        for result in results:
+            with open(result["detections_path"]) as part:
+                merged.write(part.read())
+    for result in results:
+        os.remove(result["video_path"])
+        os.remove(result["detections_path"])
+    os.remove(list_path)
+
+
+def run_batch(inputs, algorithm: str, output_dir: str, model: str = None, workers: int = None,
+              segment_s: float = None, detection_stride: int = 1, threads_per_worker: int = 1) -> dict:
+    """
+    Process local video files (or directories of them) as fast as the
+    machine allows and return a summary including the speed-up over real
+    time. Algorithms registered before calling this are available to the
+    workers, which are forked.
+    """
+    videos = find_videos(inputs)
+    if not videos:
+        raise ValueError("No video files found.")
+    os.makedirs(output_dir, exist_ok=True)
+    shards = plan_shards(videos, segment_s)
+    parts = {}
+    for shard in shards:
+        parts[shard.source] = parts.get(shard.source, 0) + 1
+    workers = workers or os.cpu_count()
+
+    started = time.perf_counter()
+    results = {}
+    failures = []
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork"),
+                             initializer=_init_worker, initargs=(threads_per_worker,)) as pool:
+        futures = {pool.submit(process_shard, shard, parts[shard.source], algorithm, model, output_dir,
+                               detection_stride): shard for shard in shards}
+        for future in as_completed(futures):
+            shard = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                failures.append({"source": shard.source, "index": shard.index, "error": str(e)})
+                print(f"Failed to process {shard.source} (part {shard.index}): {e}")
+                continue
+            results.setdefault(shard.source, []).append(result)
+            print(f"Processed {shard.source} part {shard.index}: {result['frames']} frames "
+                  f"in {result['processing_s']:.1f}s")
+
+    for source, source_results in results.items():
+        if parts[source] > 1 and len(source_results) == parts[source]:
+            _merge(source, source_results, output_dir)
+    wall = time.perf_counter() - started
+
+    frames = sum(result["frames"] for source_results in results.values() for result in source_results)
+    video_s = sum(result["video_s"] for source_results in results.values() for result in source_results)
+    return {
+        "files": len(videos),
+        "shards": len(shards),
+        "workers": workers,
+        "frames": frames,
+        "video_s": round(video_s, 1),
+        "wall_s": round(wall, 1),
+        "fps": round(frames / wall, 1) if wall else 0.0,
+        "realtime_factor": round(video_s / wall, 2) if wall else 0.0,
+        "failures": failures,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="cygnus-batch", description="Process recorded video offline.")
+    parser.add_argument("algorithm", help="Registered algorithm name, e.g. YoloFire")
+    parser.add_argument("inputs", nargs="+", help="Video files or directories")
+    parser.add_argument("--model", default=None, help="Registered model name, e.g. YoloFireNano")
+    parser.add_argument("--output-dir", required=True)
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: one per CPU)")
+    parser.add_argument("--segment", type=float, default=None,
+                        help="Split files into time ranges of this many seconds, processed in parallel")
+    parser.add_argument("--threads-per-worker", type=int, default=1, help="OpenCV/torch threads per worker")
+    parser.add_argument("--detection-stride", type=int, default=1)
+    parser.add_argument("--import", dest="imports", action="append", default=[],
+                        help="Module to import first, e.g. one registering custom algorithms (repeatable)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    sys.path.insert(0, os.getcwd())
+    for module in args.imports:
+        importlib.import_module(module)
+    summary = run_batch(args.inputs, args.algorithm, args.output_dir, model=args.model, workers=args.workers,
+                        segment_s=args.segment, detection_stride=args.detection_stride,
+                        threads_per_worker=args.threads_per_worker)
+    print(json.dumps(summary, indent=2))
+    return 1 if summary["failures"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,586 @@
+"""
+Offline benchmarks for Cygnus AI algorithms and the full stream pipeline.
+
+    python -m cygnus_ai.benchmark algorithm YoloFire --model YoloFireNano --frames 300
+    python -m cygnus_ai.benchmark pipeline FaceDetection --input clip.mp4 --output run.json
+    python -m cygnus_ai.benchmark algorithm YoloHuman --model YoloHumanNano --baseline run.json
+    python -m cygnus_ai.benchmark imports FaceDetection --baseline imports.json
+    python -m cygnus_ai.benchmark backends YoloFire --model YoloFireNano --input clip.mp4
+    python -m cygnus_ai.benchmark pipeline YoloFire,YoloHuman --model YoloFireNano,YoloHumanNano
+
+`algorithm` feeds frames straight through the algorithm (`handle_frame`,
+i.e. `process_frame` or detect/annotate). `pipeline` runs a complete
+CygnusStreamProcessor: a local file stands in for the media server (input
+and output), alerts go to a JSON-lines file instead of Kafka and clips to a
+directory instead of MinIO. Frames are synthetic unless `--input` is given.
+`imports` measures, in fresh interpreters, the time and RSS of
+`import cygnus_ai` (and of instantiating the algorithm, if one is named) and
+lists the heavy dependencies that got loaded on the way. `backends` runs
+one model on every inference backend (torch, onnxruntime, openvino, fp32 and
+int8) and reports latency next to how closely each one's detections agree
+with the first backend listed; use `--input` with real footage for that.
+
+Results can be written as JSON and compared against a stored baseline; the
+exit code is 1 if fps dropped, or p95/p99 latency or peak RSS grew, by more
+than `--tolerance`, or if a heavy dependency is loaded that was not before.
+"""
+import argparse
+import importlib
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from threading import Thread
+
+import numpy as np
+
+
+class FileProducer:
+    """Kafka producer stand-in: every alert becomes one line in a JSON-lines file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.sent = 0
+        self._file = open(path, "a")
+
+    def send(self, topic: str, value: bytes):
+        self._file.write(json.dumps({"topic": topic, "value": json.loads(value)}) + "\n")
+        self.sent += 1
+        return _DeliveredFuture()
+
+    def flush(self, timeout=None):
+        self._file.flush()
+
+    def close(self, timeout=None):
+        self._file.close()
+
+
+class _DeliveredFuture:
+    def add_callback(self, callback, *args):
+        callback(*args, None)
+
+    def add_errback(self, errback, *args):
+        pass
+
+
+class DirectoryObjectStore:
+    """MinIO client stand-in writing every object to `root/<bucket>/<object_name>`."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self.objects = 0
+
+    def put_object(self, bucket_name, object_name, data, length, content_type=None, part_size=0):
+        path = os.path.join(self.root, bucket_name, object_name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as target:
+            shutil.copyfileobj(data, target)
+        self.objects += 1
+
+    def bucket_exists(self, bucket_name):
+        return True
+
+
+def synthetic_frames(width: int, height: int, count: int, seed: int = 0):
+    """Noise with a moving bright block, so codecs and detectors have something changing to work on."""
+    rng = np.random.default_rng(seed)
+    base = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+    block = max(8, min(width, height) // 6)
+    for index in range(count):
+        frame = base.copy()
+        x = (index * 7) % max(1, width - block)
+        y = (index * 3) % max(1, height - block)
+        frame[y:y + block, x:x + block] = 255
+        yield frame
+
+
+def file_frames(path: str, count: int):
+    import cv2
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise ValueError(f"Cannot read video file {path}")
+    try:
+        for _ in range(count):
+            ok, frame = capture.read()
+            if not ok:
+                break
+            yield frame
+    finally:
+        capture.release()
+
+
+def percentiles(latencies) -> dict:
+    if not latencies:
+        return {}
+    values = np.asarray(latencies) * 1000
+    return {
+        "p50": round(float(np.percentile(values, 50)), 3),
+        "p95": round(float(np.percentile(values, 95)), 3),
+        "p99": round(float(np.percentile(values, 99)), 3),
+        "mean": round(float(values.mean()), 3),
+        "max": round(float(values.max()), 3),
+    }
+
+
+class _ResourceMeter:
+    """CPU time (own and child processes, e.g. ffmpeg) and peak RSS over a run."""
+
+    def __init__(self):
+        self.start()
+
+    def start(self):
+        """(Re)start measuring, e.g. once the warm-up is over."""
+        self.started = time.perf_counter()
+        self.times = os.times()
+
+    def stop(self):
+        self.wall = time.perf_counter() - self.started
+        end = os.times()
+        self.cpu = (end.user - self.times.user) + (end.system - self.times.system)
+        self.child_cpu = (end.children_user - self.times.children_user) + \
+                         (end.children_system - self.times.children_system)
+
+    def report(self) -> dict:
+        # ru_maxrss is in kilobytes on Linux
+        return {
+            "wall_s": round(self.wall, 3),
+            "cpu_percent": round(100 * self.cpu / self.wall, 1) if self.wall else 0.0,
+            "child_cpu_percent": round(100 * self.child_cpu / self.wall, 1) if self.wall else 0.0,
+            "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+            "child_peak_rss_mb": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1),
+        }
+
+
+def _model_path(algorithm_name: str, model_name: str):
+    from .registry import get_model_path_for_algorithm
+    return get_model_path_for_algorithm(algorithm_name, model_name) if model_name else None
+
+
+def _build_algorithm(args, input_uuid: str, capture_callback=lambda: None, alert_callback=lambda alerts: None):
+    """The benchmarked algorithm; a comma-separated list runs as one AlgorithmGroup, like a multi-algorithm /start."""
+    from .group import AlgorithmGroup
+    from .registry import get_algorithm
+    names = args.algorithm.split(",")
+    models = args.model.split(",") if args.model else [""] * len(names)
+    algorithms = []
+    for name, model in zip(names, models):
+        model = model or None
+        algorithm = get_algorithm(name, input_uuid, name, model, _model_path(name, model),
+                                  capture_callback, alert_callback)
+        algorithm.set_detection_stride(args.detection_stride)
+        if args.motion_threshold is not None:
+            algorithm.set_motion_gate(threshold=args.motion_threshold)
+        if args.tile_size:
+            algorithm.set_tiling(tile_size=args.tile_size, focus=args.tile_focus)
+        algorithms.append(algorithm)
+    if len(algorithms) == 1:
+        return algorithms[0]
+    return AlgorithmGroup(input_uuid, algorithms, capture_callback, alert_callback)
+
+
+def _detector_stats(algorithm) -> dict:
+    def stats(member):
+        return dict(
+            detector_calls=member.detector_calls,
+            motion_gate=member.motion_gate.stats() if member.motion_gate else None,
+            tiling=member.tiler.stats() if member.tiler else None,
+        )
+
+    members = getattr(algorithm, "algorithms", None)
+    if members is None:
+        return stats(algorithm)
+    return {"algorithms": {f"{member.name}:{member.model_name or ''}": stats(member) for member in members}}
+
+
+# Dependencies that only the algorithms or integrations using them should load
+HEAVY_MODULES = ("tensorflow", "torch", "ultralytics", "supervision", "kafka", "minio")
+
+_IMPORT_PROBE = """
+import json, resource, sys, time
+started = time.perf_counter()
+import cygnus_ai
+result = {"import_s": time.perf_counter() - started,
+          "import_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}
+for module in sys.argv[3:]:
+    __import__(module)
+if sys.argv[1]:
+    from cygnus_ai.registry import get_algorithm, get_model_path_for_algorithm
+    model = sys.argv[2] or None
+    started = time.perf_counter()
+    get_algorithm(sys.argv[1], "benchmark", sys.argv[1], model,
+                  get_model_path_for_algorithm(sys.argv[1], model) if model else None)
+    result["instantiate_s"] = time.perf_counter() - started
+result["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+result["modules"] = list(sys.modules)
+print(json.dumps(result))
+"""
+
+
+def run_imports(args) -> dict:
+    """Import (and instantiation) cost, best of `--repeat` fresh interpreters."""
+    runs = []
+    for _ in range(args.repeat):
+        output = subprocess.run([sys.executable, "-c", _IMPORT_PROBE, args.algorithm or "", args.model or "",
+                                 *args.imports], stdout=subprocess.PIPE, check=True, cwd=os.getcwd())
+        runs.append(json.loads(output.stdout.decode().strip().splitlines()[-1]))
+    result = {key: round(min(run[key] for run in runs), 3 if key.endswith("_s") else 1)
+              for key in ("import_s", "import_rss_mb", "instantiate_s", "peak_rss_mb") if key in runs[0]}
+    modules = runs[0]["modules"]
+    result["heavy_modules"] = [name for name in HEAVY_MODULES if name in modules]
+    result["modules_loaded"] = len(modules)
+    return result
+
+
+def run_algorithm(args) -> dict:
+    """Frames straight through the algorithm, no decoding or encoding."""
+    algorithm = _build_algorithm(args, "benchmark")
+    width, height = args.size
+    total = args.warmup + args.frames
+    frames = file_frames(args.input, total) if args.input else synthetic_frames(width, height, total)
+
+    algorithm.setup()
+    latencies = []
+    meter = _ResourceMeter()
+    try:
+        for index, frame in enumerate(frames):
+            if index == args.warmup:
+                meter.start()
+                latencies.clear()
+            started = time.perf_counter()
+            algorithm.handle_frame(frame)
+            latencies.append(time.perf_counter() - started)
+        meter.stop()
+    finally:
+        algorithm.teardown()
+
+    return dict(
+        frames=len(latencies),
+        fps=round(len(latencies) / meter.wall, 2) if meter.wall else 0.0,
+        latency_ms=percentiles(latencies),
+        **_detector_stats(algorithm),
+        **meter.report(),
+    )
+
+
+def _boxes(result):
+    boxes = result.boxes
+    return boxes.xyxy.cpu().numpy(), boxes.cls.cpu().numpy().astype(int)
+
+
+def agreement(reference, detections, threshold: float = 0.5) -> dict:
+    """
+    Precision and recall of `detections` against `reference`, both lists of
+    per-frame (boxes, classes): a box matches an unmatched reference box of
+    the same class with IoU >= `threshold`.
+    """
+    from .tracking import box_iou
+    matched = predicted = expected = 0
+    ious = []
+    for (ref_boxes, ref_classes), (boxes, classes) in zip(reference, detections):
+        predicted += len(boxes)
+        expected += len(ref_boxes)
+        free = np.ones(len(ref_boxes), dtype=bool)
+        for box, class_id in zip(boxes, classes):
+            candidates = free & (ref_classes == class_id)
+            if not candidates.any():
+                continue
+            overlap = np.where(candidates, box_iou(box, ref_boxes)[0], 0.0)
+            best = int(overlap.argmax())
+            if overlap[best] >= threshold:
+                free[best] = False
+                matched += 1
+                ious.append(float(overlap[best]))
+    precision = matched / predicted if predicted else 1.0
+    recall = matched / expected if expected else 1.0
+    return {
+        "precision": round(precision, 3),
+        "recall": round(recall, 3),
+        "f1": round(2 * precision * recall / (precision + recall), 3) if precision + recall else 0.0,
+        "mean_iou": round(float(np.mean(ious)), 3) if ious else None,
+        "reference_boxes": expected,
+    }
+
+
+def run_backends(args) -> dict:
+    """One model on each backend: load time, latency and agreement with the first backend's detections."""
+    from .backends import load_model
+    path = _model_path(args.algorithm, args.model)
+    width, height = args.size
+    total = args.warmup + args.frames
+    results = {}
+    reference = None
+    for variant in args.backends.split(","):
+        backend, _, precision = variant.strip().partition(":")
+        started = time.perf_counter()
+        try:
+            model = load_model(path, backend, int8=precision == "int8", calibration_data=args.calibration_data)
+        except Exception as e:
+            print(f"Skipping {variant}: {e}")
+            results[variant] = {"error": str(e)}
+            continue
+        load_s = time.perf_counter() - started
+        frames = file_frames(args.input, total) if args.input else synthetic_frames(width, height, total)
+        latencies = []
+        detections = []
+        meter = _ResourceMeter()
+        for index, frame in enumerate(frames):
+            if index == args.warmup:
+                meter.start()
+            started = time.perf_counter()
+            result = model(frame, verbose=False)[0]
+            if index >= args.warmup:
+                latencies.append(time.perf_counter() - started)
+                detections.append(_boxes(result))
+        meter.stop()
+        results[variant] = {
+            "load_s": round(load_s, 2),
+            "fps": round(len(latencies) / meter.wall, 2) if meter.wall else 0.0,
+            "latency_ms": percentiles(latencies),
+            "cpu_percent": meter.report()["cpu_percent"],
+        }
+        if reference is None:
+            reference = detections
+            results[variant]["reference"] = True
+        else:
+            results[variant]["agreement"] = agreement(reference, detections)
+        del model
+    return {"frames": args.frames, "backends": results,
+            "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)}
+
+
+def make_clip(path: str, width: int, height: int, fps: float, frames: int):
+    """Synthetic H.264 input file for the pipeline benchmark."""
+    command = [
+        "ffmpeg", "-y", "-loglevel", "error",
+        "-f", "lavfi", "-i", f"testsrc2=size={width}x{height}:rate={fps}",
+        "-frames:v", str(frames),
+        "-c:v", "libx264", "-preset", "ultrafast", "-g", str(int(2 * fps)), "-pix_fmt", "yuv420p",
+        "-f", "mp4", path,
+    ]
+    subprocess.run(command, check=True)
+
+
+def run_pipeline(args) -> dict:
+    """A complete CygnusStreamProcessor reading a local file, with Kafka and MinIO replaced by local files."""
+    from .processor import CygnusStreamProcessor
+    workdir = tempfile.mkdtemp(prefix="cygnus-benchmark-")
+    live = os.path.join(workdir, "live")
+    os.makedirs(live)
+    source = os.path.join(live, "input")
+    if args.input:
+        os.symlink(os.path.abspath(args.input), source)
+    else:
+        make_clip(source, args.size[0], args.size[1], args.fps, args.warmup + args.frames)
+
+    producer = FileProducer(os.path.join(workdir, "alerts.jsonl"))
+    store = DirectoryObjectStore(os.path.join(workdir, "objects"))
+    processor = CygnusStreamProcessor(
+        input_uuid="input", output_uuid="output",
+        kafka_server="benchmark", kafka_alert_topic="alerts", kafka_telemetry_topic=None,
+        media_server=workdir,
+        minio_server="benchmark", minio_key="benchmark", minio_secret=None,
+        minio_bucket="clips", minio_folder="benchmark",
+        queue_size=args.queue_size, overflow_policy=args.overflow_policy, inference_size=args.inference_size,
+        kafka_options={"producer": producer}, upload_options={"client": store},
+        realtime_input=False, video_output=args.video_output, publish_metadata=args.metadata,
+        kafka_metadata_topic="metadata",
+    )
+    algorithm = _build_algorithm(args, "input", processor.capture_stream, processor.send_alert)
+    processor.set_algorithm(algorithm)
+
+    latencies = []
+    handle_frame = algorithm.handle_frame
+
+    def timed_handle_frame(*frame_args):
+        started = time.perf_counter()
+        result = handle_frame(*frame_args)
+        latencies.append(time.perf_counter() - started)
+        return result
+
+    algorithm.handle_frame = timed_handle_frame
+    metrics = processor.metrics
+
+    def frames_done():
+        # Without an annotated encode, a frame is done once the algorithm has seen it
+        if args.video_output == "annotated":
+            return metrics.counters["frames_out"]
+        return metrics.histograms["process_frame"].count
+
+    meter = _ResourceMeter()
+    processor.video_thread = Thread(target=processor.process_video, daemon=True)
+    processor.video_thread.start()
+    last_out, last_change = 0, time.monotonic()
+    deadline = time.monotonic() + args.timeout
+    warm_at, warm_frames = None, 0
+    while time.monotonic() < deadline and processor.video_thread.is_alive():
+        time.sleep(0.05)
+        frames_out = frames_done()
+        if warm_at is None and frames_out >= args.warmup:
+            warm_at, warm_frames = time.monotonic(), frames_out
+            meter.start()
+        if frames_out != last_out:
+            last_out, last_change = frames_out, time.monotonic()
+        # The input file is exhausted once the ingest ffmpeg exits and every frame went through
+        ingest_done = processor.ingest is not None and processor.ingest.finished.is_set()
+        if ingest_done and processor.decode_queue.depth == 0 and processor.encode_queue.depth == 0 \
+                and time.monotonic() - last_change > 0.5:
+            break
+    finished_at = last_change
+    meter.stop()
+    # Also closes, and thereby flushes, the alert file
+    processor.stop_app()
+
+    frames = frames_done() - warm_frames
+    elapsed = finished_at - warm_at if warm_at else 0.0
+    result = dict(
+        frames=frames,
+        fps=round(frames / elapsed, 2) if elapsed > 0 else 0.0,
+        latency_ms=percentiles(latencies[args.warmup:]),
+        stages_ms={name: round(1000 * histogram.sum / histogram.count, 3)
+                   for name, histogram in metrics.histograms.items() if histogram.count},
+        frames_dropped=processor.decode_queue.dropped + processor.encode_queue.dropped,
+        alerts=metrics.counters["alerts_sent"],
+        metadata_messages=metrics.counters["metadata_sent"],
+        clips=store.objects,
+        **_detector_stats(algorithm),
+        startup=processor.startup_stats(),
+        **meter.report(),
+    )
+    if args.keep:
+        result["workdir"] = workdir
+    else:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return result
+
+
+def compare(result: dict, baseline: dict, tolerance: float) -> list:
+    """Regressions of `result` against `baseline`, as readable strings."""
+    regressions = []
+    if baseline.get("fps") and result.get("fps", 0) < baseline["fps"] * (1 - tolerance):
+        regressions.append(f"fps {result.get('fps')} < baseline {baseline['fps']}")
+    for key in ("p95", "p99"):
+        old = baseline.get("latency_ms", {}).get(key)
+        new = result.get("latency_ms", {}).get(key)
+        if old and new and new > old * (1 + tolerance):
+            regressions.append(f"{key} latency {new}ms > baseline {old}ms")
+    old_rss, new_rss = baseline.get("peak_rss_mb"), result.get("peak_rss_mb")
+    if old_rss and new_rss and new_rss > old_rss * (1 + tolerance):
+        regressions.append(f"peak RSS {new_rss}MB > baseline {old_rss}MB")
+    for variant, backend_result in result.get("backends", {}).items():
+        backend_baseline = baseline.get("backends", {}).get(variant, {})
+        regressions.extend(f"{variant}: {regression}"
+                           for regression in compare(backend_result, backend_baseline, tolerance))
+        old_f1 = backend_baseline.get("agreement", {}).get("f1")
+        new_f1 = backend_result.get("agreement", {}).get("f1")
+        if old_f1 is not None and new_f1 is not None and new_f1 < old_f1 - tolerance:
+            regressions.append(f"{variant}: agreement f1 {new_f1} < baseline {old_f1}")
+    old_import, new_import = baseline.get("import_s"), result.get("import_s")
+    if old_import and new_import and new_import > old_import * (1 + tolerance):
+        regressions.append(f"import time {new_import}s > baseline {old_import}s")
+    if "heavy_modules" in baseline:
+        for name in result.get("heavy_modules", []):
+            if name not in baseline["heavy_modules"]:
+                regressions.append(f"{name} is now imported")
+    return regressions
+
+
+def _size(value: str):
+    width, _, height = value.lower().partition("x")
+    return int(width), int(height)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="cygnus-benchmark", description="Offline Cygnus AI benchmarks.")
+    parser.add_argument("mode", choices=("algorithm", "pipeline", "imports", "backends"))
+    parser.add_argument("algorithm", nargs="?", default=None,
+                        help="Registered algorithm name, e.g. YoloFire (optional in imports mode); "
+                             "comma-separated names run together on each frame, e.g. YoloFire,YoloHuman")
+    parser.add_argument("--model", default=None,
+                        help="Registered model name, e.g. YoloFireNano; one per algorithm, comma-separated")
+    parser.add_argument("--input", default=None, help="Local video file; synthetic frames if omitted")
+    parser.add_argument("--frames", type=int, default=300, help="Frames measured (after warm-up)")
+    parser.add_argument("--warmup", type=int, default=10, help="Frames run before measuring")
+    parser.add_argument("--size", type=_size, default=(1280, 720), help="Synthetic frame size, WxH")
+    parser.add_argument("--fps", type=float, default=25, help="Frame rate of the synthetic pipeline input")
+    parser.add_argument("--detection-stride", type=int, default=1)
+    parser.add_argument("--motion-threshold", type=float, default=None,
+                        help="Skip the detector on frames where less than this fraction of the scene changed")
+    parser.add_argument("--tile-size", type=int, default=None, help="Detect on overlapping tiles of this size")
+    parser.add_argument("--tile-focus", action="store_true",
+                        help="Tiling: re-scan only the tiles near previous detections between full scans")
+    parser.add_argument("--inference-size", type=int, default=None, help="Pipeline: letterboxed inference frames")
+    parser.add_argument("--queue-size", type=int, default=2, help="Pipeline: frames buffered per stage")
+    parser.add_argument("--overflow-policy", default="block", help="Pipeline: block (default here) keeps every frame")
+    parser.add_argument("--backends", default="torch,onnxruntime,onnxruntime:int8,openvino,openvino:int8",
+                        help="Backends: comma-separated, the first is the accuracy reference")
+    parser.add_argument("--calibration-data", default=None,
+                        help="Backends: ultralytics dataset yaml used to calibrate openvino int8")
+    parser.add_argument("--repeat", type=int, default=5, help="Imports: fresh interpreters, best one is reported")
+    parser.add_argument("--video-output", default="annotated", choices=("annotated", "passthrough", "none"),
+                        help="Pipeline: annotated re-encode (default), input remuxed as is, or no video")
+    parser.add_argument("--metadata", action="store_true", help="Pipeline: publish detections as metadata")
+    parser.add_argument("--timeout", type=float, default=600, help="Pipeline: give up after this many seconds")
+    parser.add_argument("--keep", action="store_true", help="Pipeline: keep the output, alerts and clips")
+    parser.add_argument("--import", dest="imports", action="append", default=[],
+                        help="Module to import first, e.g. one registering custom algorithms (repeatable)")
+    parser.add_argument("--output", default=None, help="Write the results to this JSON file")
+    parser.add_argument("--baseline", default=None, help="Compare against results stored in this JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Allowed relative regression (default 0.1)")
+    args = parser.parse_args(argv)
+    if args.algorithm is None and args.mode != "imports":
+        parser.error(f"{args.mode} mode needs an algorithm")
+    if args.algorithm and args.model and args.mode in ("algorithm", "pipeline") \
+            and len(args.model.split(",")) != len(args.algorithm.split(",")):
+        parser.error("--model needs one model per algorithm")
+    if args.mode == "backends" and not args.model:
+        parser.error("backends mode needs a --model")
+    return args
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    sys.path.insert(0, os.getcwd())
+    for module in args.imports:
+        importlib.import_module(module)
+
+    run = {"algorithm": run_algorithm, "pipeline": run_pipeline, "imports": run_imports,
+           "backends": run_backends}[args.mode]
+    result = {
+        "mode": args.mode,
+        "algorithm": args.algorithm,
+        "model": args.model,
+        "input": None if args.mode == "imports" else args.input or "synthetic {}x{}".format(*args.size),
+        "detection_stride": args.detection_stride,
+        "motion_threshold": args.motion_threshold,
+        "tile_size": args.tile_size,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+    result.update(run(args))
+    print(json.dumps(result, indent=2))
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(result, output, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = compare(result, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+        if regressions:
+            return 1
+        print("No regressions against", args.baseline)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
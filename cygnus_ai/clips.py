@@ -0,0 +1,141 @@
+import time
+from collections import deque
+from threading import Lock
+
+TS_PACKET_SIZE = 188
+_SYNC_BYTE = 0x47
+
+
+def _pid(packet) -> int:
+    return ((packet[1] & 0x1F) << 8) | packet[2]
+
+
+def _payload(packet):
+    adaptation = (packet[3] >> 4) & 0x3
+    start = 4
+    if adaptation in (2, 3):
+        start += 1 + packet[4]
+    if adaptation in (1, 3) and start < TS_PACKET_SIZE:
+        return packet[start:]
+    return b""
+
+
+def _random_access(packet) -> bool:
+    adaptation = (packet[3] >> 4) & 0x3
+    return adaptation in (2, 3) and packet[4] > 0 and bool(packet[5] & 0x40)
+
+
+def _pmt_pid(pat_packet):
+    payload = _payload(pat_packet)
+    if not payload:
+        return None
+    section = payload[1 + payload[0]:]
+    section_length = ((section[1] & 0x0F) << 8) | section[2]
+    programs = section[8:3 + section_length - 4]
+    for offset in range(0, len(programs) - 3, 4):
+        program_number = (programs[offset] << 8) | programs[offset + 1]
+        if program_number != 0:
+            return ((programs[offset + 2] & 0x1F) << 8) | programs[offset + 3]
+    return None
+
+
+class _Segment:
+    __slots__ = ("started_at", "data")
+
+    def __init__(self, started_at: float):
+        self.started_at = started_at
+        self.data = bytearray()
+
+
+class ClipBuffer:
+    """
+    Rolling in-memory copy of the encoded output as MPEG-TS, cut into
+    keyframe-aligned segments.
+
+    The encoder tees its H.264 output into `feed`; segments older than
+    `retention_s` are dropped and the total is capped at `max_bytes`, oldest
+    first. `clip` concatenates the segments covering a time window,
+    starting on a keyframe and preceded by the stream's PAT/PMT, which is a
+    valid MPEG-TS file on its own.
+    """
+
+    def __init__(self, retention_s: float, max_bytes: int):
+        self.retention_s = retention_s
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.dropped_segments = 0
+        self.last_fed_at = None
+        self._segments = deque()
+        self._lock = Lock()
+        self._remainder = b""
+        self._pat = None
+        self._pmt = None
+        self._pmt_pid = None
+
+    def reset_stream(self):
+        """Start over after the encoder was replaced; segments of the old stream cannot be spliced onto the new one."""
+        with self._lock:
+            self._remainder = b""
+            self._pat = None
+            self._pmt = None
+            self._pmt_pid = None
+            self._segments.clear()
+            self.size = 0
+            self.last_fed_at = None
+
+    def feed(self, data: bytes, now: float = None):
+        now = time.monotonic() if now is None else now
+        data = self._remainder + data
+        usable = len(data) - len(data) % TS_PACKET_SIZE
+        self._remainder = data[usable:]
+        with self._lock:
+            for offset in range(0, usable, TS_PACKET_SIZE):
+                packet = data[offset:offset + TS_PACKET_SIZE]
+                if packet[0] != _SYNC_BYTE:
+                    continue
+                pid = _pid(packet)
+                if pid == 0:
+                    self._pat = packet
+                    self._pmt_pid = _pmt_pid(packet)
+                    continue
+                if pid == self._pmt_pid:
+                    self._pmt = packet
+                    continue
+                if _random_access(packet):
+                    self._segments.append(_Segment(now))
+                elif not self._segments:
+                    continue  # A clip has to start on a keyframe
+                self._segments[-1].data += packet
+                self.size += TS_PACKET_SIZE
+            self._evict(now)
+            self.last_fed_at = now
+
+    def _evict(self, now: float):
+        # Keep the newest segment that started before the retention window: it covers its start
+        while len(self._segments) > 1 and (
+                self._segments[1].started_at <= now - self.retention_s or self.size > self.max_bytes):
+            self.size -= len(self._segments.popleft().data)
+            self.dropped_segments += 1
+
+    def clip(self, start: float, end: float) -> bytes:
+        """MPEG-TS bytes from the last keyframe at or before `start` up to `end`."""
+        with self._lock:
+            segments = list(self._segments)
+            first = 0
+            for index, segment in enumerate(segments):
+                if segment.started_at <= start:
+                    first = index
+            selected = [segment.data for segment in segments[first:] if segment.started_at <= end]
+            if not selected:
+                return b""
+            # Joined under the lock: the newest segment may still be growing
+            return (self._pat or b"") + (self._pmt or b"") + b"".join(selected)
+
+    def stats(self) -> dict:
+        return {
+            "segments": len(self._segments),
+            "bytes": self.size,
+            "max_bytes": self.max_bytes,
+            "dropped_segments": self.dropped_segments,
+            "buffered_seconds": (time.monotonic() - self._segments[0].started_at) if self._segments else 0.0,
+        }
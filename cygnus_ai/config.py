@@ -8,6 +8,12 @@ class Config:
         self._media_server = None
         self._kafka_config = {}
         self._minio_config = {}
+        self._inference_config = {}
+        self._model_pool_config = {}
+        self._clips_config = {}
+        self._workers_config = {}
+        self._warm_pool_config = {}
+        self._model_backends_config = {}
 
 
     # Mediaserver
@@ -21,11 +27,23 @@ class Config:
         return self._media_server
 
     # Kafka
-    def set_kafka(self, server: str, alert_topic: str, telemetry_topic:Optional[str] = None):
+    def set_kafka(self, server: str, alert_topic: str, telemetry_topic:Optional[str] = None,
+                  linger_ms: int = 50, batch_size: int = 16384, compression_type: Optional[str] = None,
+                  buffer_size: int = 1000, spill_dir: Optional[str] = None, metadata_topic: Optional[str] = None,
+                  metadata_buffer_size: int = 100):
         self._kafka_config = {
             "server": server,
             "alert_topic": alert_topic,
-            "telemetry_topic": telemetry_topic
+            "telemetry_topic": telemetry_topic,
+            # Per-frame detections of streams started with "metadata": true
+            "metadata_topic": metadata_topic,
+            # Alert delivery
+            "linger_ms": linger_ms,
+            "batch_size": batch_size,
+            "compression_type": compression_type,
+            "buffer_size": buffer_size,
+            "spill_dir": spill_dir,
+            "metadata_buffer_size": metadata_buffer_size,
         }
 
         return self
@@ -34,19 +52,106 @@ class Config:
         return getattr(self,"_kafka_config",{})
 
     # Minio
-    def set_minio(self, server:str, key: str, secret: str, bucket: str, folder:str):
+    def set_minio(self, server:str, key: str, secret: str, bucket: str, folder:str,
+                  upload_workers: int = 4, upload_queue_size: int = 100, upload_retries: int = 3,
+                  upload_per_stream: int = 2):
         self._minio_config = {
             "server": server,
             "key": key,
             "secret": secret,
             "bucket": bucket,
             "folder": folder,
+            # Shared upload service
+            "upload_workers": upload_workers,
+            "upload_queue_size": upload_queue_size,
+            "upload_retries": upload_retries,
+            "upload_per_stream": upload_per_stream,
         }
         return self
 
     def get_minio(self):
         return getattr(self, "_minio_config", {})
 
+    # Inference batching
+    def set_inference(self, max_batch_size: int = 8, max_wait_ms: float = 10):
+        self._inference_config = {
+            "max_batch_size": max_batch_size,
+            "max_wait_ms": max_wait_ms,
+        }
+        return self
+
+    def get_inference(self):
+        return getattr(self, "_inference_config", {})
+
+    # Shared model pool
+    def set_model_pool(self, max_memory_mb: Optional[float] = None, max_idle_models: int = 4):
+        self._model_pool_config = {
+            "max_memory_mb": max_memory_mb,
+            "max_idle_models": max_idle_models,
+        }
+        return self
+
+    def get_model_pool(self):
+        return getattr(self, "_model_pool_config", {})
+
+    # Alert clips
+    def set_clips(self, pre_roll_s: float = 5, post_roll_s: float = 10, max_memory_mb: float = 32):
+        self._clips_config = {
+            "pre_roll_s": pre_roll_s,
+            "post_roll_s": post_roll_s,
+            "max_memory_mb": max_memory_mb,
+        }
+        return self
+
+    def get_clips(self):
+        return getattr(self, "_clips_config", {})
+
+    # Stream execution: "thread" (default) or "process", one supervised worker process per stream
+    def set_workers(self, mode: str = "thread", stall_timeout_s: float = 60, max_restarts: int = 5,
+                    restart_backoff_s: float = 1.0):
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Unknown worker mode '{mode}'. Use 'thread' or 'process'.")
+        self._workers_config = {
+            "mode": mode,
+            "stall_timeout_s": stall_timeout_s,
+            "max_restarts": max_restarts,
+            "restart_backoff_s": restart_backoff_s,
+        }
+        return self
+
+    def get_workers(self):
+        return getattr(self, "_workers_config", {})
+
+    # Warm pool: algorithms/models prepared at start-up, as ("Algorithm", "Model") pairs or "Algorithm:Model"
+    def set_warm_pool(self, algorithms: list, size: int = 1):
+        specs = []
+        for spec in algorithms:
+            if isinstance(spec, str):
+                algorithm, _, model = spec.strip().partition(":")
+                spec = (algorithm.strip(), model.strip() or None)
+            specs.append(tuple(spec))
+        self._warm_pool_config = {
+            "algorithms": specs,
+            "size": size,
+        }
+        return self
+
+    def get_warm_pool(self):
+        return getattr(self, "_warm_pool_config", {})
+
+    # Inference backends per model: {"YoloFireNano": "openvino"} or "openvino:int8" for quantized weights
+    def set_model_backends(self, backends: dict):
+        self._model_backends_config = {}
+        for model, spec in backends.items():
+            backend, _, precision = spec.strip().partition(":")
+            if precision not in ("", "int8"):
+                raise ValueError(f"Unknown precision '{precision}' for model '{model}'. Use '{backend}:int8'.")
+            self._model_backends_config[model] = {"backend": backend, "int8": precision == "int8"}
+        return self
+
+    def get_model_backends(self):
+        return getattr(self, "_model_backends_config", {})
+
         # Load from INI file
 
     def load_from_ini(self, ini_path: str):
@@ -65,7 +170,14 @@ class Config:
             self.set_kafka(
                 server=parser["KAFKA"].get("server"),
                 alert_topic=parser["KAFKA"].get("alert_topic"),
-                telemetry_topic=parser["KAFKA"].get("telemetry_topic",None)
+                telemetry_topic=parser["KAFKA"].get("telemetry_topic",None),
+                linger_ms=parser["KAFKA"].getint("linger_ms", 50),
+                batch_size=parser["KAFKA"].getint("batch_size", 16384),
+                compression_type=parser["KAFKA"].get("compression_type", None),
+                buffer_size=parser["KAFKA"].getint("buffer_size", 1000),
+                spill_dir=parser["KAFKA"].get("spill_dir", None),
+                metadata_topic=parser["KAFKA"].get("metadata_topic", None),
+                metadata_buffer_size=parser["KAFKA"].getint("metadata_buffer_size", 100)
             )
 
         if "MINIO" in parser:
@@ -74,9 +186,53 @@ class Config:
                 key=parser["MINIO"].get("key"),
                 secret=parser["MINIO"].get("secret"),
                 bucket=parser["MINIO"].get("bucket"),
-                folder=parser["MINIO"].get("folder")
+                folder=parser["MINIO"].get("folder"),
+                upload_workers=parser["MINIO"].getint("upload_workers", 4),
+                upload_queue_size=parser["MINIO"].getint("upload_queue_size", 100),
+                upload_retries=parser["MINIO"].getint("upload_retries", 3),
+                upload_per_stream=parser["MINIO"].getint("upload_per_stream", 2)
+            )
+
+        if "INFERENCE" in parser:
+            self.set_inference(
+                max_batch_size=parser["INFERENCE"].getint("max_batch_size", 8),
+                max_wait_ms=parser["INFERENCE"].getfloat("max_wait_ms", 10)
+            )
+
+        if "MODEL_POOL" in parser:
+            self.set_model_pool(
+                max_memory_mb=parser["MODEL_POOL"].getfloat("max_memory_mb", None),
+                max_idle_models=parser["MODEL_POOL"].getint("max_idle_models", 4)
             )
 
+        if "CLIPS" in parser:
+            self.set_clips(
+                pre_roll_s=parser["CLIPS"].getfloat("pre_roll_s", 5),
+                post_roll_s=parser["CLIPS"].getfloat("post_roll_s", 10),
+                max_memory_mb=parser["CLIPS"].getfloat("max_memory_mb", 32)
+            )
+
+        if "WORKERS" in parser:
+            self.set_workers(
+                mode=parser["WORKERS"].get("mode", "thread"),
+                stall_timeout_s=parser["WORKERS"].getfloat("stall_timeout_s", 60),
+                max_restarts=parser["WORKERS"].getint("max_restarts", 5),
+                restart_backoff_s=parser["WORKERS"].getfloat("restart_backoff_s", 1.0)
+            )
+
+        if "WARM_POOL" in parser:
+            self.set_warm_pool(
+                algorithms=[spec for spec in parser["WARM_POOL"].get("algorithms", "").split(",") if spec.strip()],
+                size=parser["WARM_POOL"].getint("size", 1)
+            )
+
+        if "MODEL_BACKENDS" in parser:
+            # Keys are model names, which are case-sensitive unlike every other option
+            models = configparser.ConfigParser()
+            models.optionxform = str
+            models.read(ini_path)
+            self.set_model_backends(dict(models["MODEL_BACKENDS"]))
+
         return self
 
 
@@ -0,0 +1,140 @@
+import tracemalloc
+from collections import deque
+from threading import Lock
+import numpy as np
+
+
+class FrameSlot:
+    """
+    Preallocated storage for one decoded frame: the raw YUV420p bytes (when
+    the decoder emits YUV), their BGR conversion and, in dual-resolution
+    mode, the letterboxed inference-size BGR frame. `number` and
+    `captured_at` identify the frame currently held, `refs` how many
+    consumers still hold it.
+    """
+
+    __slots__ = ("yuv", "yuv_view", "bgr", "bgr_view", "inference", "inference_view", "index", "number",
+                 "captured_at", "refs")
+
+    def __init__(self, width: int, height: int, index: int, pixel_format: str = "yuv420p", inference_size: int = None):
+        self.yuv = None
+        self.yuv_view = None
+        if pixel_format == "yuv420p":
+            self.yuv = np.empty((height + height // 2, width), dtype=np.uint8)
+            self.yuv_view = memoryview(self.yuv.reshape(-1))
+        self.bgr = np.empty((height, width, 3), dtype=np.uint8)
+        self.bgr_view = memoryview(self.bgr.reshape(-1))
+        self.inference = None
+        self.inference_view = None
+        if inference_size:
+            self.inference = np.empty((inference_size, inference_size, 3), dtype=np.uint8)
+            self.inference_view = memoryview(self.inference.reshape(-1))
+        self.index = index
+        self.number = None
+        self.captured_at = None
+        self.refs = 0
+
+
+class FrameRing:
+    """
+    Fixed set of reusable frame slots for the decode path.
+
+    The decoder `acquire`s a slot, fills it with `readinto` and converts it in
+    place; whoever consumes the frame last `release`s it. A frame handed to
+    several consumers is `share`d first and goes back to the ring once each
+    of them released it. As long as the ring
+    holds at least as many slots as frames can be in flight, nothing is
+    allocated per frame. If it ever runs dry a new slot is allocated and
+    counted in `allocations`.
+    """
+
+    def __init__(self, width: int, height: int, size: int, pixel_format: str = "yuv420p", inference_size: int = None):
+        if pixel_format not in ("yuv420p", "bgr24"):
+            raise ValueError(f"Unsupported pixel format '{pixel_format}'.")
+        self.width = width
+        self.height = height
+        self.pixel_format = pixel_format
+        self.inference_size = inference_size
+        self.frame_size = width * height * 3 // 2 if pixel_format == "yuv420p" else width * height * 3
+        self.inference_frame_size = inference_size * inference_size * 3 if inference_size else 0
+        self._slots = [self._new_slot(i) for i in range(size)]
+        self._free = deque(self._slots)
+        self._lock = Lock()
+        self.allocations = 0
+        self.frames = 0
+
+    def _new_slot(self, index: int) -> FrameSlot:
+        return FrameSlot(self.width, self.height, index, self.pixel_format, self.inference_size)
+
+    def acquire(self) -> FrameSlot:
+        with self._lock:
+            self.frames += 1
+            if self._free:
+                slot = self._free.popleft()
+            else:
+                slot = self._new_slot(len(self._slots))
+                self._slots.append(slot)
+                self.allocations += 1
+            slot.refs = 1
+            return slot
+
+    def share(self, slot: FrameSlot, consumers: int):
+        """Hand `slot` to `consumers` consumers, each of which releases it once."""
+        if consumers < 1:
+            self.release(slot)
+            return
+        with self._lock:
+            slot.refs = consumers
+
+    def release(self, slot: FrameSlot):
+        with self._lock:
+            slot.refs -= 1
+            if slot.refs > 0:
+                return
+            if slot.bgr.shape[:2] != (self.height, self.width):
+                return  # Left over from before a resolution change
+            self._free.append(slot)
+
+    def fill(self, stream, slot: FrameSlot) -> int:
+        """Read one raw frame from `stream` straight into `slot`. Returns the number of bytes read."""
+        view = slot.yuv_view if self.pixel_format == "yuv420p" else slot.bgr_view
+        return stream.readinto(view) or 0
+
+    def fill_inference(self, stream, slot: FrameSlot) -> int:
+        """Read one letterboxed inference frame from `stream` into `slot`."""
+        return stream.readinto(slot.inference_view) or 0
+
+    def stats(self) -> dict:
+        return {
+            "slots": len(self._slots),
+            "free": len(self._free),
+            "frames": self.frames,
+            "allocations": self.allocations,
+            "allocations_per_frame": self.allocations / self.frames if self.frames else 0.0,
+        }
+
+
+def count_allocations(fn, *args, repeat: int = 100):
+    """
+    Heap traffic of one `fn(*args)` call, measured with tracemalloc: the
+    peak number of bytes allocated while it runs and the bytes still held
+    afterwards, averaged over `repeat` calls. A zero-copy frame path should
+    report a peak far below one frame size.
+    """
+    fn(*args)  # warm-up
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    peak_total = 0
+    retained_total = 0
+    try:
+        for _ in range(repeat):
+            tracemalloc.clear_traces()
+            fn(*args)
+            retained, peak = tracemalloc.get_traced_memory()
+            peak_total += peak
+            retained_total += retained
+    finally:
+        if started:
+            tracemalloc.stop()
+    return {"peak_bytes_per_call": peak_total / repeat, "retained_bytes_per_call": retained_total / repeat}
@@ -0,0 +1,189 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+
+class _DeferredMetrics:
+    """
+    Stands in for a member's StreamMetrics while it runs on a worker thread;
+    the group replays the samples on the frame thread, which the metrics
+    expect to be the only writer.
+    """
+
+    def __init__(self):
+        self.events = []
+
+    def observe(self, stage: str, seconds: float):
+        self.events.append(("observe", stage, seconds))
+
+    def inc(self, name: str, amount: int = 1):
+        self.events.append(("inc", name, amount))
+
+    def replay(self, metrics):
+        events, self.events = self.events, []
+        if metrics is None:
+            return
+        for kind, name, value in events:
+            getattr(metrics, kind)(name, value)
+
+
+class AlgorithmGroup:
+    """
+    Several algorithms on one stream, sharing its decode and encode.
+
+    Every frame goes through all members: detection runs concurrently, one
+    member per thread (inference releases the GIL, and each model has its
+    own inference server), and the detections are drawn onto the frame
+    one after another. Algorithms that only implement `process_frame` run
+    in order, on the frame thread, before the detections are drawn.
+
+    Alerts of all members go out on the stream's alert topic, tagged with
+    the member's algorithm and model. Members alerting on the same frame
+    share one clip.
+
+    Stands in for a single algorithm in `CygnusStreamProcessor`.
+    """
+
+    def __init__(self, input_uuid: str, algorithms: list, capture_callback=lambda: None,
+                 alert_callback=lambda a: None):
+        if not algorithms:
+            raise ValueError("An algorithm group needs at least one algorithm.")
+        self.algorithms = list(algorithms)
+        self.name = "+".join(algorithm.name for algorithm in self.algorithms)
+        # Alerts carry the model of the member that raised them
+        self.model_name = None
+        self.capture_callback = capture_callback
+        self.alert_callback = alert_callback
+        self.frame_index = 0
+        self._metrics = None
+        self._annotate_output = True
+        self._executor = None
+        self._capture_requested = False
+        self._pending_alerts = []
+        self._member_metrics = []
+        for algorithm in self.algorithms:
+            algorithm.capture_callback = self._request_capture
+            algorithm.alert_callback = self._alert_collector(algorithm)
+            algorithm.metrics = _DeferredMetrics()
+            self._member_metrics.append(algorithm.metrics)
+        self.input_uuid = input_uuid
+
+    @property
+    def input_uuid(self):
+        return self._input_uuid
+
+    @input_uuid.setter
+    def input_uuid(self, input_uuid):
+        self._input_uuid = input_uuid
+        for algorithm in self.algorithms:
+            algorithm.input_uuid = input_uuid
+
+    @property
+    def metrics(self):
+        return self._metrics
+
+    @metrics.setter
+    def metrics(self, metrics):
+        # Members keep their deferred recorders; samples are forwarded after every frame
+        self._metrics = metrics
+
+    @property
+    def annotate_output(self):
+        return self._annotate_output
+
+    @annotate_output.setter
+    def annotate_output(self, annotate_output):
+        self._annotate_output = annotate_output
+        for algorithm in self.algorithms:
+            algorithm.annotate_output = annotate_output
+
+    def _request_capture(self):
+        self._capture_requested = True
+
+    def _alert_collector(self, algorithm):
+        def collect(alerts):
+            self._pending_alerts.append((algorithm, alerts))
+        return collect
+
+    def _dispatch(self):
+        # On the frame thread, once every member is done with the frame
+        for recorder in self._member_metrics:
+            recorder.replay(self._metrics)
+        if self._capture_requested:
+            self._capture_requested = False
+            self.capture_callback()
+        pending, self._pending_alerts = self._pending_alerts, []
+        for algorithm, alerts in pending:
+            for alert in alerts:
+                alert.setdefault("algorithm", algorithm.name)
+                if algorithm.model_name is not None:
+                    alert.setdefault("model", algorithm.model_name)
+            self.alert_callback(alerts)
+
+    def setup(self):
+        ready = []
+        try:
+            for algorithm in self.algorithms:
+                algorithm.setup()
+                ready.append(algorithm)
+        except Exception:
+            for algorithm in ready:
+                algorithm.teardown()
+            raise
+        detectors = sum(1 for algorithm in self.algorithms if algorithm.supports_detection())
+        if detectors > 1:
+            # The frame thread runs one of the detectors itself
+            self._executor = ThreadPoolExecutor(max_workers=detectors - 1, thread_name_prefix="algorithm-group")
+
+    def teardown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        for algorithm in self.algorithms:
+            algorithm.teardown()
+
+    def set_input_fps(self, fps: float):
+        for algorithm in self.algorithms:
+            algorithm.set_input_fps(fps)
+
+    def set_clock(self, clock):
+        for algorithm in self.algorithms:
+            algorithm.set_clock(clock)
+
+    def handle_frame(self, frame, inference_frame=None, letterbox=None):
+        self.frame_index += 1
+        detectors = [algorithm for algorithm in self.algorithms if algorithm.supports_detection()]
+        try:
+            # Detectors only read the frame, so they can share it
+            futures = [self._executor.submit(algorithm.update_detections, frame, inference_frame, letterbox)
+                       for algorithm in detectors[1:]] if self._executor is not None else []
+            try:
+                results = [algorithm.update_detections(frame, inference_frame, letterbox)
+                           for algorithm in detectors[:len(detectors) - len(futures)]]
+            finally:
+                wait(futures)
+            results.extend(future.result() for future in futures)
+            for algorithm in self.algorithms:
+                if not algorithm.supports_detection():
+                    frame = algorithm.process_frame(frame)
+        finally:
+            self._dispatch()
+        if not self._annotate_output:
+            return frame
+        started = time.perf_counter()
+        for algorithm, detections in zip(detectors, results):
+            frame = algorithm.annotate(frame, detections)
+        if self._metrics is not None:
+            self._metrics.observe("annotate", time.perf_counter() - started)
+        return frame
+
+    def process_frame(self, frame):
+        return self.handle_frame(frame)
+
+    def detection_records(self) -> list:
+        """The last frame's detections of every member, each record tagged with its algorithm."""
+        records = []
+        for algorithm in self.algorithms:
+            for record in algorithm.detection_records():
+                record["algorithm"] = algorithm.name
+                records.append(record)
+        return records
@@ -0,0 +1,170 @@
+import time
+from collections import deque
+from threading import Condition, Event, Lock, Thread
+from .registry import model_pool
+
+_defaults = {"max_batch_size": 8, "max_wait_ms": 10}
+_servers = {}
+_servers_lock = Lock()
+
+
+def set_batching_defaults(max_batch_size: int = 8, max_wait_ms: float = 10):
+    """Batching limits used by inference servers created from now on."""
+    if max_batch_size < 1:
+        raise ValueError("max_batch_size must be at least 1.")
+    _defaults["max_batch_size"] = max_batch_size
+    _defaults["max_wait_ms"] = max_wait_ms
+
+
+class _Request:
+    __slots__ = ("frame", "done", "result", "error")
+
+    def __init__(self, frame):
+        self.frame = frame
+        self.done = Event()
+        self.result = None
+        self.error = None
+
+
+class InferenceServer:
+    """
+    Collects frames submitted by any number of stream threads and runs them
+    through the model in micro-batches. A batch is dispatched as soon as it
+    reaches `max_batch_size` frames or the oldest frame has waited
+    `max_wait_ms`, whichever comes first.
+    """
+
+    def __init__(self, model_name: str, model_path: str = None, backend: str = "torch",
+                 max_batch_size: int = 8, max_wait_ms: float = 10, pool=model_pool):
+        self.model_name = model_name
+        self.model_path = model_path
+        self.backend = backend
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.pool = pool
+        self.model = None
+        self.refcount = 0
+        self.batches = 0
+        self.frames = 0
+        self._pending = deque()
+        self._cond = Condition()
+        self._stopped = False
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            # Weights come from the shared model pool, so a server never holds its own copy
+            self.model = self.pool.acquire(self.model_name, self.backend, self.model_path)
+            self._thread = Thread(target=self._run, name=f"inference-{self.model_name}", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+            self.model = None
+            self.pool.release(self.model_name, self.backend)
+
+    def infer(self, frame):
+        """Submit one frame and block until its result is available."""
+        return self.infer_many([frame])[0]
+
+    def infer_many(self, frames) -> list:
+        """Submit several frames (e.g. the tiles of one frame) together, so they share batches."""
+        requests = [_Request(frame) for frame in frames]
+        with self._cond:
+            if self._stopped:
+                raise RuntimeError(f"Inference server for '{self.model_name}' is stopped.")
+            self._pending.extend(requests)
+            self._cond.notify_all()
+        for request in requests:
+            request.done.wait()
+        for request in requests:
+            if request.error is not None:
+                raise request.error
+        return [request.result for request in requests]
+
+    def _next_batch(self):
+        with self._cond:
+            while not self._pending and not self._stopped:
+                self._cond.wait()
+            if self._stopped:
+                return []
+            deadline = time.monotonic() + self.max_wait
+            while len(self._pending) < self.max_batch_size and not self._stopped:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch = []
+            while self._pending and len(batch) < self.max_batch_size:
+                batch.append(self._pending.popleft())
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                break
+            try:
+                results = self.model([request.frame for request in batch])
+                for request, result in zip(batch, results):
+                    request.result = result
+            except Exception as e:
+                for request in batch:
+                    request.error = e
+            finally:
+                self.batches += 1
+                self.frames += len(batch)
+                for request in batch:
+                    request.done.set()
+
+        # Fail whatever arrived after the stop so no caller waits forever
+        with self._cond:
+            while self._pending:
+                request = self._pending.popleft()
+                request.error = RuntimeError(f"Inference server for '{self.model_name}' is stopped.")
+                request.done.set()
+
+    def stats(self):
+        return {
+            "model": self.model_name,
+            "backend": self.backend,
+            "streams": self.refcount,
+            "pending": len(self._pending),
+            "batches": self.batches,
+            "frames": self.frames,
+            "mean_batch_size": self.frames / self.batches if self.batches else 0.0,
+        }
+
+
+def get_inference_server(model_name: str, model_path: str = None, backend: str = "torch") -> InferenceServer:
+    """Return the shared server for (`model_name`, `backend`), starting it on first use."""
+    key = (model_name or model_path, backend)
+    with _servers_lock:
+        server = _servers.get(key)
+        if server is None:
+            server = InferenceServer(key[0], model_path, backend,
+                                     _defaults["max_batch_size"], _defaults["max_wait_ms"])
+            server.start()
+            _servers[key] = server
+        server.refcount += 1
+        return server
+
+
+def release_inference_server(server: InferenceServer):
+    """Drop one reference; the server is stopped when no stream uses it anymore."""
+    with _servers_lock:
+        server.refcount -= 1
+        if server.refcount > 0:
+            return
+        _servers.pop((server.model_name, server.backend), None)
+    server.stop()
+
+
+def list_inference_servers():
+    with _servers_lock:
+        return [server.stats() for server in _servers.values()]
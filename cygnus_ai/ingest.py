@@ -0,0 +1,658 @@
+import os
+import queue
+import random
+import re
+import select
+import subprocess
+import time
+from collections import deque
+from threading import Event, Lock, Thread
+import cv2
+from .framebuffer import FrameRing
+from .metrics import PREFIX, register_collector
+from .scaling import Letterbox
+
+# Logged by ffmpeg's buffer source (at -loglevel verbose) every time the
+# filter graph is configured, i.e. at start-up and on every input change
+_GRAPH_INPUT_RE = re.compile(r"w:(\d+) h:(\d+) pixfmt:(\w+)(?: tb:\d+/\d+ fr:(\d+)/(\d+))?")
+# "Stream #0:0: Video: h264 (High), yuv420p(progressive), 1920x1080 [SAR 1:1 DAR 16:9], 30 fps, ..."
+_STREAM_RE = re.compile(r"Stream #\d+:\d+.*?: Video: (.*)")
+_SIZE_RE = re.compile(r"\b(\d{2,5})x(\d{2,5})\b")
+_FPS_RE = re.compile(r"([\d.]+) (?:fps|tbr)")
+
+STREAM_INFO_TTL = 300
+
+_stream_info_cache = {}
+_stream_info_lock = Lock()
+
+_ingests = {}
+_ingests_lock = Lock()
+
+# Ingest states
+CONNECTING = "connecting"
+RUNNING = "running"
+RECONNECTING = "reconnecting"
+ENDED = "ended"
+FAILED = "failed"
+
+
+class StreamInfo:
+    __slots__ = ("width", "height", "pix_fmt", "fps")
+
+    def __init__(self, width: int, height: int, pix_fmt: str = None, fps: float = None):
+        self.width = width
+        self.height = height
+        self.pix_fmt = pix_fmt
+        self.fps = fps
+
+    def same_geometry(self, other) -> bool:
+        return other is not None and (self.width, self.height) == (other.width, other.height)
+
+    def __repr__(self):
+        return f"StreamInfo({self.width}x{self.height}, {self.pix_fmt}, {self.fps} fps)"
+
+
+def parse_stream_info(line: str):
+    """Stream geometry from one line of ffmpeg log output, or None if the line carries none."""
+    match = _GRAPH_INPUT_RE.search(line)
+    if match:
+        width, height, pix_fmt, num, den = match.groups()
+        fps = int(num) / int(den) if num and den and int(den) and int(num) else None
+        return StreamInfo(int(width), int(height), pix_fmt, fps)
+    match = _STREAM_RE.search(line)
+    if match:
+        fields = match.group(1)
+        size = _SIZE_RE.search(fields)
+        if size is None:
+            return None
+        parts = fields.split(",")
+        pix_fmt = re.match(r"\s*(\w+)", parts[1]).group(1) if len(parts) > 1 else None
+        fps = _FPS_RE.search(fields)
+        return StreamInfo(int(size.group(1)), int(size.group(2)), pix_fmt, float(fps.group(1)) if fps else None)
+    return None
+
+
+def cache_stream_info(url: str, info: StreamInfo):
+    with _stream_info_lock:
+        _stream_info_cache[url] = (info, time.monotonic())
+
+
+def cached_stream_info(url: str, ttl: float = STREAM_INFO_TTL):
+    """Last stream info seen for `url`, if it is younger than `ttl` seconds."""
+    with _stream_info_lock:
+        entry = _stream_info_cache.get(url)
+    if entry is None or time.monotonic() - entry[1] > ttl:
+        return None
+    return entry[0]
+
+
+class FFmpegLog:
+    """
+    Non-blocking reader for an ffmpeg stderr pipe. Keeps the pipe drained
+    (so ffmpeg never stalls on a full stderr buffer), remembers the last few
+    lines for error reports and picks out stream geometry as it is logged.
+
+    Callers that may block elsewhere before polling again (the ingest waits
+    on frame bytes) run `drain` on a thread of their own as well.
+    """
+
+    def __init__(self, stream, keep: int = 50):
+        self.stream = stream
+        self.fd = stream.fileno()
+        os.set_blocking(self.fd, False)
+        self.lines = deque(maxlen=keep)
+        self.stream_info = None
+        self.eof = False
+        self._partial = b""
+        self._in_output_section = False
+        # Stream info logged since the last poll, even if `drain` consumed it
+        self._unseen = None
+        self._lock = Lock()
+
+    def poll(self):
+        """Consume whatever is available right now. Returns the newest stream info logged since the last poll."""
+        with self._lock:
+            self._read()
+            latest, self._unseen = self._unseen, None
+        return latest
+
+    def drain(self):
+        """Keep the pipe drained until ffmpeg closes it."""
+        while not self.eof:
+            try:
+                select.select([self.fd], [], [], 1.0)
+            except (OSError, ValueError):
+                break
+            with self._lock:
+                self._read()
+
+    def _read(self):
+        latest = None
+        while True:
+            try:
+                chunk = os.read(self.fd, 65536)
+            except (OSError, ValueError):
+                # Nothing buffered right now (BlockingIOError) or the pipe is already closed
+                break
+            if not chunk:
+                self.eof = True
+                break
+            *complete, self._partial = re.split(rb"[\r\n]", self._partial + chunk)
+            for raw in complete:
+                line = raw.decode("utf-8", "replace").strip()
+                if not line:
+                    continue
+                self.lines.append(line)
+                if line.startswith("Output #"):
+                    self._in_output_section = True
+                info = parse_stream_info(line)
+                if info is None:
+                    continue
+                # The filter graph line is exact; the container's stream line is only a fallback
+                # and the ones describing our own outputs are ignored
+                if "pixfmt:" in line:
+                    latest = info
+                elif latest is None and self.stream_info is None and not self._in_output_section:
+                    latest = info
+        if latest is not None:
+            self.stream_info = self._unseen = latest
+
+    def wait(self, timeout: float):
+        """Block up to `timeout` seconds for more output, then poll."""
+        try:
+            select.select([self.fd], [], [], timeout)
+        except (OSError, ValueError):
+            pass
+        return self.poll()
+
+    def tail(self) -> str:
+        return "\n".join(self.lines)
+
+
+class _Subscriber:
+    __slots__ = ("queue", "metrics", "on_copy")
+
+    def __init__(self, queue, metrics, on_copy):
+        self.queue = queue
+        self.metrics = metrics
+        self.on_copy = on_copy
+
+
+class SharedIngest:
+    """
+    One RTMP pull and one decode of an input, fanned out to every processor
+    reading it.
+
+    The ingest ffmpeg decodes into a FrameRing (plus letterboxed inference
+    frames with `inference_size`) and each decoded frame is put on the queue
+    of every subscriber, whose own overflow policy decides what happens when
+    it falls behind; a subscriber with the `block` policy holds back the
+    whole input. Slots are shared, not copied: subscribers must not draw on
+    a frame while another one still holds it (see `FrameSlot.refs`).
+
+    ffmpeg also writes a copy of the input video, remuxed to MPEG-TS without
+    re-encoding, which is handed in whole packets to the subscribers'
+    `on_copy(chunk, generation)` callbacks (passthrough output, alert
+    clips). `generation` changes whenever ffmpeg was restarted, i.e. the
+    copy starts over as a new transport stream.
+
+    With `reconnect` (the default for network inputs), an input that ends,
+    stalls for `stall_timeout_s` or fails to open is reopened with a new
+    ffmpeg after an exponential backoff with jitter, capped at
+    `max_backoff_s`; subscribers stay subscribed and see a gap in the
+    frames. After `max_reconnects` attempts in a row without a frame the
+    ingest gives up. Without it, the end of the input ends the ingest.
+
+    Shared through `get_shared_ingest`; the ffmpeg is stopped when the last
+    subscriber released it.
+    """
+
+    def __init__(self, url: str, inference_size: int = None, realtime: bool = True, ring_slots: int = 8,
+                 reconnect: bool = None, backoff_s: float = 0.5, max_backoff_s: float = 30.0,
+                 max_reconnects: int = None, stall_timeout_s: float = 10.0):
+        self.url = url
+        self.inference_size = inference_size
+        self.realtime = realtime
+        self.ring_slots = ring_slots
+        # A live source comes back after a drop; a file that ended is done
+        self.reconnect = "://" in url if reconnect is None else reconnect
+        self.backoff_s = backoff_s
+        self.max_backoff_s = max_backoff_s
+        self.max_reconnects = max_reconnects
+        self.stall_timeout_s = stall_timeout_s
+        self.refcount = 0
+        self.ffmpeg = None
+        self.log = None
+        self.inference_pipe = None
+        self.copy_pipe = None
+        self.frame_ring = None
+        self.stream_info = None
+        self.state = CONNECTING
+        self.error = None
+        self.last_error = None
+        self.ready = Event()
+        self.finished = Event()
+        self.frames = 0
+        self.frames_incomplete = 0
+        self.copied_bytes = 0
+        self.reconnects = 0
+        self.generation = 0
+        self.started_at = None
+        self.first_frame_at = None
+        self.disconnected_at = None
+        self.downtime_s = 0.0
+        self._subscribers = []
+        self._subscribed = Event()
+        self._closing = Event()
+        self._lock = Lock()
+        self._process_lock = Lock()
+        self._thread = None
+        self._inference_slots = queue.Queue(maxsize=1)
+        self._inference_reads = queue.Queue(maxsize=1)
+
+    def _command(self, inference_fd: int, copy_fd: int) -> list:
+        command = [
+            "ffmpeg",
+            "-loglevel", "verbose",  # Logs the stream geometry on every (re)configuration
+            *(["-re"] if self.realtime else []),
+        ]
+        if "://" in self.url:
+            # A source that stops sending without closing the connection ends ffmpeg instead of hanging it
+            command += ["-rw_timeout", str(int(self.stall_timeout_s * 1000000))]
+        command += ["-i", self.url]
+        if self.inference_size:
+            # Two raw BGR outputs: the full-resolution frame on stdout and a letterboxed square on a second
+            # pipe. Scaling, padding and colour conversion all happen inside ffmpeg
+            command += [
+                "-filter_complex",
+                f"[0:v]split=2[full][small];[small]{Letterbox.ffmpeg_filter(self.inference_size)}[inference]",
+                "-map", "[full]", "-noautoscale", "-f", "rawvideo", "-pix_fmt", "bgr24", "pipe:1",
+                "-map", "[inference]", "-f", "rawvideo", "-pix_fmt", "bgr24", f"pipe:{inference_fd}",
+            ]
+        else:
+            command += [
+                "-noautoscale",  # Pass resolution changes through instead of rescaling
+                "-f", "image2pipe",
+                "-pix_fmt", "yuv420p",
+                "-vcodec", "rawvideo",
+                "pipe:1",
+            ]
+        # The input video as it came in, for passthrough outputs and alert clips
+        return command + ["-map", "0:v", "-c:v", "copy", "-f", "mpegts", f"pipe:{copy_fd}"]
+
+    def start(self):
+        self.started_at = time.monotonic()
+        # The first ffmpeg is started right away, so that a missing ffmpeg fails the caller
+        threads = self._spawn()
+        self._thread = Thread(target=self._run, args=(threads,), name="ingest", daemon=True)
+        self._thread.start()
+
+    def _spawn(self):
+        """Start an ffmpeg reading the input and the threads draining its side outputs. None once closing."""
+        pipes = [os.pipe()]
+        if self.inference_size:
+            pipes.append(os.pipe())
+        copy_read, copy_write = pipes[0]
+        inference_read, inference_write = pipes[1] if self.inference_size else (None, None)
+        pass_fds = tuple(write for _, write in pipes)
+        with self._process_lock:
+            process = None
+            if not self._closing.is_set():
+                try:
+                    process = subprocess.Popen(self._command(inference_write, copy_write), stdout=subprocess.PIPE,
+                                               stderr=subprocess.PIPE, pass_fds=pass_fds)
+                except Exception as e:
+                    for read, write in pipes:
+                        os.close(read)
+                        os.close(write)
+                    raise RuntimeError(f"Error starting input stream with ffmpeg: {e}") from e
+            self.ffmpeg = process
+        if process is None:
+            for read, write in pipes:
+                os.close(read)
+                os.close(write)
+            return None
+        for write in pass_fds:
+            os.close(write)
+        self.generation += 1
+        self.log = FFmpegLog(process.stderr)
+        self.copy_pipe = os.fdopen(copy_read, "rb")
+        # Waiting for frame bytes must not leave a chatty ffmpeg blocked on a full stderr pipe
+        threads = [Thread(target=self.log.drain, name="ingest_log_drain", daemon=True),
+                   Thread(target=self._copy_loop, args=(self.copy_pipe, self.generation),
+                          name="ingest_copy_loop", daemon=True)]
+        self.inference_pipe = None
+        if inference_read is not None:
+            self.inference_pipe = os.fdopen(inference_read, "rb")
+            threads.append(Thread(target=self._inference_loop, args=(self.inference_pipe,),
+                                  name="ingest_inference_loop", daemon=True))
+        for thread in threads:
+            thread.start()
+        return threads
+
+    def _end_session(self, threads):
+        """Stop the current ffmpeg, if it is still running, and the threads reading it."""
+        process = self.ffmpeg
+        if process.poll() is None:
+            process.terminate()
+            try:
+                process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+        if self.inference_pipe is not None:
+            self._inference_slots.put(None)
+        for thread in threads:
+            thread.join(timeout=5)
+        for pipe in (self.inference_pipe, self.copy_pipe, process.stdout, process.stderr):
+            if pipe is not None:
+                pipe.close()
+
+    def subscribe(self, frame_queue, metrics=None, on_copy=None):
+        """
+        Deliver every decoded frame to `frame_queue` (a FrameQueue whose
+        `on_drop` releases the slot) and the input copy to `on_copy`, if
+        given. Decode counters go to `metrics`.
+        """
+        subscriber = _Subscriber(frame_queue, metrics, on_copy)
+        with self._lock:
+            self._subscribers.append(subscriber)
+            if self.finished.is_set():
+                frame_queue.close()
+        self._subscribed.set()
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+        subscriber.queue.close()
+
+    def wait_for_stream_info(self, timeout: float = None) -> StreamInfo:
+        """
+        Block until the first frame arrived and return the stream geometry
+        ffmpeg logged while opening the input. None if it did not arrive
+        within `timeout` seconds; while reconnecting, the input is retried
+        for as long as it takes.
+        """
+        if not self.ready.wait(timeout):
+            return None
+        if self.error is not None:
+            raise RuntimeError(self.error)
+        return self.stream_info
+
+    @property
+    def connected(self) -> bool:
+        return self.state == RUNNING
+
+    def release(self, slot):
+        ring = self.frame_ring
+        if ring is not None:
+            ring.release(slot)
+
+    def _new_frame_ring(self, info: StreamInfo):
+        slots = self.frame_ring.stats()["slots"] if self.frame_ring is not None else self.ring_slots
+        return FrameRing(info.width, info.height, slots,
+                         pixel_format="bgr24" if self.inference_size else "yuv420p",
+                         inference_size=self.inference_size)
+
+    def _inference_loop(self, pipe):
+        # Reads the second ffmpeg output concurrently with stdout, whatever order ffmpeg writes them in
+        while True:
+            slot = self._inference_slots.get()
+            if slot is None:
+                break
+            read = self.frame_ring.fill_inference(pipe, slot)
+            self._inference_reads.put(read == self.frame_ring.inference_frame_size)
+
+    def _copy_loop(self, pipe, generation: int):
+        # Always drained, or ffmpeg would stall on a full pipe; handed on in whole TS packets so that
+        # a subscriber joining mid-stream starts on a packet boundary
+        remainder = b""
+        while True:
+            try:
+                data = pipe.read1(65536)
+            except (OSError, ValueError):
+                break
+            if not data:
+                break
+            data = remainder + data
+            usable = len(data) - len(data) % 188
+            remainder = data[usable:]
+            if not usable:
+                continue
+            chunk = data[:usable]
+            self.copied_bytes += usable
+            with self._lock:
+                callbacks = [subscriber.on_copy for subscriber in self._subscribers if subscriber.on_copy]
+            for callback in callbacks:
+                try:
+                    callback(chunk, generation)
+                except Exception as e:
+                    print(f"Input copy consumer for {self.url} failed: {e}")
+
+    def _run(self, threads):
+        # Reconnect attempts since the input last delivered a frame
+        attempts = 0
+        try:
+            while True:
+                decoded = 0
+                if threads is not None:
+                    try:
+                        decoded = self._session()
+                    finally:
+                        self._end_session(threads)
+                if self._closing.is_set():
+                    break
+                if not self.reconnect:
+                    if self.stream_info is None:
+                        self.error = self.last_error
+                    break
+                if decoded:
+                    attempts = 0
+                elif self.max_reconnects is not None and attempts >= self.max_reconnects:
+                    self.error = f"Input stream {self.url} did not come back after {self.max_reconnects} attempts"
+                    print(f"{self.error}:\n{self.last_error}")
+                    break
+                if self.disconnected_at is None:
+                    self.disconnected_at = time.monotonic()
+                self.state = RECONNECTING if self.stream_info is not None else CONNECTING
+                # Full jitter on the upper half, so the streams of a restarted media server do not come back in lockstep
+                delay = min(self.max_backoff_s, self.backoff_s * 2 ** attempts) * random.uniform(0.5, 1.0)
+                print(f"Input {self.url} {'ended' if decoded else 'unavailable'}, reconnecting in {delay:.1f}s")
+                if self._closing.wait(delay):
+                    break
+                attempts += 1
+                self.reconnects += 1
+                try:
+                    threads = self._spawn()
+                except RuntimeError as e:
+                    self.last_error = str(e)
+                    threads = None
+        finally:
+            self.state = FAILED if self.error is not None else ENDED
+            self.ready.set()
+            with self._lock:
+                self.finished.set()
+                subscribers = list(self._subscribers)
+            # The input ended: processors reading it finish once their queues are drained
+            for subscriber in subscribers:
+                subscriber.queue.close()
+
+    def _session(self) -> int:
+        """Decode what the current ffmpeg delivers until it exits. Returns the number of frames."""
+        # Once frame bytes are readable, everything ffmpeg logged before them is in the stderr pipe
+        first_bytes = self.ffmpeg.stdout.peek(1)
+        info = self.log.poll() or self.log.stream_info
+        if not first_bytes or info is None:
+            self.last_error = f"Input stream {self.url} did not start:\n{self.log.tail()}"
+            return 0
+        if self.first_frame_at is None:
+            self.first_frame_at = time.monotonic()
+        if self.stream_info is not None and not info.same_geometry(self.stream_info):
+            print(f"Input {self.url} came back at {info.width}x{info.height} instead of "
+                  f"{self.stream_info.width}x{self.stream_info.height}")
+        if self.frame_ring is None or not info.same_geometry(self.stream_info):
+            self.frame_ring = self._new_frame_ring(info)
+        self.stream_info = info
+        cache_stream_info(self.url, info)
+        if self.disconnected_at is not None:
+            down_s = time.monotonic() - self.disconnected_at
+            self.downtime_s += down_s
+            self.disconnected_at = None
+            print(f"Input {self.url} reconnected after {down_s:.1f}s")
+        self.state = RUNNING
+        self.ready.set()
+        # Like a private ingest, nothing is read until the first processor is ready for frames
+        self._subscribed.wait()
+        frames = self.frames
+        self._decode_frames()
+        self.log.poll()
+        self.last_error = f"Input stream {self.url} ended:\n{self.log.tail()}"
+        return self.frames - frames
+
+    def _decode_frames(self):
+        ring = self.frame_ring
+        while True:
+            # Wait for the next frame to start arriving. A reconfiguration logged for it is readable by now
+            if not self.ffmpeg.stdout.peek(1):
+                break  # ffmpeg exited
+            info = self.log.poll()
+            if info is not None and not info.same_geometry(self.stream_info):
+                print(f"Input {self.url} changed resolution from {self.stream_info.width}x{self.stream_info.height}"
+                      f" to {info.width}x{info.height}")
+                self.stream_info = info
+                cache_stream_info(self.url, info)
+                ring = self.frame_ring = self._new_frame_ring(info)
+
+            # Read the next frame straight into a preallocated slot
+            slot = ring.acquire()
+            if self.inference_pipe is not None:
+                self._inference_slots.put(slot)
+            started = time.perf_counter()
+            complete = ring.fill(self.ffmpeg.stdout, slot) == ring.frame_size
+            if self.inference_pipe is not None:
+                complete = self._inference_reads.get() and complete
+            read_s = time.perf_counter() - started
+            with self._lock:
+                subscribers = list(self._subscribers)
+            if not complete:
+                # Only a dying ffmpeg writes part of a frame: the next peek sees the end, and the
+                # next ffmpeg starts on a frame boundary again
+                ring.release(slot)
+                self.frames_incomplete += 1
+                for subscriber in subscribers:
+                    if subscriber.metrics is not None:
+                        subscriber.metrics.inc("frames_incomplete")
+                continue
+            slot.number = self.frames
+            slot.captured_at = time.time()
+            self.frames += 1
+
+            convert_s = None
+            if ring.pixel_format == "yuv420p" and subscribers:
+                # Convert YUV to BGR once for every subscriber, in place
+                started = time.perf_counter()
+                cv2.cvtColor(slot.yuv, cv2.COLOR_YUV2BGR_I420, dst=slot.bgr)
+                convert_s = time.perf_counter() - started
+
+            ring.share(slot, len(subscribers))
+            for subscriber in subscribers:
+                metrics = subscriber.metrics
+                if metrics is not None:
+                    metrics.observe("decode_read", read_s)
+                    if convert_s is not None:
+                        metrics.observe("color_convert", convert_s)
+                    metrics.inc("frames_in")
+                    metrics.fps_in.mark()
+                subscriber.queue.put(slot)
+
+    def close(self):
+        self._closing.set()
+        self._subscribed.set()
+        with self._process_lock:
+            process = self.ffmpeg
+        if process is not None and process.poll() is None:
+            # Ends the current session; the ingest thread cleans up and does not reconnect
+            process.terminate()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+
+    def stats(self) -> dict:
+        with self._lock:
+            subscribers = len(self._subscribers)
+        info = self.stream_info
+        downtime_s = self.downtime_s
+        if self.disconnected_at is not None:
+            downtime_s += time.monotonic() - self.disconnected_at
+        return {
+            "url": self.url,
+            "inference_size": self.inference_size,
+            "state": self.state,
+            "reconnects": self.reconnects,
+            "downtime_s": round(downtime_s, 1),
+            "last_error": self.last_error.splitlines()[-1] if self.last_error else None,
+            "subscribers": subscribers,
+            "frames": self.frames,
+            "frames_incomplete": self.frames_incomplete,
+            "copied_bytes": self.copied_bytes,
+            "size": f"{info.width}x{info.height}" if info else None,
+            "finished": self.finished.is_set(),
+            "frame_ring": self.frame_ring.stats() if self.frame_ring else {},
+        }
+
+
+def get_shared_ingest(url: str, inference_size: int = None, realtime: bool = True,
+                      ring_slots: int = 8) -> SharedIngest:
+    """
+    Return the ingest of `url` shared by all processors reading it with the
+    same `inference_size`, starting it on first use. An ingest whose input
+    already ended is not handed out again.
+    """
+    key = (url, inference_size or None, realtime)
+    with _ingests_lock:
+        ingest = _ingests.get(key)
+        if ingest is None or ingest.finished.is_set():
+            ingest = SharedIngest(url, inference_size or None, realtime, ring_slots)
+            ingest.start()
+            _ingests[key] = ingest
+        ingest.refcount += 1
+        return ingest
+
+
+def release_shared_ingest(ingest: SharedIngest):
+    with _ingests_lock:
+        ingest.refcount -= 1
+        if ingest.refcount > 0:
+            return
+        key = (ingest.url, ingest.inference_size, ingest.realtime)
+        if _ingests.get(key) is ingest:
+            _ingests.pop(key)
+    ingest.close()
+
+
+def list_shared_ingests():
+    with _ingests_lock:
+        return [ingest.stats() for ingest in _ingests.values()]
+
+
+def _metric_families():
+    with _ingests_lock:
+        ingests = list(_ingests.values())
+    if not ingests:
+        return []
+    samples = [({"source": ingest.url, "inference_size": str(ingest.inference_size or "")}, ingest)
+               for ingest in ingests]
+    return [
+        (f"{PREFIX}ingest_subscribers", "gauge", "Processors reading one shared input decode.",
+         [(labels, len(ingest._subscribers)) for labels, ingest in samples]),
+        (f"{PREFIX}ingest_frames_total", "counter", "Frames decoded by a shared input.",
+         [(labels, ingest.frames) for labels, ingest in samples]),
+        (f"{PREFIX}ingest_up", "gauge", "1 while a shared input delivers frames.",
+         [(labels, int(ingest.connected)) for labels, ingest in samples]),
+        (f"{PREFIX}ingest_reconnects_total", "counter", "Attempts to reopen a shared input after it dropped.",
+         [(labels, ingest.reconnects) for labels, ingest in samples]),
+    ]
+
+
+register_collector(_metric_families)
@@ -0,0 +1,213 @@
+import time
+from bisect import bisect_left
+from threading import Lock
+
+# Seconds; fine enough for per-frame stages, wide enough for clip remuxing and uploads
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+PREFIX = "cygnus_"
+
+# Per-stream latency histograms
+STAGES = (
+    ("decode_read", "Reading one raw frame from the ingest ffmpeg."),
+    ("color_convert", "Converting a decoded frame to BGR."),
+    ("process_frame", "Running the algorithm on one frame."),
+    ("inference", "Model forward pass for one frame (all of its tiles in tiled mode), including batching delay."),
+    ("nms", "Converting model output to detections and non-max suppression."),
+    ("annotate", "Drawing detections on a frame."),
+    ("encode_write", "Writing one frame to the encoder."),
+    ("capture", "Cutting and remuxing an alert clip."),
+)
+
+# Per-stream counters
+COUNTERS = (
+    ("frames_in", "Frames read from the input stream."),
+    ("frames_out", "Frames written to the output stream."),
+    ("frames_incomplete", "Truncated frames discarded by the decoder."),
+    ("frames_held", "Last output frame repeated to keep the output up while the input reconnected."),
+    ("detector_runs", "Detector forward passes."),
+    ("detector_skipped", "Detector runs skipped by the motion gate because the scene had not changed."),
+    ("alerts_sent", "Alerts handed to the alert publisher."),
+    ("alerts_suppressed", "Alerts not sent because their label was still cooling down."),
+    ("metadata_sent", "Detection metadata messages handed to the publisher."),
+    ("clips_captured", "Alert clips queued for upload."),
+    ("clips_coalesced", "Alerts folded into a clip that was still recording instead of starting another."),
+    ("clips_dropped", "Alert clips refused by the upload service (queue full or too many pending for the stream)."),
+)
+
+_streams = {}
+_collectors = []
+_lock = Lock()
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram. `observe` is a bisect and three updates under a
+    lock of its own: some stages are observed from several threads (clips
+    are remuxed on any upload worker), and the lock is never contended by
+    the per-frame stages.
+    """
+    __slots__ = ("buckets", "counts", "sum", "count", "_lock")
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = Lock()
+
+    def observe(self, value: float):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self):
+        with self._lock:
+            return self.buckets, list(self.counts), self.sum, self.count
+
+
+class RateMeter:
+    """Events per second over the last full one-second window."""
+    __slots__ = ("rate", "_window_start", "_window_count")
+
+    def __init__(self):
+        self.rate = 0.0
+        self._window_start = time.monotonic()
+        self._window_count = 0
+
+    def mark(self):
+        self._window_count += 1
+        now = time.monotonic()
+        elapsed = now - self._window_start
+        if elapsed >= 1.0:
+            self.rate = self._window_count / elapsed
+            self._window_start = now
+            self._window_count = 0
+
+    def current(self) -> float:
+        # A stalled stream never closes its window; report it as stopped
+        return self.rate if time.monotonic() - self._window_start < 2.0 else 0.0
+
+
+class StreamMetrics:
+    """
+    Counters and stage histograms of one stream processor. Both may be
+    updated from any of the stream's threads; clip counters, for one, are
+    incremented by the ingest copy thread and the clip reader.
+    """
+
+    def __init__(self, stream: str, algorithm: str = None):
+        self.labels = {"stream": stream or "", "algorithm": algorithm or ""}
+        self.histograms = {name: Histogram() for name, _ in STAGES}
+        self.counters = {name: 0 for name, _ in COUNTERS}
+        self._counters_lock = Lock()
+        self.fps_in = RateMeter()
+        self.fps_out = RateMeter()
+        # Optional callable returning {stage: dropped frames} from the pipeline queues
+        self.dropped_frames = None
+        # Optional callable returning the input's state and reconnect count (see CygnusStreamProcessor.input_stats)
+        self.input_status = None
+
+    def observe(self, stage: str, seconds: float):
+        self.histograms[stage].observe(seconds)
+
+    def inc(self, name: str, amount: int = 1):
+        with self._counters_lock:
+            self.counters[name] += amount
+
+    def families(self) -> list:
+        families = []
+        for name, description in STAGES:
+            families.append((f"{PREFIX}{name}_seconds", "histogram", description,
+                             [(self.labels, self.histograms[name].snapshot())]))
+        for name, description in COUNTERS:
+            families.append((f"{PREFIX}{name}_total", "counter", description,
+                             [(self.labels, self.counters[name])]))
+        families.append((f"{PREFIX}fps_in", "gauge", "Input frames per second.",
+                         [(self.labels, round(self.fps_in.current(), 2))]))
+        families.append((f"{PREFIX}fps_out", "gauge", "Output frames per second.",
+                         [(self.labels, round(self.fps_out.current(), 2))]))
+        if self.dropped_frames is not None:
+            families.append((f"{PREFIX}frames_dropped_total", "counter", "Frames dropped by a full pipeline queue.",
+                             [(dict(self.labels, stage=stage), dropped)
+                              for stage, dropped in self.dropped_frames().items()]))
+        status = self.input_status() if self.input_status is not None else None
+        if status:
+            families.append((f"{PREFIX}input_up", "gauge", "1 while the input delivers frames.",
+                             [(self.labels, int(status["state"] == "running"))]))
+            families.append((f"{PREFIX}input_reconnects_total", "counter",
+                             "Attempts to reopen the input after it dropped.", [(self.labels, status["reconnects"])]))
+        return families
+
+
+def register_stream(metrics: StreamMetrics):
+    with _lock:
+        _streams[id(metrics)] = metrics
+
+
+def unregister_stream(metrics: StreamMetrics):
+    with _lock:
+        _streams.pop(id(metrics), None)
+
+
+def register_collector(collector):
+    """Add a callable returning metric families to every scrape (e.g. shared services)."""
+    with _lock:
+        if collector not in _collectors:
+            _collectors.append(collector)
+
+
+def collect() -> list:
+    """Metric families of every stream and collector in this process."""
+    with _lock:
+        streams = list(_streams.values())
+        collectors = list(_collectors)
+    families = []
+    for metrics in streams:
+        families.extend(metrics.families())
+    for collector in collectors:
+        families.extend(collector())
+    return families
+
+
+def add_labels(families: list, **labels) -> list:
+    return [(name, kind, description, [(dict(sample_labels, **labels), value) for sample_labels, value in samples])
+            for name, kind, description, samples in families]
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for value in labels.values())
+    return "{" + ",".join(f'{key}="{value}"' for key, value in zip(labels, escaped)) + "}"
+
+
+def render(families: list) -> str:
+    """Prometheus text exposition format; samples of the same family are grouped under one header."""
+    merged = {}
+    for name, kind, description, samples in families:
+        if name not in merged:
+            merged[name] = (kind, description, [])
+        merged[name][2].extend(samples)
+
+    lines = []
+    for name, (kind, description, samples) in merged.items():
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            if kind != "histogram":
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+                continue
+            buckets, counts, total, _ = value
+            cumulative = 0
+            for bound, bucket_count in zip(buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{name}_bucket{_format_labels(dict(labels, le=repr(float(bound))))} {cumulative}")
+            # Derived from the buckets, so +Inf always agrees with them
+            count = cumulative + counts[-1]
+            lines.append(f"{name}_bucket{_format_labels(dict(labels, le='+Inf'))} {count}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {total}")
+            lines.append(f"{name}_count{_format_labels(labels)} {count}")
+    return "\n".join(lines) + "\n"
@@ -1,18 +1,31 @@
+import importlib
 from importlib.resources import path
-from .yolo_fire import YoloFire
-from .yolo_human import YoloHuman
-from .face_detection import FaceDetection
 from ..registry import register_model, register_algorithm, set_models_for_algorithm
 
+# Registered by import path so that supervision, ultralytics and torch are only
+# imported once a stream actually uses one of these algorithms
+_ALGORITHMS = {
+    "YoloFire": "cygnus_ai.models.yolo_fire:YoloFire",
+    "YoloHuman": "cygnus_ai.models.yolo_human:YoloHuman",
+    "FaceDetection": "cygnus_ai.models.face_detection:FaceDetection",
+}
+
 
 def get_model_path(fname: str) -> str:
     with path("cygnus_ai.models", fname) as p:
         return str(p)
 
 
-register_algorithm("YoloFire", YoloFire)
-register_algorithm("YoloHuman", YoloHuman)
-register_algorithm("FaceDetection", FaceDetection)
+def __getattr__(name):
+    # Keeps `from cygnus_ai.models import YoloFire` working
+    if name not in _ALGORITHMS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module_name, _, class_name = _ALGORITHMS[name].partition(":")
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+for _name, _cls in _ALGORITHMS.items():
+    register_algorithm(_name, _cls)
 
 register_model("YoloFireNano",get_model_path("yolov8n-fire.pt"))
 register_model("YoloFireMedium",get_model_path("yolov8m-fire.pt"))
@@ -21,5 +34,3 @@ register_model("YoloHumanMedium",get_model_path("yolov8m-human.pt"))
 
 set_models_for_algorithm("YoloFire",["YoloFireNano", "YoloFireMedium"])
 set_models_for_algorithm("YoloHuman",["YoloHumanNano", "YoloHumanMedium"])
-
-
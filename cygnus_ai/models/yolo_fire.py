@@ -1,13 +1,23 @@
 
+import time
 from ..algorithm import BaseAlgorithm
 import supervision as sv
-from ultralytics import YOLO
+from ..inference import get_inference_server, release_inference_server
+from ..registry import get_model_backend
 
 
 class YoloFire(BaseAlgorithm):
 
     def setup(self):
-        self.model_fire = YOLO(self.model_path)
+        # Frames from every stream on this model are batched by one shared server
+        self.inference_server = get_inference_server(self.model_name, self.model_path,
+                                                     get_model_backend(self.model_name))
+        self.bounding_box_annotator = sv.BoundingBoxAnnotator()
+        self.label_annotator = sv.LabelAnnotator()
+
+    def teardown(self):
+        release_inference_server(self.inference_server)
+
     # def __init__(self, input_uuid, algorithm_name, model_name=None, model_path=None,
     #              capture_callback=lambda: None, alert_callback=lambda a: None):
     #
@@ -28,39 +38,50 @@ class YoloFire(BaseAlgorithm):
     #     # Load the YOLO model
     #     self.model_fire = YOLO(model_path)
 
+    supports_tiling = True
+
+    classes_mapping = {
+        0: 'fire',
+        1: 'smoke',
+    }
+
     def process_frame(self, frame_np):
         image_od  = self.sv_annotattions_fire(frame_np, self.input_uuid)
         return image_od
 
 
     def sv_annotattions_fire(self,image, uuid):
-        classes_mapping = {
-            0: 'fire',
-            1: 'smoke',
-        }
+        return self.annotate(image, self.detect(image, uuid))
 
-        result = self.model_fire(image)[0]
-        detections = sv.Detections.from_ultralytics(result).with_nms(threshold=0.1)
-        bounding_box_annotator = sv.BoundingBoxAnnotator()
-        label_annotator = sv.LabelAnnotator()
+    def detect(self, image, uuid=None):
+        started = time.perf_counter()
+        if self.tiler is not None:
+            detections = self.tiler.detect(image, self.inference_server, sv.Detections.from_ultralytics)
+        else:
+            detections = sv.Detections.from_ultralytics(self.inference_server.infer(image))
+        inferred = time.perf_counter()
+        detections = detections.with_nms(threshold=0.1)
+        detections = detections[detections.class_id != 2]
+        self.observe("inference", inferred - started)
+        self.observe("nms", time.perf_counter() - inferred)
 
-        classes = detections.class_id[detections.class_id != 2]
-
-        labels = []
         alerts = []
         for i in range(len(detections.confidence)):
-            labels.append(f"{classes_mapping[classes[i]]}: {detections.confidence[i]:.2f}")
-
             if detections.confidence[i] >= 0.5:
                 alerts.append({
-                    "uuid": uuid,
-                    "label": classes_mapping[classes[i]],
+                    "uuid": uuid or self.input_uuid,
+                    "label": self.classes_mapping[detections.class_id[i]],
                     "confidence_score": str(round(detections.confidence[i], 2))
                 })
         self.check_and_trigger_alert(alerts)
-        annotated_image = bounding_box_annotator.annotate(
+        return detections
+
+    def annotate(self, image, detections):
+        labels = [f"{self.classes_mapping[class_id]}: {confidence:.2f}"
+                  for class_id, confidence in zip(detections.class_id, detections.confidence)]
+        annotated_image = self.bounding_box_annotator.annotate(
             scene=image, detections=detections)
-        annotated_image = label_annotator.annotate(
+        annotated_image = self.label_annotator.annotate(
             scene=annotated_image, detections=detections, labels=labels)
 
-        return annotated_image
\ No newline at end of file
+        return annotated_image
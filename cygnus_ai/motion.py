@@ -0,0 +1,80 @@
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """
+    Cheap pre-filter deciding whether the detector has to run on a frame.
+
+    Frames are reduced to a small, blurred grayscale thumbnail and compared
+    with the thumbnail of the frame the detector last ran on. If less than
+    `threshold` of the pixels changed by more than `pixel_threshold` grey
+    levels, the scene is considered unchanged and the last detections can be
+    reused. Comparing against the last detected frame rather than the
+    previous one lets slow changes add up until they trigger a run. The
+    detector still runs at least every `max_stale_s` seconds of video.
+    """
+
+    def __init__(self, threshold: float = 0.01, pixel_threshold: int = 25, max_stale_s: float = 2.0,
+                 width: int = 64):
+        if not 0 <= threshold <= 1:
+            raise ValueError("Motion threshold must be a fraction of the frame between 0 and 1.")
+        if max_stale_s <= 0:
+            raise ValueError("max_stale_s must be positive.")
+        self.threshold = float(threshold)
+        self.pixel_threshold = int(pixel_threshold)
+        self.max_stale_s = float(max_stale_s)
+        self.width = int(width)
+        self.checks = 0
+        self.skipped = 0
+        self.forced = 0
+        self.last_score = None
+        self._reference = None
+        self._reference_index = None
+
+    def _thumbnail(self, frame):
+        height, width = frame.shape[:2]
+        # Decimate first so the area resize only touches a few times the thumbnail's pixels
+        step = max(1, width // (self.width * 4))
+        frame = frame[::step, ::step]
+        size = (self.width, max(1, round(height * self.width / width)))
+        small = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(small, (3, 3), 0)
+
+    def should_detect(self, frame, frame_index: int, fps: float = None) -> bool:
+        """
+        Whether the detector must run on `frame`. A True answer makes the
+        frame the new reference, so only ask when the detector is due.
+        """
+        self.checks += 1
+        thumbnail = self._thumbnail(frame)
+        if self._reference is None or self._reference.shape != thumbnail.shape:
+            run = True
+        else:
+            changed = int(np.count_nonzero(cv2.absdiff(thumbnail, self._reference) > self.pixel_threshold))
+            self.last_score = changed / thumbnail.size
+            run = self.last_score >= self.threshold
+            if not run and frame_index - self._reference_index >= self.max_stale_s * (fps or 25):
+                self.forced += 1
+                run = True
+        if run:
+            self._reference = thumbnail
+            self._reference_index = frame_index
+        else:
+            self.skipped += 1
+        return run
+
+    def reset(self):
+        self._reference = None
+        self._reference_index = None
+
+    def stats(self) -> dict:
+        return {
+            "checks": self.checks,
+            "skipped": self.skipped,
+            "forced_refreshes": self.forced,
+            "skip_ratio": round(self.skipped / self.checks, 3) if self.checks else 0.0,
+            "last_score": round(self.last_score, 4) if self.last_score is not None else None,
+        }
@@ -0,0 +1,105 @@
+import time
+from collections import deque
+from threading import Condition
+
+DROP_OLDEST = "drop_oldest"
+KEEP_LATEST = "keep_latest"
+BLOCK = "block"
+
+OVERFLOW_POLICIES = (DROP_OLDEST, KEEP_LATEST, BLOCK)
+
+
+class FrameQueue:
+    """
+    Bounded hand-off queue between two pipeline stages.
+
+    The overflow policy decides what happens when the producer is faster than
+    the consumer:
+      * drop_oldest: evict the oldest queued frame to make room.
+      * keep_latest: only ever hold the most recent frame.
+      * block: wait until the consumer frees a slot.
+    """
+
+    def __init__(self, name: str, maxsize: int = 2, policy: str = DROP_OLDEST, on_drop=None):
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy '{policy}'. Available policies: {list(OVERFLOW_POLICIES)}")
+        if maxsize < 1:
+            raise ValueError("Queue size must be at least 1.")
+        self.name = name
+        self.policy = policy
+        self.maxsize = 1 if policy == KEEP_LATEST else maxsize
+        self.on_drop = on_drop
+        self.dropped = 0
+        self.put_count = 0
+        self.get_count = 0
+        self._items = deque()
+        self._cond = Condition()
+        self._closed = False
+
+    def _drop(self, item):
+        self.dropped += 1
+        if self.on_drop is not None:
+            self.on_drop(item)
+
+    def put(self, item, timeout: float = 0.5) -> bool:
+        """Queue an item. Returns False if the queue was closed before it could be queued."""
+        with self._cond:
+            if self.policy == BLOCK:
+                while len(self._items) >= self.maxsize and not self._closed:
+                    self._cond.wait(timeout)
+            else:
+                while len(self._items) >= self.maxsize:
+                    self._drop(self._items.popleft())
+            if self._closed:
+                self._drop(item)
+                return False
+            self._items.append(item)
+            self.put_count += 1
+            self._cond.notify_all()
+            return True
+
+    def get(self, timeout: float = 0.5):
+        """Return the next item, or None on timeout or once the queue is closed and drained."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while not self._items:
+                remaining = deadline - time.monotonic()
+                if self._closed or remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+            item = self._items.popleft()
+            self.get_count += 1
+            self._cond.notify_all()
+            return item
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def drain(self):
+        """Discard everything still queued, going through the drop hook."""
+        with self._cond:
+            while self._items:
+                item = self._items.popleft()
+                if self.on_drop is not None:
+                    self.on_drop(item)
+            self._cond.notify_all()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    @property
+    def depth(self) -> int:
+        return len(self._items)
+
+    def stats(self) -> dict:
+        return {
+            "depth": self.depth,
+            "maxsize": self.maxsize,
+            "policy": self.policy,
+            "dropped": self.dropped,
+            "put": self.put_count,
+            "get": self.get_count,
+        }
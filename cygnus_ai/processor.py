@@ -1,27 +1,78 @@
-import os
-import tempfile
 import time
-from threading import Event
+from threading import Event, Lock, Thread
 import cv2
-import json
-import tensorflow.compat.v1 as tf
 import numpy as np
-from kafka import KafkaProducer, KafkaConsumer
 import subprocess
-from minio import Minio
 from .algorithm import BaseAlgorithm
+from .pipeline import FrameQueue, DROP_OLDEST
+from .scaling import Letterbox
+from .ingest import RECONNECTING, FFmpegLog, cached_stream_info, get_shared_ingest, release_shared_ingest
+from .alerts import get_alert_publisher, release_alert_publisher
+from .telemetry import get_telemetry_hub, release_telemetry_hub
+from .clips import ClipBuffer
+from .storage import get_upload_service, release_upload_service
+from .metrics import StreamMetrics, register_stream, unregister_stream
+
+# What is sent to the output stream
+ANNOTATED = "annotated"  # frames with detections drawn, re-encoded with libx264
+PASSTHROUGH = "passthrough"  # the input video, remuxed without re-encoding
+NO_VIDEO = "none"  # nothing; consumers read the input stream and the metadata topic
+VIDEO_OUTPUTS = (ANNOTATED, PASSTHROUGH, NO_VIDEO)
+
+
+def remux_to_mp4(ts: bytes) -> bytes:
+    """Repackage an MPEG-TS clip as fragmented mp4 in memory, without re-encoding."""
+    result = subprocess.run(
+        ["ffmpeg", "-f", "mpegts", "-i", "pipe:0", "-c", "copy",
+         "-movflags", "frag_keyframe+empty_moov+default_base_moof", "-f", "mp4", "pipe:1"],
+        input=ts, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg could not remux the clip: {result.stderr.decode('utf-8', 'replace')[-500:]}")
+    return result.stdout
+
 
 class CygnusStreamProcessor:
-    consumer: KafkaConsumer
 
     def __init__(self, input_uuid: str, output_uuid: str, kafka_server: None,
         kafka_alert_topic: None, kafka_telemetry_topic: None, media_server: str,
-                 minio_server: None, minio_key: None, minio_secret: None, minio_bucket: None, minio_folder: None ):
+                 minio_server: None, minio_key: None, minio_secret: None, minio_bucket: None, minio_folder: None,
+                 queue_size: int = 2, overflow_policy: str = DROP_OLDEST, inference_size: int = None,
+                 kafka_options: dict = None, clip_pre_roll_s: float = 5, clip_post_roll_s: float = 10,
+                 clip_max_memory_mb: float = 32, upload_options: dict = None, realtime_input: bool = True,
+                 video_output: str = ANNOTATED, publish_metadata: bool = False, kafka_metadata_topic: str = None):
+
+        # What leaves the processor: video output and/or detection metadata
+        self.algorithm = None
+        self.kafka_metadata_topic = kafka_metadata_topic if kafka_server else None
+        self.configure_output(video_output, publish_metadata)
 
         self._stop_event = Event()
         self.video_thread = None
-        self.telemetry_thread = None
+        self.encode_thread = None
+        self.clip_thread = None
         self.running = False
+        # Set once algorithm.setup() ran, which a warm pool does ahead of process_video
+        self.algorithm_ready = False
+
+        # Pipeline stages: decode -> inference -> encode
+        self.configure_pipeline(queue_size, overflow_policy, inference_size)
+
+        # Per-stage latencies and frame counters, scraped through /metrics
+        self.metrics = StreamMetrics(input_uuid)
+        self.metrics.dropped_frames = lambda: {
+            "decode": self.decode_queue.dropped,
+            "encode": self.encode_queue.dropped,
+        }
+        self.metrics.input_status = lambda: self.input_stats() or None
+
+        # Decoding is shared with every processor reading the same input (see SharedIngest)
+        self.ingest = None
+        self._subscription = None
+        # ffmpeg instance of the ingest the input copy last came from
+        self._copy_generation = None
+        # Dual-resolution decode: the ingest also emits letterboxed inference-size BGR frames
+        self.letterbox = None
 
         # Kafka setup
         if kafka_server:
@@ -29,113 +80,171 @@ class CygnusStreamProcessor:
             self.telemetries_enabled=True
             self.kafka_alert_topic = kafka_alert_topic
             self.kafka_telemetry_topic = kafka_telemetry_topic
-            self.producer = KafkaProducer(bootstrap_servers=[kafka_server])
+            # One non-blocking publisher per Kafka server, shared by all processors
+            self.alert_publisher = get_alert_publisher(kafka_server, **(kafka_options or {}))
             if self.kafka_telemetry_topic is not None:
-                self.consumer = KafkaConsumer(
-                    self.kafka_telemetry_topic,
-                    bootstrap_servers=[kafka_server],
-                    auto_offset_reset='latest',
-                    value_deserializer=lambda m: json.loads(m.decode('utf-8')),
-                )
+                # One consumer per telemetry topic, shared by all processors
+                self.telemetry_hub = get_telemetry_hub(kafka_server, self.kafka_telemetry_topic)
             else:
-                self.consumer=None
+                self.telemetry_hub = None
         else:
             self.kafka_enabled = False
-            self.producer = None
-            self.consumer = None
+            self.alert_publisher = None
+            self.telemetry_hub = None
 
         if minio_server:
             self.minio_enabled=True
             self.minio_bucket = minio_bucket
             self.minio_folder = minio_folder
 
-            self.minio_client = Minio(
-                minio_server,
-                access_key= minio_key,
-                secret_key= minio_secret,
-                secure=False
-            )
+            # One upload service per MinIO server, shared by all processors
+            self.upload_service = get_upload_service(minio_server, minio_key, minio_secret, **(upload_options or {}))
+            # Alert clips are cut from the encoder's own output, kept in memory
+            self.clip_pre_roll_s = clip_pre_roll_s
+            self.clip_post_roll_s = clip_post_roll_s
+            # Alerts during a clip's recording extend it, up to twice its normal length
+            self.clip_max_s = 2 * (clip_pre_roll_s + clip_post_roll_s)
+            # A couple of GOPs of margin so the segment holding the pre-roll start is still there
+            self.clip_buffer = ClipBuffer(retention_s=self.clip_max_s + 5,
+                                          max_bytes=int(clip_max_memory_mb * 1024 * 1024))
+            self._pending_clips = []
+            self._pending_clips_lock = Lock()
         else:
             self.minio_enabled= False
+            self.upload_service = None
+            self.clip_buffer = None
 
         # AI and stream setup
-        self.face_cascade = cv2.CascadeClassifier(
-            cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
-        )
-
-        self.algorithm=None
         self.media_server = media_server
-        self.ffmpeg = None
+        # Read the input at its native frame rate (-re); off to process local files as fast as possible
+        self.realtime_input = realtime_input
         self.process = None
+        self.encoder_log = None
         self.width = None
         self.height = None
+        self.fps = None
+        self.pix_fmt = None
+        self.output_size = None
 
+        # Start-up timing
+        self.started_at = None
+        self.first_input_at = None
+        self.first_output_at = None
+        self.stream_info_source = None
+
+        self.last_alert = None
+        self.assign_stream(input_uuid, output_uuid)
+
+    def configure_pipeline(self, queue_size: int = 2, overflow_policy: str = DROP_OLDEST, inference_size: int = None):
+        """(Re)create the stage queues; only valid before process_video starts."""
+        self.decode_queue = FrameQueue("decode", queue_size, overflow_policy, on_drop=self._release_frame)
+        self.encode_queue = FrameQueue("encode", queue_size, overflow_policy, on_drop=self._release_frame)
+        self.inference_size = int(inference_size) if inference_size else None
+
+    def configure_output(self, video_output: str = ANNOTATED, publish_metadata: bool = False):
+        """
+        Choose the video output (annotated, passthrough or none) and whether
+        detections are published to the Kafka metadata topic. Only valid
+        before process_video starts.
+        """
+        if video_output not in VIDEO_OUTPUTS:
+            raise ValueError(f"Unknown video output '{video_output}'. Use one of {list(VIDEO_OUTPUTS)}.")
+        if publish_metadata and not self.kafka_metadata_topic:
+            raise ValueError("Publishing detection metadata requires Kafka with a metadata topic.")
+        self.video_output = video_output
+        self.publish_metadata = publish_metadata
+        self._metadata_empty = True
+        if self.algorithm is not None:
+            self.algorithm.annotate_output = video_output == ANNOTATED
+
+    def assign_stream(self, input_uuid: str, output_uuid: str):
+        """Point the processor (and its algorithm) at a stream; lets a pre-built processor serve any stream."""
         self.input_uuid = input_uuid
         self.output_uuid = output_uuid
         self.rtmp_server_url_in = f"{self.media_server}/live/{self.input_uuid}"
         self.rtmp_server_url_out = f"{self.media_server}/live/{self.output_uuid}"
-        self.last_alert = None
-        self.latitude=None
-        self.longitude=None
+        self.metrics.labels["stream"] = input_uuid or ""
+        if self.algorithm is not None:
+            self.algorithm.input_uuid = input_uuid
 
     def set_algorithm(self, algorithm: BaseAlgorithm):
         self.algorithm = algorithm
+        algorithm.metrics = self.metrics
+        algorithm.annotate_output = self.video_output == ANNOTATED
+        self.metrics.labels["algorithm"] = algorithm.name or ""
 
-    def start_input_stream(self):
-        try:
-            command = [
-                "ffmpeg",
-                "-re",
-                "-i",
-                self.rtmp_server_url_in,
-                "-f", "image2pipe",
-                "-pix_fmt", "yuv420p",  # Pixel format (raw video in BGR format)
-                "-vcodec", "rawvideo",  # Raw video input
-                "-",
-            ]
-            self.ffmpeg = subprocess.Popen(
-                command, stdout=subprocess.PIPE, stderr=subprocess.PIPE
-            )
+    def prepare(self):
+        """Load the algorithm's model now instead of at the start of process_video."""
+        if not self.algorithm_ready:
+            self.algorithm.setup()
+            self.algorithm_ready = True
 
+    def discard(self):
+        """Release a processor that was prepared but never run."""
+        if self.algorithm_ready:
+            self.algorithm.teardown()
+            self.algorithm_ready = False
+        self.stop_app()
 
-        except Exception as e:
-            raise RuntimeError(f"Error starting input stream with ffmpeg: {e}") from e
-
-    def get_stream_resolution(self, rtmp_url):
-        cmd = [
-            "ffprobe",
-            "-v", "error",
-            "-select_streams", "v:0",
-            "-show_entries", "stream=width,height",
-            "-of", "json",
-            rtmp_url
-        ]
-        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        info = json.loads(result.stdout)
-        self.width = info['streams'][0]['width']
-        self.height = info['streams'][0]['height']
-
-
-
-    def consume_telemetry(self):
-        if self.kafka_enabled and self.consumer is not None:
-            while not self._stop_event.is_set():
-                try:
-                    records = self.consumer.poll(timeout_ms=1000)
-                    # Continuously poll for messages
-                    for tp, record_list in records.items():
-                        for record in record_list:
-                            msg_value = record.value
-                            if msg_value.get("type") == "GPS_RAW_INT" and msg_value.get("uuid") == self.input_uuid:
-                                self.latitude = msg_value.get("latitude")
-                                self.longitude = msg_value.get("longitude")
-
-                except KeyboardInterrupt:
-                    print("Consumer stopped.")
-
-
-    def start_output_stream(self):
-        self.get_stream_resolution(self.rtmp_server_url_in)
+    def start_input_stream(self):
+        """Take the decode of the input, starting it unless another processor already reads it."""
+        # Enough slots for every frame that can be queued or in flight in a stage, plus the one the
+        # encoder holds on to for repeating while the input reconnects
+        self.ingest = get_shared_ingest(self.rtmp_server_url_in, self.inference_size, self.realtime_input,
+                                        self.decode_queue.maxsize + self.encode_queue.maxsize + 4)
+
+    def subscribe_input(self):
+        """Start receiving decoded frames on the decode queue."""
+        # Without an annotated encode, the input copy feeds the passthrough output and the clip buffer
+        wants_copy = self.video_output == PASSTHROUGH or (self.clip_buffer is not None
+                                                           and self.video_output != ANNOTATED)
+        self._subscription = self.ingest.subscribe(self.decode_queue, self.metrics,
+                                                   self._on_input_copy if wants_copy else None)
+
+    def wait_for_stream_info(self):
+        """
+        Block until the ingest delivers its first frame and return the
+        stream geometry it logged while opening the input. No separate probe
+        connection to the media server is needed. An input that is not up
+        yet is waited for until the processor is stopped (None then).
+        """
+        info = None
+        while info is None:
+            if self._stop_event.is_set():
+                return None
+            info = self.ingest.wait_for_stream_info(timeout=0.5)
+        self.first_input_at = time.monotonic()
+        return info
+
+    def apply_stream_info(self, info):
+        self.width = info.width
+        self.height = info.height
+        self.pix_fmt = info.pix_fmt
+        if info.fps:
+            self.fps = info.fps
+
+    def letterbox_for(self, frame):
+        if not self.inference_size:
+            return None
+        height, width = frame.shape[:2]
+        if self.letterbox is None or (self.letterbox.width, self.letterbox.height) != (width, height):
+            self.letterbox = Letterbox(width, height, self.inference_size)
+        return self.letterbox
+
+    @property
+    def latitude(self):
+        position = self.telemetry_hub.get_position(self.input_uuid) if self.telemetry_hub else None
+        return position[0] if position else None
+
+    @property
+    def longitude(self):
+        position = self.telemetry_hub.get_position(self.input_uuid) if self.telemetry_hub else None
+        return position[1] if position else None
+
+
+    def start_output_stream(self, width: int = None, height: int = None):
+        width = width or self.width
+        height = height or self.height
         try:
             ffmpeg_stream_command = [
                 "ffmpeg",
@@ -143,136 +252,412 @@ class CygnusStreamProcessor:
                 "-f", "rawvideo",  # Input format
                 "-vcodec", "rawvideo",  # Input codec
                 "-pix_fmt", "bgr24",  # Input pixel format
-                "-s", "{}x{}".format(self.width, self.height),  # Input resolution
+                "-s", "{}x{}".format(width, height),  # Input resolution
                 "-i", "-",  # Input from pipe
                 "-vcodec", "libx264",  # Re-encode to H.264
                 "-pix_fmt", "yuv420p",  # H.264-compatible pixel format
                 "-preset", "ultrafast",  # Encoding speed preset
                 "-tune", "zerolatency",  # Tuning for low latency
                 "-b:v", "256k",  # Video bitrate
-                "-f", "flv",  # Output format
-                self.rtmp_server_url_out,  # RTMP server URL
             ]
+            if self.clip_buffer is not None:
+                # Regular keyframes so clips can start close to the alert, and a copy
+                # of the encoded stream as MPEG-TS on stdout for the clip buffer
+                ffmpeg_stream_command += [
+                    "-g", str(int(round(2 * (self.fps or 25)))),
+                    "-flags", "+global_header",
+                    "-map", "0:v",
+                    "-f", "tee",
+                    f"[f=flv]{self.rtmp_server_url_out}|[f=mpegts]pipe:1",
+                ]
+            else:
+                ffmpeg_stream_command += [
+                    "-f", "flv",  # Output format
+                    self.rtmp_server_url_out,  # RTMP server URL
+                ]
             self.process = subprocess.Popen(ffmpeg_stream_command, stdout=subprocess.PIPE, stdin=subprocess.PIPE,
                                             stderr=subprocess.PIPE)
+            self.encoder_log = FFmpegLog(self.process.stderr)
+            self.output_size = (width, height)
 
         except Exception as e:
             raise RuntimeError(f"Error starting output stream with ffmpeg: {e}") from e
 
+    def start_passthrough_stream(self):
+        """Remux the input copy to the output stream, without decoding or re-encoding it."""
+        try:
+            self.process = subprocess.Popen(
+                ["ffmpeg", "-f", "mpegts", "-i", "pipe:0", "-c", "copy", "-f", "flv", self.rtmp_server_url_out],
+                stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+            self.encoder_log = FFmpegLog(self.process.stderr)
+        except Exception as e:
+            raise RuntimeError(f"Error starting passthrough stream with ffmpeg: {e}") from e
+
+    def restart_passthrough_stream(self):
+        """Replace the remuxer, once the ingest reopened the input and its copy starts over."""
+        old_process = self.process
+        self.start_passthrough_stream()
+        if old_process is not None:
+            try:
+                old_process.stdin.close()
+                old_process.wait(timeout=5)
+            except (BrokenPipeError, subprocess.TimeoutExpired):
+                old_process.kill()
+
+    def _on_input_copy(self, data: bytes, generation: int):
+        # Called on the ingest's copy thread with whole MPEG-TS packets of the input video
+        if generation != self._copy_generation:
+            if self._copy_generation is not None:
+                # The input was reopened: a new transport stream whose timestamps start over
+                if self.video_output == PASSTHROUGH and not self._stop_event.is_set():
+                    self.restart_passthrough_stream()
+                if self.clip_buffer is not None:
+                    # Clips still recording end where the input dropped
+                    self._flush_pending_clips(force=True)
+                    self.clip_buffer.reset_stream()
+            self._copy_generation = generation
+        process = self.process
+        if self.video_output == PASSTHROUGH and process is not None:
+            try:
+                process.stdin.write(data)
+                process.stdin.flush()
+            except (BrokenPipeError, ValueError) as e:
+                if not self._stop_event.is_set():
+                    print(f"Passthrough output for {self.output_uuid} stopped: {e}\n{self.encoder_log.tail()}")
+                    self.process = None
+            else:
+                self.encoder_log.poll()
+        if self.clip_buffer is not None:
+            self.clip_buffer.feed(data)
+            self._flush_pending_clips()
+
+    def restart_output_stream(self, width: int = None, height: int = None):
+        """Replace the encoder, e.g. after the input resolution changed. The ingest keeps running."""
+        old_process = self.process
+        self.start_output_stream(width, height)
+        if old_process is not None:
+            try:
+                old_process.stdin.close()
+                old_process.wait(timeout=5)
+            except (BrokenPipeError, subprocess.TimeoutExpired):
+                old_process.kill()
+
     def preprocessing_image_(self, frame):
         # Convert frame to float32 and scale
         img = cv2.resize(frame.astype(np.float32) / 255, (500, 400))
-        # Convert the image to an array and expand dimensions
-        img_array = tf.keras.preprocessing.image.img_to_array(img)
-        img_array = np.expand_dims(img_array, axis=0)
+        # Add the batch dimension
+        img_array = np.expand_dims(img, axis=0)
         return img_array
 
 
     def send_alert(self, alerts):
 
-        if self.kafka_enabled and self.producer:
+        publisher = self.alert_publisher
+        if self.kafka_enabled and publisher:
             for alert in alerts:
-                try:
-                    if None not in (self.longitude, self.longitude):
-                        alert["latitude"] = self.latitude
-                        alert["longitude"] = self.longitude
-                    alert["algorithm"] = self.algorithm.name
-                    if self.algorithm.model_name is not None: #Include model if utilized
-                        alert["model"] = self.algorithm.model_name
-                    self.producer.send(self.kafka_alert_topic, json.dumps(alert).encode('utf-8'))
-                    self.producer.flush()
-
-                except Exception as e:
-                    print("Failed to send data:", e)
-                    raise
-                    #self.last_alert = current_time
+                position = self.telemetry_hub.get_position(self.input_uuid) if self.telemetry_hub else None
+                if position is not None:
+                    alert["latitude"], alert["longitude"] = position
+                # Set already when the alert comes from one of several algorithms on the stream
+                alert.setdefault("algorithm", self.algorithm.name)
+                if self.algorithm.model_name is not None: #Include model if utilized
+                    alert.setdefault("model", self.algorithm.model_name)
+                # Only buffers the alert; delivery happens off the video thread
+                publisher.publish(self.kafka_alert_topic, alert)
+                self.metrics.inc("alerts_sent")
+
+    def send_metadata(self, slot):
+        """
+        Publish the detections on one frame. Frames without detections are
+        only published once, when the last object disappears.
+        """
+        # Released by stop_app while the last frames may still be going through
+        publisher = self.alert_publisher
+        if publisher is None:
+            return
+        records = self.algorithm.detection_records()
+        if not records and self._metadata_empty:
+            return
+        self._metadata_empty = not records
+        publisher.publish_metadata(self.kafka_metadata_topic, {
+            "uuid": self.input_uuid,
+            "frame": slot.number,
+            "pts_s": round(slot.number / self.fps, 3) if self.fps else None,
+            "captured_at": round(slot.captured_at, 3),
+            "width": self.width,
+            "height": self.height,
+            "algorithm": self.algorithm.name,
+            "detections": records,
+        })
+        self.metrics.inc("metadata_sent")
 
     def capture_stream(self):
+        """
+        Schedule the upload of a clip around the current moment. Returns at
+        once: the clip is cut as soon as its post-roll has been encoded. An
+        alert while a clip is still recording extends that clip instead of
+        starting an overlapping one.
+        """
         if self.minio_enabled:
-            with tempfile.NamedTemporaryFile(suffix=".mp4", delete=False) as temp_file:
-                temp_filename = temp_file.name
-            command = [
-                'ffmpeg',
-                '-y',
-                '-i', self.rtmp_server_url_out,
-                '-t', str(10),
-                '-c', 'copy',
-                temp_filename
-            ]
-            subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            object_name = self.minio_folder + "/" + self.input_uuid + "/" + time.strftime("%Y%m%d-%H%M%S") + '.mp4'
+            alert_at = time.monotonic()
+            with self._pending_clips_lock:
+                for clip in self._pending_clips:
+                    if alert_at <= clip[1]:
+                        clip[1] = min(alert_at + self.clip_post_roll_s, clip[0] + self.clip_max_s)
+                        self.metrics.inc("clips_coalesced")
+                        return
+                object_name = self.minio_folder + "/" + self.input_uuid + "/" + time.strftime("%Y%m%d-%H%M%S") + '.mp4'
+                # [start, end, object name]
+                self._pending_clips.append([alert_at - self.clip_pre_roll_s, alert_at + self.clip_post_roll_s,
+                                            object_name])
+
+    def _flush_pending_clips(self, force: bool = False):
+        # Hand every clip whose post-roll is buffered (or everything, when the stream ends) to the uploader
+        fed_at = self.clip_buffer.last_fed_at
+        with self._pending_clips_lock:
+            ready = [clip for clip in self._pending_clips
+                     if force or (fed_at is not None and fed_at >= clip[1])]
+            if not ready:
+                return
+            self._pending_clips = [clip for clip in self._pending_clips if clip not in ready]
+        for start, end, object_name in ready:
+            ts = self.clip_buffer.clip(start, end)
+            if not ts:
+                print(f"No buffered video to upload for the alert on {self.output_uuid}")
+                continue
+            # Bounded per stream by the upload service, so an alert storm on one stream cannot starve the others
+            if self.upload_service.submit(self.minio_bucket, object_name, lambda ts=ts: self._remux_clip(ts),
+                                          "video/mp4", stream=self.output_uuid):
+                self.metrics.inc("clips_captured")
+            else:
+                self.metrics.inc("clips_dropped")
 
-            try:
-                self.minio_client.fput_object(self.minio_bucket, object_name, temp_filename)
-                print(f"File uploaded successfully to MinIO as {object_name}")
-            except Exception as e:
-                print(f"Failed to upload file to MinIO: {e}")
-            finally:
-                # Clean up the temporary file
-                os.remove(temp_filename)
+    def _remux_clip(self, ts: bytes) -> bytes:
+        started = time.perf_counter()
+        try:
+            return remux_to_mp4(ts)
+        finally:
+            self.metrics.observe("capture", time.perf_counter() - started)
 
+    def _clip_source(self):
+        return self.process.stdout if self.process is not None else None
+
+    def clip_reader_loop(self):
+        # Feeds the MPEG-TS copy of the encoded output into the clip buffer, following encoder restarts
+        source = None
+        try:
+            while not self._stop_event.is_set():
+                current = self._clip_source()
+                if current is not source:
+                    source = current
+                    self.clip_buffer.reset_stream()
+                data = source.read1(65536) if source is not None else b""
+                if data:
+                    self.clip_buffer.feed(data)
+                    self._flush_pending_clips()
+                elif source is self._clip_source():
+                    self._stop_event.wait(0.1)  # Writer gone and not replaced (yet)
+        finally:
+            # Whatever was recorded of clips still waiting for their post-roll
+            self._flush_pending_clips(force=True)
+
+    def _release_frame(self, item):
+        slot = item[0] if isinstance(item, tuple) else item
+        self.ingest.release(slot)
+
+    def _input_reconnecting(self) -> bool:
+        return self.ingest is not None and self.ingest.state == RECONNECTING
+
+    def encode_loop(self):
+        # The last frame written is kept out of the ring: while the input reconnects it is repeated at the
+        # stream's frame rate, so the output stays up and viewers see a still instead of a dropped stream
+        held = None
+        try:
+            while True:
+                # With a frame to repeat, a whole frame interval without a new one means the input is late
+                item = self.encode_queue.get(1 / (self.fps or 25) if held is not None else 0.5)
+                if item is None:
+                    if self.encode_queue.closed or self._stop_event.is_set():
+                        break
+                    if held is not None and self._input_reconnecting():
+                        self.process.stdin.write(np.ascontiguousarray(held[1]).data)
+                        self.metrics.inc("frames_held")
+                        self.encoder_log.poll()
+                    continue
+                if held is not None:
+                    self._release_frame(held[0])
+                held = item
+                frame = item[1]
+                height, width = frame.shape[:2]
+                if (width, height) != self.output_size:
+                    # Only the encoder is restarted on a resolution change
+                    self.restart_output_stream(width, height)
+                # Write processed frame to the output stream without copying it
+                started = time.perf_counter()
+                self.process.stdin.write(np.ascontiguousarray(frame).data)
+                self.metrics.observe("encode_write", time.perf_counter() - started)
+                self.metrics.inc("frames_out")
+                self.metrics.fps_out.mark()
+                self.encoder_log.poll()
+                if self.first_output_at is None:
+                    self.first_output_at = time.monotonic()
+                    print(f"First output frame for {self.output_uuid} after "
+                          f"{self.first_output_at - self.started_at:.2f}s ({self.stream_info_source} stream info)")
+        except BrokenPipeError as e:
+            print("Broken pipe error while writing to FFmpeg output stream:", e)
+            self._stop_event.set()
+        finally:
+            if held is not None:
+                self._release_frame(held[0])
+
+    def queue_stats(self):
+        """Current depth and dropped-frame count of every pipeline stage."""
+        return {
+            "decode": self.decode_queue.stats(),
+            "encode": self.encode_queue.stats(),
+        }
+
+    def frame_stats(self):
+        """Frame buffer reuse: slots in the ring and heap allocations per frame."""
+        return self.ingest.frame_ring.stats() if self.ingest is not None and self.ingest.frame_ring else {}
+
+    def input_stats(self):
+        """State of the input (connecting, running, reconnecting, ended or failed) and how often it was reopened."""
+        if self.ingest is None:
+            return {}
+        stats = self.ingest.stats()
+        return {key: stats[key] for key in ("state", "reconnects", "downtime_s", "last_error")}
+
+    def clip_stats(self):
+        """Size and time span of the in-memory alert clip buffer."""
+        return self.clip_buffer.stats() if self.clip_buffer else {}
+
+    def startup_stats(self):
+        """Seconds from process_video start to the first decoded and the first encoded frame."""
+        def since_start(timestamp):
+            return None if timestamp is None or self.started_at is None else timestamp - self.started_at
+        return {
+            "time_to_first_input_frame": since_start(self.first_input_at),
+            "time_to_first_output_frame": since_start(self.first_output_at),
+            "stream_info_source": self.stream_info_source,
+        }
 
     def process_video(self):
+        self.started_at = time.monotonic()
+        register_stream(self.metrics)
         try:
             self.start_input_stream()
-            self.start_output_stream()
+            shared = self.ingest.stream_info
+            # A recently seen geometry lets the encoder start while the ingest is still connecting
+            cached = shared or cached_stream_info(self.rtmp_server_url_in)
+            if cached is not None:
+                self.apply_stream_info(cached)
+                if self.video_output == ANNOTATED:
+                    self.start_output_stream()
+            if self.video_output == PASSTHROUGH:
+                self.start_passthrough_stream()
             self.running = True
-            self.algorithm.setup()
-            while not self._stop_event.is_set():
-                # Read YUV420p image from the input stream
-                buffer_size = self.width * self.height * 3 // 2  # 1.5 bytes per pixel for YUV420p
-                raw_image = self.ffmpeg.stdout.read(buffer_size)
-
-                if len(raw_image) != buffer_size:
-                    continue  # Skip if the frame is incomplete
-                # Convert raw YUV420p image to a numpy array
-                yuv_frame = np.frombuffer(raw_image, np.uint8).reshape((self.height + self.height // 2, self.width))
-
-                # Convert YUV to BGR format using OpenCV
-                frame = cv2.cvtColor(yuv_frame, cv2.COLOR_YUV2BGR_I420)
-
-                frame = self.algorithm.process_frame(frame)
+            self.prepare()
+            self.subscribe_input()
+
+            info = self.wait_for_stream_info()
+            if info is None:
+                return  # Stopped before the input came up
+            self.apply_stream_info(info)
+            if cached is not None and info.same_geometry(cached):
+                self.stream_info_source = "shared" if shared is not None else "cache"
+            else:
+                self.stream_info_source = "ingest"
+                if self.video_output == ANNOTATED:
+                    if self.process is None:
+                        self.start_output_stream()
+                    else:
+                        self.restart_output_stream()
+            self.algorithm.set_input_fps(self.fps)
+
+            if self.video_output == ANNOTATED:
+                self.encode_thread = Thread(target=self.encode_loop, daemon=True)
+                self.encode_thread.start()
+                if self.clip_buffer is not None:
+                    self.clip_thread = Thread(target=self.clip_reader_loop, daemon=True)
+                    self.clip_thread.start()
 
-                try:
-                    # Write processed frame to the output stream
-                    self.process.stdin.write(frame.tobytes())
-                except BrokenPipeError as e:
-                    print("Broken pipe error while writing to FFmpeg output stream:", e)
-                    break
+            while not self._stop_event.is_set():
+                slot = self.decode_queue.get()
+                if slot is None:
+                    if self.decode_queue.closed:
+                        break
+                    continue
+                height, width = slot.bgr.shape[:2]
+                if (width, height) != (self.width, self.height):
+                    self.width, self.height = width, height
+                frame = slot.bgr
+                if self.video_output == ANNOTATED and slot.refs > 1:
+                    # Another processor still reads this frame: draw on a copy
+                    frame = frame.copy()
+                started = time.perf_counter()
+                frame = self.algorithm.handle_frame(frame, slot.inference, self.letterbox_for(frame))
+                self.metrics.observe("process_frame", time.perf_counter() - started)
+                if self.publish_metadata:
+                    self.send_metadata(slot)
+                if self.video_output == ANNOTATED:
+                    self.encode_queue.put((slot, frame))
+                else:
+                    self._release_frame(slot)
 
         except Exception as e:
             raise RuntimeError(f"Error during video processing: {e}")
+        finally:
+            if self._subscription is not None:
+                self.ingest.unsubscribe(self._subscription)
+                self._subscription = None
+            self.decode_queue.close()
+            self.encode_queue.close()
+            # The stream is over; lets the clip reader flush what it has instead of waiting for more
+            self._stop_event.set()
+            for thread in (self.encode_thread, self.clip_thread):
+                if thread is not None:
+                    thread.join(timeout=5)
+            if self.ingest is not None:
+                self.decode_queue.drain()
+                self.encode_queue.drain()
+                if self.clip_buffer is not None and self.video_output != ANNOTATED:
+                    # Whatever was recorded of clips still waiting for their post-roll
+                    self._flush_pending_clips(force=True)
+                release_shared_ingest(self.ingest)
+            if self.algorithm_ready:
+                self.algorithm.teardown()
+                self.algorithm_ready = False
 
     def stop_app(self):
         self._stop_event.set()
 
-        # Stop subprocesses
-        if self.ffmpeg:
-            self.ffmpeg.terminate()
-        if self.process:
-            self.process.terminate()
-
-        # Wait or kill subprocesses
-        try:
-            if self.ffmpeg:
-                self.ffmpeg.wait(timeout=5)
-            if self.process:
-                self.process.wait(timeout=5)
-        except subprocess.TimeoutExpired:
-            if self.ffmpeg:
-                self.ffmpeg.kill()
-            if self.process:
-                self.process.kill()
+        # Stop the output; the shared ingest is released by process_video
+        process = self.process
+        if process:
+            process.terminate()
+            try:
+                process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                process.kill()
 
         # Clean up Kafka
-        if self.consumer:
-            self.consumer.close()
+        if self.telemetry_hub:
+            release_telemetry_hub(self.telemetry_hub)
+            self.telemetry_hub = None
+        if self.alert_publisher:
+            release_alert_publisher(self.alert_publisher)
+            self.alert_publisher = None
 
         # Clean up threads
         if self.video_thread:
             self.video_thread.join()
-        if self.telemetry_thread:
-            self.telemetry_thread.join()
+        unregister_stream(self.metrics)
+
+        # Clean up MinIO, after the last clips were queued
+        if self.upload_service:
+            release_upload_service(self.upload_service)
+            self.upload_service = None
 
         self.running = False
         print("Processor stopped cleanly.")
\ No newline at end of file
@@ -1,19 +1,52 @@
-from typing import List
+import importlib
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from threading import Lock
+from typing import List, Optional
+from .backends import BACKENDS, load_model
 
 _algorithm_registry = {}
 _model_registry = {}
 _algorithm_model_registry={}
+_model_backend_registry = {}
 
 def register_algorithm(name: str, cls):
+    """`cls` is the algorithm class or a "module:Class" path, imported when the algorithm is first used."""
     _algorithm_registry[name] = cls
 
-def register_model(name: str, path):
+def register_model(name: str, path, backend: str = "torch", **options):
+    """
+    `backend` is torch, onnxruntime or openvino; `options` (int8, imgsz,
+    calibration_data) control how the weights are exported for it.
+    """
     _model_registry[name] = path
+    set_model_backend(name, backend, **options)
+
+def set_model_backend(name: str, backend: str, **options):
+    """Run an already registered model on another backend, e.g. a bundled model on openvino."""
+    if name not in _model_registry:
+        raise ValueError(f"Model '{name}' is not registered. Available models: '{list_models()}")
+    if backend not in _backend_loaders:
+        raise ValueError(f"Backend '{backend}' is not registered. Available backends: '{list(_backend_loaders)}'")
+    _model_backend_registry[name] = (backend, options)
+
+def get_model_backend(name: str) -> str:
+    return _model_backend_registry.get(name, ("torch", {}))[0]
 
 def get_algorithm(name: str, *args, **kwargs):
     if name not in _algorithm_registry:
         raise ValueError(f"Algorithm '{name}' is not registered. Available algorithms: '{list_algorithms()}")
-    return _algorithm_registry[name](*args, **kwargs)
+    return get_algorithm_class(name)(*args, **kwargs)
+
+def get_algorithm_class(name: str):
+    cls = _algorithm_registry[name]
+    if isinstance(cls, str):
+        module_name, _, class_name = cls.partition(":")
+        cls = getattr(importlib.import_module(module_name), class_name)
+        _algorithm_registry[name] = cls
+    return cls
 
 # def get_model_path(name: str):
 #     if name not in _model_registry:
@@ -48,4 +81,168 @@ def get_model_path_for_algorithm(algorithm_name:str, name: str):
         raise ValueError(f"Algorithm '{algorithm_name}' does not require a model.")
     if name not in list(_algorithm_model_registry.get(algorithm_name, [])):
         raise ValueError(f"Model '{name}' can not be used with {algorithm_name}'. Available models: '{list_models_for_algorithm(algorithm_name)}")
-    return _model_registry[name]
\ No newline at end of file
+    return _model_registry[name]
+
+
+def registrations() -> dict:
+    """Everything registered so far, for a worker process that does not inherit this one's memory."""
+    return {
+        "algorithms": dict(_algorithm_registry),
+        "models": dict(_model_registry),
+        "algorithm_models": {algorithm: set(models) for algorithm, models in _algorithm_model_registry.items()},
+        "model_backends": dict(_model_backend_registry),
+    }
+
+def restore_registrations(state: dict):
+    _algorithm_registry.update(state["algorithms"])
+    _model_registry.update(state["models"])
+    for algorithm, models in state["algorithm_models"].items():
+        _algorithm_model_registry.setdefault(algorithm, set()).update(models)
+    _model_backend_registry.update(state["model_backends"])
+
+
+def _loader(backend: str):
+    def load(path, **options):
+        return load_model(path, backend, **options)
+    return load
+
+_backend_loaders = {backend: _loader(backend) for backend in BACKENDS}
+
+
+def _estimate_memory(model, path) -> int:
+    """Bytes held by the model's weights, falling back to the size of the weights file."""
+    try:
+        inner = getattr(model, "model", model)
+        total = sum(t.numel() * t.element_size() for t in inner.parameters())
+        total += sum(t.numel() * t.element_size() for t in inner.buffers())
+        return int(total)
+    except Exception:
+        try:
+            return os.path.getsize(path)
+        except (OSError, TypeError):
+            return 0
+
+
+class _PooledModel:
+    def __init__(self, model, path, backend, memory):
+        self.model = model
+        self.path = path
+        self.backend = backend
+        self.memory = memory
+        self.refcount = 0
+        self.loaded_at = time.time()
+        self.last_used = self.loaded_at
+
+
+class ModelPool:
+    """
+    Process-wide cache of loaded model weights, keyed by (model name, backend).
+
+    Every algorithm instance that uses the same model shares one copy. Models
+    nobody references stay resident until they are the least recently used
+    idle entry and either `max_idle_models` or `max_memory_mb` is exceeded.
+
+    Weights are loaded (and exported) outside the pool lock, so a slow load
+    only holds up the callers that wait for that same model.
+    """
+
+    def __init__(self, max_memory_mb: Optional[float] = None, max_idle_models: int = 4):
+        self.max_memory_mb = max_memory_mb
+        self.max_idle_models = max_idle_models
+        self._entries = OrderedDict()
+        # (name, backend) -> Future resolved once the load in progress finishes
+        self._loading = {}
+        self._lock = Lock()
+
+    def configure(self, max_memory_mb: Optional[float] = None, max_idle_models: int = 4):
+        with self._lock:
+            self.max_memory_mb = max_memory_mb
+            self.max_idle_models = max_idle_models
+            self._evict()
+
+    def acquire(self, name: str, backend: str = "torch", path=None):
+        """Return the shared model for `name`, loading it on first use."""
+        key = (name, backend)
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry.refcount += 1
+                    entry.last_used = time.time()
+                    self._entries.move_to_end(key)
+                    return entry.model
+                loading = self._loading.get(key)
+                if loading is None:
+                    if backend not in _backend_loaders:
+                        raise ValueError(f"Backend '{backend}' is not registered. Available backends: '{list(_backend_loaders)}'")
+                    path = path or _model_registry.get(name)
+                    if path is None:
+                        raise ValueError(f"Model '{name}' is not registered. Available models: '{list_models()}")
+                    loading = self._loading[key] = Future()
+                    break
+            # Raises what the load raised; otherwise the model is now resident (or already evicted again)
+            loading.result()
+
+        try:
+            options = _model_backend_registry.get(name, ("torch", {}))[1]
+            model = _backend_loaders[backend](path, **options)
+            with self._lock:
+                entry = _PooledModel(model, path, backend, _estimate_memory(model, path))
+                self._entries[key] = entry
+                # Referenced before evicting, so the new model is not a candidate itself
+                entry.refcount += 1
+                self._evict()
+                if self._over_ceiling():
+                    del self._entries[key]
+                    raise MemoryError(
+                        f"Loading '{name}' ({entry.memory / 2**20:.1f} MB) exceeds the model pool limit of {self.max_memory_mb} MB.")
+        except BaseException as e:
+            with self._lock:
+                del self._loading[key]
+            loading.set_exception(e)
+            raise
+        with self._lock:
+            del self._loading[key]
+        loading.set_result(None)
+        return model
+
+    def release(self, name: str, backend: str = "torch"):
+        key = (name, backend)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            entry.refcount = max(0, entry.refcount - 1)
+            entry.last_used = time.time()
+            self._entries.move_to_end(key)
+            self._evict()
+
+    def _memory(self) -> int:
+        return sum(entry.memory for entry in self._entries.values())
+
+    def _over_ceiling(self) -> bool:
+        return self.max_memory_mb is not None and self._memory() > self.max_memory_mb * 2**20
+
+    def _evict(self):
+        # OrderedDict order is least recently used first
+        idle = [key for key, entry in self._entries.items() if entry.refcount == 0]
+        while idle and (len(idle) > self.max_idle_models or self._over_ceiling()):
+            del self._entries[idle.pop(0)]
+
+    def stats(self) -> List[dict]:
+        with self._lock:
+            return [{
+                "model": name,
+                "backend": backend,
+                "path": entry.path,
+                "references": entry.refcount,
+                "memory_mb": round(entry.memory / 2**20, 2),
+                "last_used": entry.last_used,
+            } for (name, backend), entry in self._entries.items()]
+
+
+model_pool = ModelPool()
+
+
+def list_resident_models() -> List[dict]:
+    return model_pool.stats()
@@ -0,0 +1,47 @@
+from dataclasses import replace
+import numpy as np
+
+
+class Letterbox:
+    """
+    Geometry of fitting a `width`x`height` frame into a `size`x`size` square
+    without distorting it: scale down to fit, then pad the borders evenly.
+    Used to have ffmpeg produce inference-size frames and to map the
+    detections made on them back onto the full-resolution frame.
+    """
+
+    def __init__(self, width: int, height: int, size: int):
+        self.width = width
+        self.height = height
+        self.size = size
+        scale = min(size / width, size / height)
+        # Same rounding as ffmpeg's scale (force_divisible_by=2) and pad filters on yuv420p input
+        self.scaled_width = max(2, int(round(width * scale)) // 2 * 2)
+        self.scaled_height = max(2, int(round(height * scale)) // 2 * 2)
+        self.pad_x = (size - self.scaled_width) // 2 // 2 * 2
+        self.pad_y = (size - self.scaled_height) // 2 // 2 * 2
+        self.scale_x = self.scaled_width / width
+        self.scale_y = self.scaled_height / height
+
+    @staticmethod
+    def ffmpeg_filter(size: int, pad_color: str = "0x727272") -> str:
+        """
+        Filter producing the letterbox for whatever resolution the input has,
+        so ffmpeg can be started before the resolution is known and keeps
+        letterboxing correctly if it changes mid-stream.
+        """
+        return (f"scale={size}:{size}:force_original_aspect_ratio=decrease:force_divisible_by=2,"
+                f"pad={size}:{size}:(ow-iw)/2:(oh-ih)/2:color={pad_color}")
+
+    def to_output(self, xyxy):
+        """Map xyxy boxes from the letterboxed frame to full-resolution coordinates."""
+        boxes = np.asarray(xyxy, dtype=np.float32).reshape(-1, 4).copy()
+        boxes[:, [0, 2]] = np.clip((boxes[:, [0, 2]] - self.pad_x) / self.scale_x, 0, self.width)
+        boxes[:, [1, 3]] = np.clip((boxes[:, [1, 3]] - self.pad_y) / self.scale_y, 0, self.height)
+        return boxes
+
+    def rescale(self, detections):
+        """Copy of `detections` with boxes in full-resolution coordinates."""
+        if detections is None or not len(detections):
+            return detections
+        return replace(detections, xyxy=self.to_output(detections.xyxy).astype(detections.xyxy.dtype))
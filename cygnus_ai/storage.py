@@ -0,0 +1,244 @@
+import io
+import queue
+import time
+from threading import Lock, Thread
+from .metrics import PREFIX, Histogram, register_collector
+
+_services = {}
+_services_lock = Lock()
+
+# Smallest part size S3 accepts; larger objects are sent as a multipart upload
+MIN_PART_SIZE = 5 * 1024 * 1024
+
+
+class _Upload:
+    __slots__ = ("bucket", "object_name", "data", "content_type", "stream", "queued_at")
+
+    def __init__(self, bucket: str, object_name: str, data, content_type: str, stream: str = None):
+        self.bucket = bucket
+        self.object_name = object_name
+        self.data = data
+        self.content_type = content_type
+        self.stream = stream
+        self.queued_at = time.monotonic()
+
+
+class UploadService:
+    """
+    Object uploads for the whole application: one MinIO client with a
+    connection pool sized to the worker count, a bounded queue and a fixed
+    set of worker threads.
+
+    `submit` never blocks. The payload is either the object's bytes or a
+    callable producing them, which then runs on the worker (e.g. to remux a
+    clip off the video threads). Objects are streamed from memory with
+    `put_object`, as a multipart upload once they exceed `part_size`, and
+    failed uploads are retried with exponential backoff. At most
+    `per_stream_limit` uploads of one stream are queued or running at a
+    time, so a single stream raising alerts non-stop cannot take every
+    worker and queue slot from the others.
+
+    Pass `client` to use an already configured client, e.g. one pointing at
+    a local MinIO-compatible server.
+    """
+
+    def __init__(self, server: str = None, key: str = None, secret: str = None, secure: bool = False,
+                 workers: int = 4, queue_size: int = 100, part_size: int = MIN_PART_SIZE,
+                 retries: int = 3, retry_backoff_s: float = 1.0, per_stream_limit: int = 2, client=None):
+        self.server = server
+        self.key = key
+        self.client = client if client is not None else _make_client(server, key, secret, secure, workers)
+        self.part_size = max(MIN_PART_SIZE, int(part_size))
+        self.retries = retries
+        self.retry_backoff_s = retry_backoff_s
+        self.per_stream_limit = per_stream_limit
+        self.refcount = 0
+
+        self.submitted = 0
+        self.uploaded = 0
+        self.failed = 0
+        self.rejected = 0
+        self.retried = 0
+        self.bytes_uploaded = 0
+        self.upload_seconds = 0.0
+        self.latency = Histogram()
+        self._stats_lock = Lock()
+        # Uploads queued or running, per stream
+        self._in_flight = {}
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._workers = [Thread(target=self._run, name=f"upload-{index}", daemon=True) for index in range(workers)]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, bucket: str, object_name: str, data, content_type: str = "application/octet-stream",
+               stream: str = None) -> bool:
+        """
+        Queue one upload on behalf of `stream`. Returns False, without
+        blocking, if the queue is full or the stream is at its limit.
+        """
+        with self._stats_lock:
+            if stream is not None and self.per_stream_limit and \
+                    self._in_flight.get(stream, 0) >= self.per_stream_limit:
+                self.rejected += 1
+                print(f"Too many uploads pending for {stream}, dropping {bucket}/{object_name}")
+                return False
+            if stream is not None:
+                self._in_flight[stream] = self._in_flight.get(stream, 0) + 1
+        try:
+            self._queue.put_nowait(_Upload(bucket, object_name, data, content_type, stream))
+        except queue.Full:
+            self._done(stream)
+            self.rejected += 1
+            print(f"Upload queue full, dropping {bucket}/{object_name}")
+            return False
+        self.submitted += 1
+        return True
+
+    def _done(self, stream: str):
+        if stream is None:
+            return
+        with self._stats_lock:
+            remaining = self._in_flight.get(stream, 0) - 1
+            if remaining > 0:
+                self._in_flight[stream] = remaining
+            else:
+                self._in_flight.pop(stream, None)
+
+    def _upload(self, job: _Upload):
+        data = job.data() if callable(job.data) else job.data
+        if not data:
+            raise ValueError("nothing to upload")
+        for attempt in range(self.retries + 1):
+            started_at = time.monotonic()
+            try:
+                self.client.put_object(job.bucket, job.object_name, io.BytesIO(data), len(data),
+                                       content_type=job.content_type, part_size=self.part_size)
+            except Exception as e:
+                if attempt == self.retries:
+                    raise
+                self.retried += 1
+                print(f"Upload of {job.bucket}/{job.object_name} failed ({e}), retrying")
+                time.sleep(self.retry_backoff_s * 2 ** attempt)
+                continue
+            elapsed = time.monotonic() - started_at
+            with self._stats_lock:
+                self.uploaded += 1
+                self.bytes_uploaded += len(data)
+                self.upload_seconds += elapsed
+                self.latency.observe(elapsed)
+            return
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                break
+            try:
+                self._upload(job)
+                print(f"File uploaded successfully to MinIO as {job.object_name}")
+            except Exception as e:
+                self.failed += 1
+                print(f"Failed to upload file to MinIO: {e}")
+            finally:
+                self._done(job.stream)
+                self._queue.task_done()
+
+    def check_bucket(self, bucket: str) -> bool:
+        """Whether `bucket` is reachable; also opens a pooled connection ahead of the first upload."""
+        try:
+            return bool(self.client.bucket_exists(bucket))
+        except Exception as e:
+            print(f"MinIO bucket '{bucket}' not reachable on {self.server}: {e}")
+            return False
+
+    def join(self):
+        """Block until every queued upload has finished."""
+        self._queue.join()
+
+    def close(self):
+        self.join()
+        for _ in self._workers:
+            self._queue.put(None)
+        for worker in self._workers:
+            worker.join(timeout=5)
+
+    def stats(self) -> dict:
+        return {
+            "server": self.server,
+            "workers": len(self._workers),
+            "queue_depth": self._queue.qsize(),
+            "queue_size": self._queue.maxsize,
+            "submitted": self.submitted,
+            "uploaded": self.uploaded,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "retried": self.retried,
+            "per_stream_limit": self.per_stream_limit,
+            "streams_in_flight": dict(self._in_flight),
+            "bytes_uploaded": self.bytes_uploaded,
+            "bytes_per_second": round(self.bytes_uploaded / self.upload_seconds, 1) if self.upload_seconds else 0.0,
+        }
+
+
+def _make_client(server: str, key: str, secret: str, secure: bool, workers: int):
+    import urllib3
+    from minio import Minio
+    # One keep-alive connection per worker
+    http_client = urllib3.PoolManager(
+        maxsize=workers,
+        timeout=urllib3.Timeout(connect=10, read=60),
+        retries=urllib3.Retry(total=3, backoff_factor=0.2, status_forcelist=[500, 502, 503, 504]),
+    )
+    return Minio(server, access_key=key, secret_key=secret, secure=secure, http_client=http_client)
+
+
+def get_upload_service(server: str, key: str, secret: str, **options) -> UploadService:
+    """Return the upload service shared by all processors using `server`, starting it on first use."""
+    with _services_lock:
+        service = _services.get((server, key))
+        if service is None:
+            service = UploadService(server, key, secret, **options)
+            _services[(server, key)] = service
+        service.refcount += 1
+        return service
+
+
+def release_upload_service(service: UploadService):
+    with _services_lock:
+        service.refcount -= 1
+        if service.refcount > 0:
+            return
+        _services.pop((service.server, service.key), None)
+    service.close()
+
+
+def list_upload_services():
+    with _services_lock:
+        return [service.stats() for service in _services.values()]
+
+
+def _metric_families():
+    with _services_lock:
+        services = list(_services.values())
+    if not services:
+        return []
+    samples = [({"server": service.server or ""}, service) for service in services]
+    return [
+        (f"{PREFIX}upload_seconds", "histogram", "Duration of one successful object upload.",
+         [(labels, service.latency.snapshot()) for labels, service in samples]),
+        (f"{PREFIX}upload_queue_depth", "gauge", "Uploads waiting for a worker.",
+         [(labels, service._queue.qsize()) for labels, service in samples]),
+        (f"{PREFIX}uploads_total", "counter", "Objects uploaded.",
+         [(labels, service.uploaded) for labels, service in samples]),
+        (f"{PREFIX}upload_failures_total", "counter", "Uploads that failed after all retries.",
+         [(labels, service.failed) for labels, service in samples]),
+        (f"{PREFIX}upload_rejected_total", "counter",
+         "Uploads refused because the queue was full or their stream had too many pending.",
+         [(labels, service.rejected) for labels, service in samples]),
+        (f"{PREFIX}upload_bytes_total", "counter", "Bytes uploaded.",
+         [(labels, service.bytes_uploaded) for labels, service in samples]),
+    ]
+
+
+register_collector(_metric_families)
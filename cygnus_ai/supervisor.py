@@ -0,0 +1,295 @@
+import multiprocessing
+import signal
+import time
+import uuid
+from threading import Lock, Thread
+from .metrics import PREFIX, add_labels, collect
+from .ingest import CONNECTING, RECONNECTING
+from .registry import registrations, restore_registrations
+
+# Workers are forked from a fork server: a clean, single-threaded process. Forking the
+# API process itself could copy a lock held by one of its Kafka, telemetry or inference
+# threads (or torch/OpenMP state) into the worker and deadlock it.
+_context = multiprocessing.get_context("forkserver")
+_context.set_forkserver_preload(["cygnus_ai.api"])
+
+
+class StreamStartError(Exception):
+    """A worker could not build its stream processor. `invalid` marks bad request data."""
+
+    def __init__(self, message: str, invalid: bool = False):
+        super().__init__(message)
+        self.invalid = invalid
+
+
+def _worker_main(build, data, registered, conn, stop_event, frames, heartbeat):
+    """Entry point of a worker process: one stream processor, reporting progress to the supervisor."""
+    # Stopping goes through stop_event; keep SIGINT on the terminal from tearing the worker down mid-frame
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    try:
+        restore_registrations(registered)
+        processor = build(data)
+    except Exception as e:
+        conn.send(("error", str(e), isinstance(e, (ValueError, TypeError))))
+        conn.close()
+        return
+    conn.send(("ok", None, False))
+
+    processor.video_thread = Thread(target=processor.process_video, daemon=True)
+    processor.video_thread.start()
+    while processor.video_thread.is_alive() and not stop_event.is_set():
+        heartbeat.value = time.time()
+        # Frames through the algorithm, whatever (if anything) is encoded afterwards
+        frames.value = processor.metrics.histograms["process_frame"].count
+        # The API process serves /metrics for its workers
+        try:
+            conn.send(("metrics", collect(), False))
+            conn.send(("input", processor.input_stats(), False))
+        except OSError:
+            pass  # The supervisor closed its end: we are being stopped
+        stop_event.wait(1.0)
+    conn.close()
+    failed = not stop_event.is_set()
+    processor.stop_app()
+    if failed:
+        # Non-zero exit code: the supervisor restarts the stream
+        raise SystemExit(1)
+
+
+class _Worker:
+    def __init__(self, stream_id: str, data: dict):
+        self.stream_id = stream_id
+        self.data = data
+        self.process = None
+        self.conn = None
+        self.metrics = []
+        self.input = {}
+        self.stop_event = None
+        self.frames = None
+        self.heartbeat = None
+        self.started_at = None
+        self.last_frames = 0
+        self.last_progress_at = None
+        self.restarts = 0
+        self.restart_times = []
+        # Monotonic time of the next restart attempt while backing off
+        self.restart_at = None
+        self.stopping = False
+        self.failed = False
+
+    def alive(self) -> bool:
+        return self.process is not None and self.process.is_alive()
+
+    def stats(self) -> dict:
+        return {
+            "stream_id": self.stream_id,
+            "pid": self.process.pid if self.process else None,
+            "alive": self.alive(),
+            "input_uuid": self.data.get("inputUuid"),
+            "algorithm": self.data.get("algorithm") or self.data.get("algorithms"),
+            "frames": self.frames.value if self.frames else 0,
+            "input": self.input,
+            "heartbeat_age_s": round(time.time() - self.heartbeat.value, 1) if self.heartbeat else None,
+            "restarts": self.restarts,
+            "restart_in_s": round(max(0.0, self.restart_at - time.monotonic()), 1) if self.restart_at else None,
+            "failed": self.failed,
+            "uptime_s": round(time.monotonic() - self.started_at, 1) if self.started_at else None,
+        }
+
+
+class StreamSupervisor:
+    """
+    Runs every stream processor in its own worker process, so streams do not
+    share a GIL.
+
+    `build(data)` turns the JSON of a /start request into a ready (not yet
+    running) processor; it is pickled and called inside the worker, which
+    starts with the algorithms and models registered here but none of this
+    process's other state. A monitor thread restarts workers that exit
+    unexpectedly or stop producing frames for `stall_timeout_s`, backing off
+    between attempts and giving up after `max_restarts` restarts within
+    `restart_window_s`.
+    """
+
+    def __init__(self, build, start_timeout_s: float = 30, stall_timeout_s: float = 60,
+                 check_interval_s: float = 2, max_restarts: int = 5, restart_window_s: float = 300,
+                 restart_backoff_s: float = 1.0, stop_timeout_s: float = 10):
+        self.build = build
+        self.start_timeout_s = start_timeout_s
+        self.stall_timeout_s = stall_timeout_s
+        self.check_interval_s = check_interval_s
+        self.max_restarts = max_restarts
+        self.restart_window_s = restart_window_s
+        self.restart_backoff_s = restart_backoff_s
+        self.stop_timeout_s = stop_timeout_s
+        self._workers = {}
+        self._lock = Lock()
+        self._monitor = Thread(target=self._monitor_loop, name="stream-supervisor", daemon=True)
+        self._monitor.start()
+
+    def start(self, data: dict) -> str:
+        """Start a worker for one stream. Raises StreamStartError if its processor cannot be built."""
+        worker = _Worker(str(uuid.uuid4()), data)
+        self._spawn(worker)
+        with self._lock:
+            self._workers[worker.stream_id] = worker
+        return worker.stream_id
+
+    def _spawn(self, worker: _Worker):
+        parent_conn, child_conn = _context.Pipe(duplex=False)
+        worker.stop_event = _context.Event()
+        worker.frames = _context.Value("q", 0, lock=False)
+        worker.heartbeat = _context.Value("d", time.time(), lock=False)
+        worker.process = _context.Process(
+            target=_worker_main,
+            args=(self.build, worker.data, registrations(), child_conn, worker.stop_event, worker.frames,
+                  worker.heartbeat),
+            name=f"cygnus-{worker.data.get('inputUuid')}",
+            daemon=True,
+        )
+        try:
+            worker.process.start()
+        except Exception as e:
+            # E.g. a registered algorithm that cannot be pickled
+            parent_conn.close()
+            child_conn.close()
+            worker.process = None
+            raise StreamStartError(f"Could not start a worker process: {e}") from e
+        child_conn.close()
+        status, message, invalid = "error", "worker did not report back", False
+        if parent_conn.poll(self.start_timeout_s):
+            try:
+                status, message, invalid = parent_conn.recv()
+            except EOFError:
+                message = "worker exited during start-up"
+        if status != "ok":
+            parent_conn.close()
+            self._terminate(worker)
+            raise StreamStartError(message, invalid)
+        worker.conn = parent_conn
+        worker.metrics = []
+        worker.started_at = worker.last_progress_at = time.monotonic()
+        worker.last_frames = 0
+        worker.input = {}
+
+    def _terminate(self, worker: _Worker):
+        if worker.process is None:
+            return
+        worker.stop_event.set()
+        if worker.conn is not None:
+            # A worker blocked on sending metrics would never see the stop event
+            worker.conn.close()
+            worker.conn = None
+        worker.process.join(self.stop_timeout_s)
+        if worker.process.is_alive():
+            worker.process.terminate()
+            worker.process.join(5)
+            if worker.process.is_alive():
+                worker.process.kill()
+                worker.process.join()
+
+    def stop(self, stream_id: str) -> bool:
+        with self._lock:
+            worker = self._workers.pop(stream_id, None)
+        if worker is None:
+            return False
+        worker.stopping = True
+        self._terminate(worker)
+        return True
+
+    def stop_all(self):
+        with self._lock:
+            stream_ids = list(self._workers)
+        for stream_id in stream_ids:
+            self.stop(stream_id)
+
+    def __contains__(self, stream_id: str) -> bool:
+        with self._lock:
+            return stream_id in self._workers
+
+    def _check(self, worker: _Worker):
+        if worker.stopping or worker.failed:
+            return
+        if worker.restart_at is not None:
+            if time.monotonic() >= worker.restart_at:
+                self._respawn(worker)
+            return
+        self._receive(worker)
+        now = time.monotonic()
+        if worker.frames.value != worker.last_frames:
+            worker.last_frames = worker.frames.value
+            worker.last_progress_at = now
+        elif worker.input.get("state") in (CONNECTING, RECONNECTING):
+            # The worker is waiting for its input, which it reconnects by itself; a restart would not help
+            worker.last_progress_at = now
+        if worker.process is None:
+            reason = "could not be started"
+        elif not worker.alive():
+            reason = f"exited with code {worker.process.exitcode}"
+        elif now - worker.last_progress_at > self.stall_timeout_s:
+            reason = f"produced no frames for {self.stall_timeout_s:.0f}s"
+        else:
+            return
+        print(f"Worker for stream {worker.data.get('inputUuid')} {reason}, restarting")
+        self._terminate(worker)
+        self._restart(worker)
+
+    def _receive(self, worker: _Worker):
+        try:
+            while worker.conn is not None and worker.conn.poll():
+                kind, payload, _ = worker.conn.recv()
+                if kind == "metrics":
+                    worker.metrics = payload
+                elif kind == "input":
+                    worker.input = payload
+        except (EOFError, OSError):
+            pass
+
+    def _restart(self, worker: _Worker):
+        now = time.monotonic()
+        worker.restart_times = [t for t in worker.restart_times if now - t < self.restart_window_s]
+        if len(worker.restart_times) >= self.max_restarts:
+            print(f"Giving up on stream {worker.data.get('inputUuid')} after {self.max_restarts} restarts")
+            worker.failed = True
+            return
+        # Restarted by a later check, so backing off does not hold up the checks of other workers
+        worker.restart_at = now + self.restart_backoff_s * 2 ** len(worker.restart_times)
+
+    def _respawn(self, worker: _Worker):
+        worker.restart_at = None
+        worker.restart_times.append(time.monotonic())
+        worker.restarts += 1
+        try:
+            self._spawn(worker)
+        except StreamStartError as e:
+            print(f"Failed to restart stream {worker.data.get('inputUuid')}: {e}")
+
+    def _monitor_loop(self):
+        while True:
+            time.sleep(self.check_interval_s)
+            with self._lock:
+                workers = list(self._workers.values())
+            for worker in workers:
+                try:
+                    self._check(worker)
+                except Exception as e:
+                    print(f"Supervisor check failed for stream {worker.stream_id}: {e}")
+
+    def stats(self):
+        with self._lock:
+            return [worker.stats() for worker in self._workers.values()]
+
+    def metric_families(self) -> list:
+        """Latest metrics reported by every worker, plus the supervisor's own."""
+        with self._lock:
+            workers = list(self._workers.values())
+        families = []
+        for worker in workers:
+            families.extend(add_labels(worker.metrics, worker=worker.stream_id))
+        families.append((f"{PREFIX}worker_restarts_total", "counter", "Times a stream's worker process was restarted.",
+                         [({"worker": worker.stream_id, "stream": worker.data.get("inputUuid") or ""}, worker.restarts)
+                          for worker in workers]))
+        families.append((f"{PREFIX}worker_up", "gauge", "Whether a stream's worker process is running.",
+                         [({"worker": worker.stream_id, "stream": worker.data.get("inputUuid") or ""}, int(worker.alive()))
+                          for worker in workers]))
+        return families
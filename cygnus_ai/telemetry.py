@@ -0,0 +1,138 @@
+import json
+import time
+from threading import Event, Lock, Thread
+
+_hubs = {}
+_hubs_lock = Lock()
+
+
+class TelemetryHub:
+    """
+    One Kafka consumer per telemetry topic for the whole application.
+
+    Every record is deserialised once; GPS positions are stored in a plain
+    dict keyed by uuid. Writers only ever replace whole entries and readers
+    only call `get`, so processors look up their position without taking a
+    lock.
+    """
+
+    def __init__(self, server: str, topic: str, lag_interval_s: float = 5.0):
+        self.server = server
+        self.topic = topic
+        self.lag_interval_s = lag_interval_s
+        self.refcount = 0
+        self.consumer = None
+        self._positions = {}
+        self._stop_event = Event()
+
+        self.messages = 0
+        self.message_rate = 0.0
+        self.lag = None
+        self._window_start = time.monotonic()
+        self._window_messages = 0
+        self._last_lag_check = 0.0
+
+        self._thread = Thread(target=self._run, name=f"telemetry-{topic}", daemon=True)
+        self._thread.start()
+
+    def get_position(self, uuid: str):
+        """Latest (latitude, longitude) reported for `uuid`, or None."""
+        return self._positions.get(uuid)
+
+    def _connect(self):
+        from kafka import KafkaConsumer
+        self.consumer = KafkaConsumer(
+            self.topic,
+            bootstrap_servers=[self.server],
+            auto_offset_reset='latest',
+            value_deserializer=_deserialize,
+        )
+
+    def _dispatch(self, msg_value):
+        if isinstance(msg_value, dict) and msg_value.get("type") == "GPS_RAW_INT":
+            uuid = msg_value.get("uuid")
+            latitude = msg_value.get("latitude")
+            longitude = msg_value.get("longitude")
+            if uuid is not None and None not in (latitude, longitude):
+                self._positions[uuid] = (latitude, longitude)
+
+    def _update_metrics(self, count: int):
+        now = time.monotonic()
+        self.messages += count
+        self._window_messages += count
+        elapsed = now - self._window_start
+        if elapsed >= 1.0:
+            self.message_rate = self._window_messages / elapsed
+            self._window_start = now
+            self._window_messages = 0
+        if now - self._last_lag_check >= self.lag_interval_s:
+            self._last_lag_check = now
+            partitions = self.consumer.assignment()
+            if partitions:
+                end_offsets = self.consumer.end_offsets(list(partitions))
+                self.lag = sum(max(0, end_offsets[tp] - self.consumer.position(tp)) for tp in partitions)
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                if self.consumer is None:
+                    self._connect()
+                records = self.consumer.poll(timeout_ms=1000)
+                count = 0
+                for tp, record_list in records.items():
+                    for record in record_list:
+                        self._dispatch(record.value)
+                    count += len(record_list)
+                self._update_metrics(count)
+            except Exception as e:
+                print(f"Telemetry consumer error on '{self.topic}': {e}")
+                self._stop_event.wait(1.0)
+        if self.consumer is not None:
+            self.consumer.close()
+
+    def close(self):
+        self._stop_event.set()
+        self._thread.join(timeout=5)
+
+    def stats(self) -> dict:
+        return {
+            "topic": self.topic,
+            "streams": self.refcount,
+            "tracked_uuids": len(self._positions),
+            "messages": self.messages,
+            "messages_per_second": round(self.message_rate, 2),
+            "lag": self.lag,
+        }
+
+
+def _deserialize(message: bytes):
+    try:
+        return json.loads(message.decode('utf-8'))
+    except ValueError:
+        return None
+
+
+def get_telemetry_hub(server: str, topic: str) -> TelemetryHub:
+    """Return the consumer shared by every processor reading `topic`, starting it on first use."""
+    key = (server, topic)
+    with _hubs_lock:
+        hub = _hubs.get(key)
+        if hub is None:
+            hub = TelemetryHub(server, topic)
+            _hubs[key] = hub
+        hub.refcount += 1
+        return hub
+
+
+def release_telemetry_hub(hub: TelemetryHub):
+    with _hubs_lock:
+        hub.refcount -= 1
+        if hub.refcount > 0:
+            return
+        _hubs.pop((hub.server, hub.topic), None)
+    hub.close()
+
+
+def list_telemetry_hubs():
+    with _hubs_lock:
+        return [hub.stats() for hub in _hubs.values()]
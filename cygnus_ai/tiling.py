@@ -0,0 +1,152 @@
+from dataclasses import replace
+import numpy as np
+
+
+def tile_grid(width: int, height: int, tile_size: int, overlap: float) -> list:
+    """Overlapping `tile_size` squares, as (x0, y0, x1, y1), covering a `width`x`height` frame."""
+    def starts(length):
+        if length <= tile_size:
+            return [0]
+        step = max(1, int(tile_size * (1 - overlap)))
+        count = int(np.ceil((length - tile_size) / step)) + 1
+        # Spread the tiles evenly so the last one ends on the border instead of hanging over it
+        return [int(round(index * (length - tile_size) / (count - 1))) for index in range(count)]
+
+    return [(x, y, min(x + tile_size, width), min(y + tile_size, height))
+            for y in starts(height) for x in starts(width)]
+
+
+def _intersection_over_smaller(box, boxes):
+    top_left = np.maximum(box[:2], boxes[:, :2])
+    bottom_right = np.minimum(box[2:], boxes[:, 2:])
+    intersection = np.prod(np.clip(bottom_right - top_left, 0, None), axis=1)
+    areas = np.minimum(np.prod(box[2:] - box[:2]), np.prod(boxes[:, 2:] - boxes[:, :2], axis=1))
+    return intersection / np.maximum(areas, 1e-9)
+
+
+def merge_regions(parts: list, regions: list, threshold: float = 0.6):
+    """
+    Detections made on crops of one frame, as one set in frame coordinates.
+
+    Boxes are shifted by their region's offset, then merged greedily by
+    confidence: a box absorbs the boxes of the same class that it overlaps
+    by at least `threshold` of the smaller box, growing to cover them. An
+    object cut by a tile border thus comes out whole rather than as two
+    halves, which plain IoU-based NMS would keep.
+    """
+    shifted = []
+    for detections, (x0, y0, _, _) in zip(parts, regions):
+        if detections is None or not len(detections):
+            continue
+        offset = np.array([x0, y0, x0, y0], dtype=detections.xyxy.dtype)
+        shifted.append(replace(detections, xyxy=detections.xyxy + offset))
+    if not shifted:
+        return parts[0]
+    merged = shifted[0] if len(shifted) == 1 else type(shifted[0]).merge(shifted)
+
+    boxes = merged.xyxy.copy()
+    confidence = merged.confidence if merged.confidence is not None else np.ones(len(merged))
+    classes = merged.class_id if merged.class_id is not None else np.zeros(len(merged), dtype=int)
+    done = np.zeros(len(merged), dtype=bool)
+    keep = []
+    for index in np.argsort(-confidence):
+        if done[index]:
+            continue
+        done[index] = True
+        keep.append(index)
+        candidates = np.flatnonzero(~done & (classes == classes[index]))
+        if not len(candidates):
+            continue
+        absorbed = candidates[_intersection_over_smaller(boxes[index], boxes[candidates]) >= threshold]
+        if len(absorbed):
+            boxes[index, :2] = np.minimum(boxes[index, :2], boxes[absorbed, :2].min(axis=0))
+            boxes[index, 2:] = np.maximum(boxes[index, 2:], boxes[absorbed, 2:].max(axis=0))
+            done[absorbed] = True
+    keep = np.array(keep, dtype=int)
+    return replace(merged[keep], xyxy=boxes[keep])
+
+
+class Tiler:
+    """
+    Tiled inference for frames much larger than the model input.
+
+    The frame is split into overlapping `tile_size` tiles, each of which the
+    model sees at close to full resolution, so small distant objects survive
+    where downscaling the whole frame would erase them. With `full_frame`
+    the whole frame is run as well, for objects larger than a tile. All
+    regions are submitted to the inference server together and run as a
+    batch.
+
+    With `focus`, only the tiles around the previous detections are
+    re-scanned (plus the full frame), and every tile only on every
+    `full_scan_every`-th detector run.
+    """
+
+    def __init__(self, tile_size: int = 1024, overlap: float = 0.2, full_frame: bool = True, focus: bool = False,
+                 full_scan_every: int = 10, merge_threshold: float = 0.6):
+        if tile_size < 32:
+            raise ValueError("Tile size must be at least 32 pixels.")
+        if not 0 <= overlap < 1:
+            raise ValueError("Tile overlap must be between 0 and 1.")
+        if full_scan_every < 1:
+            raise ValueError("full_scan_every must be at least 1.")
+        self.tile_size = int(tile_size)
+        self.overlap = float(overlap)
+        self.full_frame = full_frame
+        self.focus = focus
+        self.full_scan_every = int(full_scan_every)
+        self.merge_threshold = merge_threshold
+        self.runs = 0
+        self.full_scans = 0
+        self.regions_run = 0
+        self._shape = None
+        self._grid = []
+        self._previous = None
+        self._runs_to_full_scan = 0
+
+    def regions(self, width: int, height: int) -> list:
+        """Regions, as (x0, y0, x1, y1), to run the detector on for the next frame."""
+        if (width, height) != self._shape:
+            self._shape = (width, height)
+            self._grid = tile_grid(width, height, self.tile_size, self.overlap)
+            self._previous = None
+            self._runs_to_full_scan = 0
+        self.runs += 1
+        if len(self._grid) == 1:
+            return [(0, 0, width, height)]
+
+        tiles = self._grid
+        if self.focus and self._runs_to_full_scan > 0:
+            self._runs_to_full_scan -= 1
+            tiles = []
+            if self._previous is not None:
+                # Boxes grown by their own size on every side, so moving objects stay inside a scanned tile
+                sizes = self._previous[:, 2:] - self._previous[:, :2]
+                areas = np.concatenate([self._previous[:, :2] - sizes, self._previous[:, 2:] + sizes], axis=1)
+                tiles = [tile for tile in self._grid
+                         if np.any((areas[:, 0] < tile[2]) & (areas[:, 2] > tile[0])
+                                   & (areas[:, 1] < tile[3]) & (areas[:, 3] > tile[1]))]
+        else:
+            self.full_scans += 1
+            self._runs_to_full_scan = self.full_scan_every - 1
+        return ([(0, 0, width, height)] if self.full_frame or not tiles else []) + tiles
+
+    def detect(self, frame, server, to_detections):
+        """
+        Detections on `frame`, from every selected region run as one batch on
+        the inference `server` and converted with `to_detections`.
+        """
+        regions = self.regions(frame.shape[1], frame.shape[0])
+        results = server.infer_many([frame[y0:y1, x0:x1] for x0, y0, x1, y1 in regions])
+        detections = merge_regions([to_detections(result) for result in results], regions, self.merge_threshold)
+        self.regions_run += len(regions)
+        self._previous = detections.xyxy if len(detections) else None
+        return detections
+
+    def stats(self) -> dict:
+        return {
+            "tiles": len(self._grid),
+            "runs": self.runs,
+            "full_scans": self.full_scans,
+            "regions_per_run": round(self.regions_run / self.runs, 2) if self.runs else 0.0,
+        }
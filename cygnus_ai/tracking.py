@@ -0,0 +1,68 @@
+from dataclasses import replace
+import numpy as np
+
+
+def box_iou(boxes_a, boxes_b):
+    """Pairwise IoU between two (N, 4) and (M, 4) xyxy arrays."""
+    boxes_a = np.asarray(boxes_a, dtype=np.float32).reshape(-1, 4)
+    boxes_b = np.asarray(boxes_b, dtype=np.float32).reshape(-1, 4)
+    top_left = np.maximum(boxes_a[:, None, :2], boxes_b[None, :, :2])
+    bottom_right = np.minimum(boxes_a[:, None, 2:], boxes_b[None, :, 2:])
+    intersection = np.prod(np.clip(bottom_right - top_left, 0, None), axis=2)
+    area_a = np.prod(boxes_a[:, 2:] - boxes_a[:, :2], axis=1)
+    area_b = np.prod(boxes_b[:, 2:] - boxes_b[:, :2], axis=1)
+    union = area_a[:, None] + area_b[None, :] - intersection
+    return intersection / np.maximum(union, 1e-9)
+
+
+class BoxTracker:
+    """
+    Carries detections across the frames on which the detector is skipped.
+
+    Every detector run is matched against the previous one (greedy IoU, same
+    class) to estimate a per-box velocity in pixels per frame. In between
+    runs the last detections are moved along that velocity, so boxes keep
+    following the objects instead of freezing until the next detection.
+    """
+
+    def __init__(self, iou_threshold: float = 0.3):
+        self.iou_threshold = iou_threshold
+        self._detections = None
+        self._velocity = None
+        self._frame_index = None
+
+    @property
+    def empty(self) -> bool:
+        return self._detections is None
+
+    def reset(self):
+        self._detections = None
+        self._velocity = None
+        self._frame_index = None
+
+    def update(self, detections, frame_index: int):
+        velocity = np.zeros((len(detections), 4), dtype=np.float32)
+        if self._detections is not None and len(detections) and len(self._detections):
+            elapsed = max(1, frame_index - self._frame_index)
+            iou = box_iou(detections.xyxy, self._detections.xyxy)
+            if detections.class_id is not None and self._detections.class_id is not None:
+                iou[detections.class_id[:, None] != self._detections.class_id[None, :]] = 0
+            while iou.size and iou.max() >= self.iou_threshold:
+                current, previous = np.unravel_index(np.argmax(iou), iou.shape)
+                velocity[current] = (detections.xyxy[current] - self._detections.xyxy[previous]) / elapsed
+                iou[current, :] = 0
+                iou[:, previous] = 0
+        self._detections = detections
+        self._velocity = velocity
+        self._frame_index = frame_index
+
+    def predict(self, frame_index: int, shape=None):
+        """Detections from the last detector run, moved to `frame_index` and clipped to `shape`."""
+        if self._detections is None or not len(self._detections):
+            return self._detections
+        xyxy = self._detections.xyxy + self._velocity * (frame_index - self._frame_index)
+        if shape is not None:
+            height, width = shape[:2]
+            xyxy[:, [0, 2]] = np.clip(xyxy[:, [0, 2]], 0, width)
+            xyxy[:, [1, 3]] = np.clip(xyxy[:, [1, 3]], 0, height)
+        return replace(self._detections, xyxy=xyxy.astype(self._detections.xyxy.dtype))
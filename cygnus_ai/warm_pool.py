@@ -0,0 +1,159 @@
+import time
+from threading import Condition, Event, Thread
+from .registry import get_model_backend
+
+
+class WarmPool:
+    """
+    Processors built and prepared ahead of /start.
+
+    For every configured (algorithm, model) pair the pool keeps `size`
+    processors whose model is loaded (`prepare`) and whose Kafka and MinIO
+    clients are connected. `take` hands one out at once and a background
+    thread builds its replacement, so model loading and client connects stay
+    off the request path. A request for a pair that is not configured, or
+    arriving while the reserve is empty, falls back to building a processor
+    as usual.
+
+    `factory(algorithm, model)` must return a processor with its algorithm
+    set, not yet assigned to a stream.
+    """
+
+    def __init__(self, factory, specs, size: int = 1, retry_s: float = 30):
+        self.factory = factory
+        self.specs = [tuple(spec) for spec in specs]
+        self.size = size
+        self.retry_s = retry_s
+        self.ready = Event()
+        self.hits = 0
+        self.misses = 0
+        self.errors = {}
+        self._reserve = {spec: [] for spec in self.specs}
+        self._cond = Condition()
+        self._stopped = False
+        self._thread = Thread(target=self._run, name="warm-pool", daemon=True)
+        self._thread.start()
+
+    def take(self, algorithm: str, model: str = None):
+        """A prepared processor for (`algorithm`, `model`), or None if there is none in reserve."""
+        spec = (algorithm, model or None)
+        with self._cond:
+            reserve = self._reserve.get(spec)
+            if not reserve:
+                self.misses += 1
+                return None
+            processor = reserve.pop()
+            self.hits += 1
+            self._cond.notify_all()
+        return processor
+
+    def _build(self, spec):
+        processor = self.factory(*spec)
+        try:
+            processor.prepare()
+            if processor.upload_service is not None:
+                processor.upload_service.check_bucket(processor.minio_bucket)
+        except Exception:
+            processor.discard()
+            raise
+        return processor
+
+    def _missing(self):
+        with self._cond:
+            return [spec for spec in self.specs if len(self._reserve[spec]) < self.size]
+
+    def _run(self):
+        retry_at = {}
+        while not self._stopped:
+            built = False
+            for spec in self._missing():
+                if time.monotonic() < retry_at.get(spec, 0):
+                    continue
+                try:
+                    processor = self._build(spec)
+                except Exception as e:
+                    self.errors[spec] = str(e)
+                    retry_at[spec] = time.monotonic() + self.retry_s
+                    print(f"Failed to warm up {spec[0]} ({spec[1]}): {e}")
+                    continue
+                self.errors.pop(spec, None)
+                built = True
+                with self._cond:
+                    if self._stopped:
+                        processor.discard()
+                        break
+                    self._reserve[spec].append(processor)
+            # Every pair had its first attempt: /start no longer competes with the warm-up
+            self.ready.set()
+            if built:
+                continue
+            with self._cond:
+                if self._stopped:
+                    break
+                # Woken by take(); failed pairs are retried every `retry_s`
+                self._cond.wait(self.retry_s if self.errors else None)
+
+    def close(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        self._thread.join(timeout=30)
+        with self._cond:
+            processors = [processor for reserve in self._reserve.values() for processor in reserve]
+            for reserve in self._reserve.values():
+                reserve.clear()
+        for processor in processors:
+            processor.discard()
+
+    def stats(self) -> dict:
+        with self._cond:
+            reserve = {f"{algorithm}:{model or ''}": {"ready": len(processors), "target": self.size}
+                       for (algorithm, model), processors in self._reserve.items()}
+        return {
+            "ready": self.ready.is_set(),
+            "reserve": reserve,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": {f"{algorithm}:{model or ''}": error for (algorithm, model), error in self.errors.items()},
+        }
+
+
+class ModelPreloader:
+    """
+    Loads configured models once at start-up. Used in process mode, where
+    workers start from a clean fork server and load their own copy: loading
+    here first runs any backend export once, before workers ask for it, and
+    leaves the weights in the page cache. The models are released again and
+    stay in this process's pool only as idle entries.
+    """
+
+    def __init__(self, specs, model_path_for, pool):
+        self.pool = pool
+        self.models = []
+        self.errors = {}
+        self.ready = Event()
+        self.load_s = None
+        Thread(target=self._load, args=(specs, model_path_for), name="model-preload", daemon=True).start()
+
+    def _load(self, specs, model_path_for):
+        started = time.monotonic()
+        for algorithm, model in specs:
+            if not model:
+                continue
+            try:
+                self.pool.acquire(model, get_model_backend(model), model_path_for(algorithm, model))
+                self.pool.release(model, get_model_backend(model))
+                self.models.append(model)
+            except Exception as e:
+                self.errors[f"{algorithm}:{model}"] = str(e)
+                print(f"Failed to preload model {model}: {e}")
+        self.load_s = time.monotonic() - started
+        self.ready.set()
+
+    def stats(self) -> dict:
+        return {
+            "ready": self.ready.is_set(),
+            "preloaded_models": list(self.models),
+            "load_s": round(self.load_s, 2) if self.load_s is not None else None,
+            "errors": dict(self.errors),
+        }
@@ -0,0 +1,87 @@
+import time
+
+from cygnus_ai.alerts import AlertPublisher
+
+
+class FakeFuture:
+    def __init__(self, error=None):
+        self.error = error
+
+    def add_callback(self, callback, *args):
+        if self.error is None:
+            callback(*args, None)
+        return self
+
+    def add_errback(self, errback, *args):
+        if self.error is not None:
+            errback(*args, self.error)
+        return self
+
+
+class FakeProducer:
+    def __init__(self):
+        self.sent = []
+        self.error = None
+
+    def send(self, topic, value):
+        self.sent.append(topic)
+        return FakeFuture(self.error)
+
+    def flush(self, timeout=None):
+        pass
+
+    def close(self, timeout=None):
+        pass
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_metadata_does_not_displace_alerts():
+    producer = FakeProducer()
+    producer.error = Exception("broker down")
+    publisher = AlertPublisher("kafka:9092", buffer_size=5, metadata_buffer_size=3, retry_backoff_s=0.05,
+                               producer=producer)
+    try:
+        for i in range(3):
+            publisher.publish("alerts", {"alert": i})
+        for i in range(50):
+            publisher.publish_metadata("metadata", {"frame": i})
+        assert wait_for(lambda: publisher.stats()["metadata_buffered"] == 0 and publisher.stats()["errors"] > 3)
+
+        stats = publisher.stats()
+        assert stats["buffered"] == 3
+        assert stats["shed"] == 0
+        assert stats["metadata_published"] == 50
+        assert stats["metadata_shed"] == 50
+    finally:
+        publisher.close(timeout=1)
+
+
+def test_alerts_are_sent_before_metadata():
+    producer = FakeProducer()
+    publisher = AlertPublisher("kafka:9092", producer=producer)
+    try:
+        with publisher._cond:
+            publisher.publish_metadata("metadata", {"frame": 1})
+            publisher.publish("alerts", {"alert": 1})
+        assert wait_for(lambda: len(producer.sent) == 2)
+        assert producer.sent == ["alerts", "metadata"]
+    finally:
+        publisher.close(timeout=1)
+
+
+def test_metadata_buffer_keeps_the_newest():
+    publisher = AlertPublisher("kafka:9092", metadata_buffer_size=2, producer=FakeProducer())
+    publisher._stopped = True
+    publisher._thread.join(timeout=2)
+    for i in range(4):
+        publisher.publish_metadata("metadata", {"frame": i})
+    assert [value for _, value in publisher._metadata] == [b'{"frame": 2}', b'{"frame": 3}']
+    assert publisher.metadata_shed == 2
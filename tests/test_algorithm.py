@@ -0,0 +1,64 @@
+import pytest
+from cygnus_ai import algorithm
+from cygnus_ai.algorithm import BaseAlgorithm
+
+
+class Counts:
+    def __init__(self):
+        self.counters = {}
+
+    def inc(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+
+class Passthrough(BaseAlgorithm):
+    def process_frame(self, frame):
+        return frame
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    monkeypatch.setattr(algorithm, "list_models_for_algorithm", lambda name: [])
+    return [1000.0]
+
+
+@pytest.fixture
+def make_algorithm(clock):
+    def make():
+        sent = []
+        algo = Passthrough("cam", "passthrough", alert_callback=sent.append)
+        algo.set_clock(lambda: clock[0])
+        algo.metrics = Counts()
+        return algo, sent
+    return make
+
+
+def test_labels_cool_down_independently(clock, make_algorithm):
+    algo, sent = make_algorithm()
+    algo.set_alert_cooldown(10)
+    algo.check_and_trigger_alert([{"label": "fire"}])
+    clock[0] += 5
+    algo.check_and_trigger_alert([{"label": "fire"}, {"label": "smoke"}])
+    assert sent == [[{"label": "fire"}], [{"label": "smoke"}]]
+    assert algo.metrics.counters["alerts_suppressed"] == 1
+    clock[0] += 5
+    algo.check_and_trigger_alert([{"label": "fire"}])
+    assert len(sent) == 3
+
+
+def test_per_label_cooldown_overrides_the_default(clock, make_algorithm):
+    algo, sent = make_algorithm()
+    algo.set_alert_cooldown(60, per_label={"person": 2})
+    for _ in range(3):
+        algo.check_and_trigger_alert([{"label": "person"}, {"label": "fire"}])
+        clock[0] += 2
+    assert sent == [[{"label": "person"}, {"label": "fire"}], [{"label": "person"}], [{"label": "person"}]]
+    assert algo.metrics.counters["alerts_suppressed"] == 2
+
+
+def test_negative_cooldowns_are_rejected(make_algorithm):
+    algo, _ = make_algorithm()
+    with pytest.raises(ValueError):
+        algo.set_alert_cooldown(-1)
+    with pytest.raises(ValueError):
+        algo.set_alert_cooldown(5, per_label={"fire": -1})
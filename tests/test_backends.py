@@ -0,0 +1,62 @@
+import os
+import pytest
+from cygnus_ai import backends
+
+
+@pytest.fixture
+def weights(tmp_path, monkeypatch):
+    monkeypatch.setenv("CYGNUS_MODEL_CACHE", str(tmp_path / "cache"))
+    path = tmp_path / "fire.pt"
+    path.write_bytes(b"weights")
+    return str(path)
+
+
+@pytest.fixture
+def exports(monkeypatch):
+    """Fake exporter writing what ultralytics would: a .onnx file or an *_openvino_model directory."""
+    made = []
+
+    def export(source, backend, int8, imgsz, calibration_data, work_dir):
+        made.append((backend, int8, calibration_data))
+        if backend == "onnxruntime":
+            exported = os.path.join(work_dir, "fire.onnx")
+            open(exported, "wb").close()
+        else:
+            exported = os.path.join(work_dir, "fire_openvino_model")
+            os.makedirs(exported)
+            open(os.path.join(exported, "fire.xml"), "w").close()
+        return exported
+
+    monkeypatch.setattr(backends, "_export", export)
+    return made
+
+
+def test_exports_are_named_for_their_runtime(weights, exports):
+    openvino = backends.export_model(weights, "openvino")
+    assert openvino.endswith("_openvino_model")
+    assert os.path.isfile(os.path.join(openvino, "fire.xml"))
+    assert backends.export_model(weights, "onnxruntime").endswith(".onnx")
+    assert backends.export_model(weights, "torch") == weights
+
+
+def test_exports_are_cached_per_option(weights, exports):
+    first = backends.export_model(weights, "openvino", int8=True)
+    assert backends.export_model(weights, "openvino", int8=True) == first
+    assert backends.export_model(weights, "openvino") != first
+    assert backends.export_model(weights, "openvino", int8=True, imgsz=320) != first
+    assert len(exports) == 3
+
+
+def test_calibration_data_is_part_of_the_key(weights, exports, tmp_path):
+    coco = tmp_path / "coco.yaml"
+    coco.write_text("path: coco\n")
+    fires = tmp_path / "fires.yaml"
+    fires.write_text("path: fires\n")
+    on_coco = backends.export_model(weights, "openvino", int8=True, calibration_data=str(coco))
+    on_fires = backends.export_model(weights, "openvino", int8=True, calibration_data=str(fires))
+    assert on_coco != on_fires
+    assert backends.export_model(weights, "openvino", int8=True, calibration_data=str(coco)) == on_coco
+    # Dynamic quantization does not calibrate, so the dataset does not matter there
+    assert (backends.export_model(weights, "onnxruntime", int8=True, calibration_data=str(coco))
+            == backends.export_model(weights, "onnxruntime", int8=True, calibration_data=str(fires)))
+    assert len(exports) == 3
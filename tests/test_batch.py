@@ -0,0 +1,82 @@
+import io
+import json
+import time
+import numpy as np
+import pytest
+from cygnus_ai import batch, registry
+from cygnus_ai.algorithm import BaseAlgorithm
+from cygnus_ai.batch import Shard, process_shard
+
+WIDTH, HEIGHT, FPS = 8, 4, 10.0
+
+
+class FakeProcess:
+    """ffmpeg stand-in: the decoder yields `frames` raw frames, the encoder swallows its input."""
+    frames = 0
+    started = []
+
+    def __init__(self, command, stdout=None, stdin=None):
+        FakeProcess.started.append(self)
+        self.stdout = io.BytesIO(b"\0" * (WIDTH * HEIGHT * 3 * FakeProcess.frames))
+        self.stdin = io.BytesIO()
+        self.waited = False
+
+    def wait(self):
+        self.waited = True
+
+
+class AlertEveryFrame(BaseAlgorithm):
+    slow = False
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.set_alert_cooldown(1)
+
+    def process_frame(self, frame):
+        if AlertEveryFrame.slow:
+            time.sleep(0.02)
+        self.check_and_trigger_alert([{"label": "fire"}])
+        return frame
+
+
+class BrokenSetup(AlertEveryFrame):
+    def setup(self):
+        raise FileNotFoundError("weights missing")
+
+
+@pytest.fixture
+def shard(monkeypatch, tmp_path):
+    monkeypatch.setattr(batch.subprocess, "Popen", FakeProcess)
+    monkeypatch.setattr(FakeProcess, "started", [])
+    monkeypatch.setitem(registry._algorithm_registry, "AlertEveryFrame", AlertEveryFrame)
+    monkeypatch.setitem(registry._algorithm_registry, "BrokenSetup", BrokenSetup)
+    return Shard(str(tmp_path / "flight.mp4"), 0, 0.0, None, FPS, WIDTH, HEIGHT)
+
+
+def alert_frames(result) -> list:
+    with open(result["detections_path"]) as lines:
+        return [record["frame"] for record in map(json.loads, lines) if "alert" in record]
+
+
+def test_cooldowns_follow_video_time(shard, tmp_path, monkeypatch):
+    # 3.5 s of video with a 1 s cooldown, processed fast and then at a fifth of real time
+    monkeypatch.setattr(FakeProcess, "frames", 35)
+    fast = alert_frames(process_shard(shard, 1, "AlertEveryFrame", None, str(tmp_path)))
+    monkeypatch.setattr(AlertEveryFrame, "slow", True)
+    slow = alert_frames(process_shard(shard, 1, "AlertEveryFrame", None, str(tmp_path)))
+    assert fast == slow == [0, 10, 20, 30]
+
+
+def test_failed_setup_starts_no_ffmpeg(shard, tmp_path):
+    with pytest.raises(FileNotFoundError):
+        process_shard(shard, 1, "BrokenSetup", None, str(tmp_path))
+    assert FakeProcess.started == []
+
+
+def test_ffmpeg_is_reaped_when_processing_fails(shard, tmp_path, monkeypatch):
+    monkeypatch.setattr(FakeProcess, "frames", 3)
+    monkeypatch.setattr(AlertEveryFrame, "process_frame", lambda self, frame: np.empty(0)[1])
+    with pytest.raises(IndexError):
+        process_shard(shard, 1, "AlertEveryFrame", None, str(tmp_path))
+    assert len(FakeProcess.started) == 2
+    assert all(process.waited for process in FakeProcess.started)
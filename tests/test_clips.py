@@ -0,0 +1,75 @@
+from cygnus_ai.clips import TS_PACKET_SIZE, ClipBuffer
+
+VIDEO_PID = 0x100
+PMT_PID = 0x1000
+
+
+def packet(pid: int, payload: bytes = b"", keyframe: bool = False) -> bytes:
+    header = bytes([0x47, (pid >> 8) & 0x1F, pid & 0xFF])
+    if keyframe:
+        # Adaptation field with the random access indicator, then payload
+        body = bytes([0x30, 1, 0x40]) + payload
+    else:
+        body = bytes([0x10]) + payload
+    return (header + body).ljust(TS_PACKET_SIZE, b"\xff")
+
+
+def pat() -> bytes:
+    # pointer, table id, section length 13, ts id, version, section numbers, program 1 -> PMT_PID, CRC
+    section = bytes([0, 0x00, 0xB0, 13, 0, 1, 0xC1, 0, 0, 0, 1, 0xE0 | (PMT_PID >> 8), PMT_PID & 0xFF]) + b"\0" * 4
+    return packet(0, section)
+
+
+def pmt() -> bytes:
+    return packet(PMT_PID, b"pmt")
+
+
+def frame(tag: bytes, keyframe: bool = False) -> bytes:
+    return packet(VIDEO_PID, tag, keyframe)
+
+
+def test_clips_start_on_a_keyframe_with_the_tables_in_front():
+    buffer = ClipBuffer(retention_s=60, max_bytes=2**20)
+    buffer.feed(pat() + pmt() + frame(b"before") + frame(b"k1", True) + frame(b"p1"), now=0)
+    buffer.feed(frame(b"k2", True) + frame(b"p2"), now=2)
+    buffer.feed(frame(b"k3", True), now=4)
+    # An alert at 3 s with 1 s of pre-roll starts on the keyframe at 2 s
+    clip = buffer.clip(2.5, 3.5)
+    assert clip == pat() + pmt() + frame(b"k2", True) + frame(b"p2")
+    # Nothing is kept from before the first keyframe
+    assert buffer.clip(-1, 10).startswith(pat() + pmt() + frame(b"k1", True))
+
+
+def test_partial_packets_are_carried_over():
+    buffer = ClipBuffer(retention_s=60, max_bytes=2**20)
+    data = pat() + pmt() + frame(b"k1", True) + frame(b"p1")
+    buffer.feed(data[:300], now=0)
+    buffer.feed(data[300:], now=0)
+    assert buffer.clip(0, 1) == data
+
+
+def test_old_segments_are_evicted():
+    buffer = ClipBuffer(retention_s=5, max_bytes=2**20)
+    buffer.feed(pat() + pmt(), now=0)
+    for second in range(10):
+        buffer.feed(frame(b"k%d" % second, True), now=second)
+    # The newest segment starting before the window is kept, it covers the window's start
+    assert buffer.stats()["segments"] == 6
+    assert buffer.clip(4, 9).startswith(pat() + pmt() + frame(b"k4", True))
+
+
+def test_size_cap_drops_the_oldest_segments():
+    buffer = ClipBuffer(retention_s=60, max_bytes=3 * TS_PACKET_SIZE)
+    for second in range(5):
+        buffer.feed(frame(b"k%d" % second, True) + frame(b"p%d" % second), now=second)
+    assert buffer.size <= 3 * TS_PACKET_SIZE
+    assert buffer.dropped_segments == 4
+    assert buffer.clip(0, 10) == frame(b"k4", True) + frame(b"p4")
+
+
+def test_reset_stream_forgets_the_old_stream():
+    buffer = ClipBuffer(retention_s=60, max_bytes=2**20)
+    buffer.feed(pat() + pmt() + frame(b"k1", True), now=0)
+    buffer.reset_stream()
+    assert buffer.clip(0, 10) == b""
+    assert buffer.last_fed_at is None
@@ -0,0 +1,71 @@
+import io
+import pytest
+from cygnus_ai.framebuffer import FrameRing
+
+
+def test_slots_are_reused_without_allocating():
+    ring = FrameRing(16, 8, 2)
+    for _ in range(10):
+        ring.release(ring.acquire())
+    stats = ring.stats()
+    assert stats["slots"] == 2
+    assert stats["frames"] == 10
+    assert stats["allocations"] == 0
+
+
+def test_a_dry_ring_grows_and_counts_it():
+    ring = FrameRing(16, 8, 2)
+    held = [ring.acquire() for _ in range(3)]
+    assert len({slot.index for slot in held}) == 3
+    assert ring.stats()["allocations"] == 1
+    for slot in held:
+        ring.release(slot)
+    assert ring.stats()["free"] == 3
+
+
+def test_fill_reads_one_frame_in_place():
+    ring = FrameRing(4, 2, 1)
+    slot = ring.acquire()
+    data = bytes(range(ring.frame_size))
+    assert ring.fill(io.BytesIO(data), slot) == ring.frame_size == 12
+    assert slot.yuv.tobytes() == data
+
+
+def test_short_read_is_reported():
+    ring = FrameRing(4, 2, 1, pixel_format="bgr24")
+    slot = ring.acquire()
+    assert ring.fill(io.BytesIO(b"\0" * 5), slot) == 5
+    assert ring.fill(io.BytesIO(b""), slot) == 0
+
+
+def test_slots_from_before_a_resolution_change_are_not_reused():
+    old = FrameRing(16, 8, 1)
+    slot = old.acquire()
+    new = FrameRing(32, 16, 1)
+    new.release(slot)
+    assert new.stats()["free"] == 1
+    assert new.acquire() is not slot
+
+
+def test_unknown_pixel_format():
+    with pytest.raises(ValueError):
+        FrameRing(16, 8, 1, pixel_format="nv12")
+
+
+def test_a_shared_slot_returns_after_the_last_consumer():
+    ring = FrameRing(16, 8, 1)
+    slot = ring.acquire()
+    ring.share(slot, 3)
+    ring.release(slot)
+    ring.release(slot)
+    assert ring.stats()["free"] == 0
+    ring.release(slot)
+    assert ring.stats()["free"] == 1
+    assert ring.acquire() is slot
+
+
+def test_sharing_with_no_consumers_releases():
+    ring = FrameRing(16, 8, 1)
+    slot = ring.acquire()
+    ring.share(slot, 0)
+    assert ring.stats()["free"] == 1
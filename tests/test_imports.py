@@ -0,0 +1,41 @@
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ("supervision", "ultralytics", "torch", "kafka", "minio", "tensorflow")
+
+# Generous for a cold CI machine, far below what loading PyTorch/ultralytics costs (seconds, hundreds of MB)
+MAX_IMPORT_S = 3.0
+MAX_IMPORT_RSS_MB = 200
+
+_PROBE = """
+import json, resource, sys, time
+started = time.perf_counter()
+import cygnus_ai
+print(json.dumps({
+    "import_s": time.perf_counter() - started,
+    "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "modules": list(sys.modules),
+}))
+"""
+
+
+def _import_in_fresh_interpreter() -> dict:
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    output = subprocess.run([sys.executable, "-c", _PROBE], stdout=subprocess.PIPE, check=True, cwd=ROOT, env=env)
+    return json.loads(output.stdout.decode().strip().splitlines()[-1])
+
+
+def test_import_loads_no_heavy_dependencies():
+    result = _import_in_fresh_interpreter()
+    loaded = [name for name in HEAVY_MODULES if name in result["modules"]]
+    assert loaded == []
+
+
+def test_import_time_and_memory():
+    result = _import_in_fresh_interpreter()
+    assert result["import_s"] < MAX_IMPORT_S
+    assert result["rss_mb"] < MAX_IMPORT_RSS_MB
@@ -0,0 +1,71 @@
+import os
+import threading
+from cygnus_ai.ingest import FFmpegLog, parse_stream_info
+
+# From `ffmpeg -loglevel verbose` decoding an RTSP camera into rawvideo, with an inference output
+LOG = b"""Input #0, rtsp, from 'rtsp://camera/stream':
+  Metadata:
+    title           : Session streamed by "preview"
+  Duration: N/A, start: 0.066667, bitrate: N/A
+  Stream #0:0: Video: h264 (High), 1 reference frame, yuvj420p(pc, bt709, progressive, left), 2560x1440 [SAR 1:1 DAR 16:9], 25 fps, 25 tbr, 90k tbn
+[graph 0 input from stream 0:0 @ 0x55d5c8a0c6c0] w:2560 h:1440 pixfmt:yuvj420p tb:1/90000 fr:25/1 sar:1/1
+[scale @ 0x55d5c8a11a40] w:640 h:640 flags:'bicubic' interl:0
+[auto_scale_0 @ 0x55d5c8a12b00] w:iw h:ih flags:'' interl:0
+[auto_scale_0 @ 0x55d5c8a12b00] w:2560 h:1440 fmt:yuvj420p sar:1/1 -> w:2560 h:1440 fmt:yuv420p sar:1/1 flags:0x0
+[scale @ 0x55d5c8a11a40] w:2560 h:1440 fmt:yuvj420p sar:1/1 -> w:640 h:360 fmt:bgr24 sar:1/1 flags:0x2
+Output #0, rawvideo, to 'pipe:':
+  Stream #0:0: Video: rawvideo (I420 / 0x30323449), yuv420p(pc, bt709, progressive), 2560x1440 [SAR 1:1 DAR 16:9], q=2-31, 1105920 kb/s, 25 fps, 25 tbn
+"""
+
+
+def test_buffer_source_line():
+    info = parse_stream_info("[graph 0 input from stream 0:0 @ 0x55d5c8a0c6c0] "
+                             "w:2560 h:1440 pixfmt:yuvj420p tb:1/90000 fr:25/1 sar:1/1")
+    assert (info.width, info.height, info.pix_fmt, info.fps) == (2560, 1440, "yuvj420p", 25.0)
+
+
+def test_scale_lines_do_not_match():
+    for line in LOG.decode().splitlines():
+        if line.startswith(("[scale", "[auto_scale")):
+            assert parse_stream_info(line) is None, line
+
+
+def test_container_stream_line():
+    info = parse_stream_info("  Stream #0:0(und): Video: h264 (Main) (avc1 / 0x31637661), yuv420p(tv, bt709), "
+                             "1280x720 [SAR 1:1 DAR 16:9], 2012 kb/s, 29.97 fps, 29.97 tbr, 30k tbn (default)")
+    assert (info.width, info.height, info.pix_fmt, info.fps) == (1280, 720, "yuv420p", 29.97)
+
+
+def log_pipe():
+    read, write = os.pipe()
+    return FFmpegLog(os.fdopen(read, "rb")), write
+
+
+def test_log_prefers_the_filter_graph_and_ignores_outputs():
+    log, write = log_pipe()
+    # Split mid-line, the way ffmpeg's writes reach the pipe
+    os.write(write, LOG[:300])
+    os.write(write, LOG[300:])
+    info = log.poll()
+    assert (info.width, info.height, info.pix_fmt) == (2560, 1440, "yuvj420p")
+    assert log.poll() is None
+    os.write(write, b"[graph 0 input from stream 0:0 @ 0x55d5c8a0c6c0] w:1280 h:720 pixfmt:yuv420p tb:1/90000 fr:25/1\n")
+    assert log.poll().width == 1280
+    os.close(write)
+    log.poll()
+    assert log.eof
+
+
+def test_drain_keeps_a_chatty_ffmpeg_writing():
+    log, write = log_pipe()
+    drainer = threading.Thread(target=log.drain, daemon=True)
+    drainer.start()
+    # Several times the pipe buffer, which would block the writer if nobody read it
+    for _ in range(5000):
+        os.write(write, b"[rtsp @ 0x55d5c8a0c6c0] RTP: missed 3 packets\n")
+    os.write(write, b"[graph 0 input from stream 0:0 @ 0x1] w:640 h:480 pixfmt:yuv420p tb:1/90000 fr:25/1\n")
+    os.close(write)
+    drainer.join(5)
+    assert not drainer.is_alive()
+    # Logged while draining, still reported to the next poll
+    assert log.poll().width == 640
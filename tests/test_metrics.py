@@ -0,0 +1,52 @@
+import sys
+import threading
+from cygnus_ai.metrics import Histogram, StreamMetrics, render
+
+
+def hammer(target, threads: int = 8):
+    # Switch threads as often as possible, so an unguarded read-modify-write is likely to lose updates
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        workers = [threading.Thread(target=target) for _ in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+    finally:
+        sys.setswitchinterval(interval)
+
+
+def test_concurrent_observations_are_all_counted():
+    histogram = Histogram(buckets=(0.1, 1.0))
+
+    def observe():
+        for _ in range(20000):
+            histogram.observe(0.5)
+
+    hammer(observe)
+    buckets, counts, total, count = histogram.snapshot()
+    assert count == 160000
+    assert counts == [0, 160000, 0]
+    assert abs(total - 80000) < 1e-6
+
+
+def test_concurrent_counter_increments_are_all_counted():
+    metrics = StreamMetrics("cam")
+
+    def increment():
+        for _ in range(20000):
+            metrics.inc("clips_captured")
+
+    hammer(increment)
+    assert metrics.counters["clips_captured"] == 160000
+
+
+def test_histogram_rendering():
+    metrics = StreamMetrics("cam", "YoloFire")
+    metrics.observe("capture", 0.3)
+    metrics.observe("capture", 40)
+    text = render(metrics.families())
+    assert 'cygnus_capture_seconds_bucket{stream="cam",algorithm="YoloFire",le="0.5"} 1' in text
+    assert 'cygnus_capture_seconds_bucket{stream="cam",algorithm="YoloFire",le="+Inf"} 2' in text
+    assert 'cygnus_capture_seconds_count{stream="cam",algorithm="YoloFire"} 2' in text
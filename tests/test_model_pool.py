@@ -0,0 +1,162 @@
+import threading
+import time
+import pytest
+from cygnus_ai import registry
+from cygnus_ai.registry import ModelPool
+
+
+@pytest.fixture
+def loads(monkeypatch):
+    """Paths loaded through the (fake) torch backend, in order."""
+    loaded = []
+
+    def load(path, **options):
+        loaded.append(path)
+        return object()
+
+    monkeypatch.setitem(registry._backend_loaders, "torch", load)
+    return loaded
+
+
+@pytest.fixture
+def weights(tmp_path):
+    """A weights file of `mb` megabytes; the pool falls back to the file size for its memory estimate."""
+    def make(name, mb=1):
+        path = tmp_path / f"{name}.pt"
+        path.write_bytes(b"\0" * int(mb * 2**20))
+        return str(path)
+    return make
+
+
+def resident(pool):
+    return [entry["model"] for entry in pool.stats()]
+
+
+def test_one_copy_per_model(loads, weights):
+    pool = ModelPool()
+    path = weights("a")
+    first = pool.acquire("a", path=path)
+    second = pool.acquire("a", path=path)
+    assert first is second
+    assert loads == [path]
+    assert pool.stats()[0]["references"] == 2
+
+
+def test_least_recently_used_idle_model_is_evicted(loads, weights):
+    pool = ModelPool(max_idle_models=2)
+    for name in ("a", "b", "c"):
+        pool.acquire(name, path=weights(name))
+        pool.release(name)
+    assert resident(pool) == ["b", "c"]
+
+
+def test_reuse_refreshes_a_model(loads, weights):
+    pool = ModelPool(max_idle_models=2)
+    paths = {name: weights(name) for name in ("a", "b", "c")}
+    for name in ("a", "b", "a", "c"):
+        pool.acquire(name, path=paths[name])
+        pool.release(name)
+    assert resident(pool) == ["a", "c"]
+    assert loads.count(paths["a"]) == 1
+
+
+def test_models_in_use_are_never_evicted(loads, weights):
+    pool = ModelPool(max_idle_models=0)
+    pool.acquire("a", path=weights("a"))
+    pool.acquire("b", path=weights("b"))
+    assert resident(pool) == ["a", "b"]
+    pool.release("a")
+    assert resident(pool) == ["b"]
+
+
+def test_memory_ceiling_evicts_idle_models(loads, weights):
+    pool = ModelPool(max_memory_mb=2.5)
+    pool.acquire("a", path=weights("a"))
+    pool.release("a")
+    pool.acquire("b", path=weights("b"))
+    pool.release("b")
+    pool.acquire("c", path=weights("c"))
+    assert resident(pool) == ["b", "c"]
+
+
+def test_model_over_the_ceiling_is_refused(loads, weights):
+    pool = ModelPool(max_memory_mb=1.5)
+    pool.acquire("a", path=weights("a"))
+    with pytest.raises(MemoryError):
+        pool.acquire("b", path=weights("b"))
+    # The model in use stays, the one that did not fit is not kept
+    assert resident(pool) == ["a"]
+
+
+def test_lowering_the_limits_evicts_at_once(loads, weights):
+    pool = ModelPool()
+    for name in ("a", "b"):
+        pool.acquire(name, path=weights(name))
+        pool.release(name)
+    pool.configure(max_idle_models=1)
+    assert resident(pool) == ["b"]
+
+
+def test_unknown_backend(loads, weights):
+    with pytest.raises(ValueError):
+        ModelPool().acquire("a", backend="tensorrt", path=weights("a"))
+
+
+def test_loading_does_not_block_other_models(monkeypatch, weights):
+    started, finish = threading.Event(), threading.Event()
+    loaded = []
+
+    def load(path, **options):
+        loaded.append(path)
+        if path.endswith("slow.pt"):
+            started.set()
+            assert finish.wait(5)
+        return object()
+
+    monkeypatch.setitem(registry._backend_loaders, "torch", load)
+    pool = ModelPool()
+    slow = weights("slow")
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(pool.acquire("slow", path=slow))) for _ in range(2)]
+    threads[0].start()
+    assert started.wait(5)
+    threads[1].start()
+    # Another model loads while "slow" is still loading
+    pool.acquire("fast", path=weights("fast"))
+    finish.set()
+    for thread in threads:
+        thread.join(5)
+    assert loaded.count(slow) == 1
+    assert len(results) == 2 and results[0] is results[1]
+    assert {entry["model"]: entry["references"] for entry in pool.stats()} == {"slow": 2, "fast": 1}
+
+
+def test_waiters_see_a_failed_load(monkeypatch, weights):
+    started, finish = threading.Event(), threading.Event()
+
+    def load(path, **options):
+        started.set()
+        assert finish.wait(5)
+        raise RuntimeError("corrupt weights")
+
+    monkeypatch.setitem(registry._backend_loaders, "torch", load)
+    pool = ModelPool()
+    path = weights("a")
+    errors = []
+
+    def acquire():
+        try:
+            pool.acquire("a", path=path)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=acquire) for _ in range(2)]
+    threads[0].start()
+    assert started.wait(5)
+    threads[1].start()
+    time.sleep(0.1)
+    finish.set()
+    for thread in threads:
+        thread.join(5)
+    assert errors == ["corrupt weights"] * 2
+    assert pool.stats() == []
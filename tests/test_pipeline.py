@@ -0,0 +1,87 @@
+import threading
+import time
+import pytest
+from cygnus_ai.pipeline import BLOCK, DROP_OLDEST, KEEP_LATEST, FrameQueue
+
+
+def test_drop_oldest_evicts_the_oldest_frames():
+    dropped = []
+    queue = FrameQueue("decode", 2, DROP_OLDEST, on_drop=dropped.append)
+    for frame in range(4):
+        assert queue.put(frame)
+    assert dropped == [0, 1]
+    assert queue.dropped == 2
+    assert [queue.get(0), queue.get(0)] == [2, 3]
+    assert queue.get(0) is None
+
+
+def test_keep_latest_holds_one_frame_whatever_the_size():
+    dropped = []
+    queue = FrameQueue("decode", 5, KEEP_LATEST, on_drop=dropped.append)
+    for frame in range(3):
+        queue.put(frame)
+    assert queue.maxsize == 1
+    assert queue.depth == 1
+    assert dropped == [0, 1]
+    assert queue.get(0) == 2
+
+
+def test_block_waits_for_the_consumer():
+    queue = FrameQueue("encode", 1, BLOCK)
+    queue.put("first")
+    done = threading.Event()
+
+    def producer():
+        queue.put("second", timeout=0.05)
+        done.set()
+
+    thread = threading.Thread(target=producer)
+    thread.start()
+    assert not done.wait(0.2)
+    assert queue.get(0) == "first"
+    assert done.wait(1)
+    thread.join()
+    assert queue.get(0) == "second"
+    assert queue.dropped == 0
+
+
+def test_close_wakes_a_blocked_producer_and_drops_its_frame():
+    dropped = []
+    queue = FrameQueue("encode", 1, BLOCK, on_drop=dropped.append)
+    queue.put("queued")
+    results = []
+    thread = threading.Thread(target=lambda: results.append(queue.put("late", timeout=0.05)))
+    thread.start()
+    time.sleep(0.1)
+    queue.close()
+    thread.join(1)
+    assert results == [False]
+    assert dropped == ["late"]
+    # Queued frames are still handed out after closing, then None
+    assert queue.get(0) == "queued"
+    assert queue.get(1) is None
+
+
+def test_get_times_out_with_none():
+    queue = FrameQueue("decode", 2)
+    started = time.monotonic()
+    assert queue.get(0.05) is None
+    assert time.monotonic() - started >= 0.04
+
+
+def test_drain_releases_queued_frames():
+    released = []
+    queue = FrameQueue("decode", 3, on_drop=released.append)
+    queue.put(1)
+    queue.put(2)
+    queue.drain()
+    assert released == [1, 2]
+    assert queue.depth == 0
+    # Draining is cleanup, not overflow
+    assert queue.dropped == 0
+
+
+@pytest.mark.parametrize("kwargs", [{"policy": "newest"}, {"maxsize": 0}])
+def test_invalid_configuration(kwargs):
+    with pytest.raises(ValueError):
+        FrameQueue("decode", **kwargs)
@@ -0,0 +1,94 @@
+import threading
+from cygnus_ai.storage import UploadService
+
+
+class FakeObjectStore:
+    """MinIO client stand-in that fails the first `failures` uploads and can be held back with `gate`."""
+
+    def __init__(self, failures: int = 0):
+        self.failures = failures
+        self.objects = {}
+        self.attempts = 0
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def put_object(self, bucket_name, object_name, data, length, content_type=None, part_size=0):
+        assert self.gate.wait(5)
+        self.attempts += 1
+        if self.attempts <= self.failures:
+            raise ConnectionError("connection reset")
+        self.objects[f"{bucket_name}/{object_name}"] = data.read(length)
+
+
+def test_failed_uploads_are_retried_with_backoff(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr("cygnus_ai.storage.time.sleep", sleeps.append)
+    store = FakeObjectStore(failures=2)
+    service = UploadService(client=store, workers=1, retries=3, retry_backoff_s=0.5)
+    try:
+        assert service.submit("clips", "a.mp4", lambda: b"clip")
+        service.join()
+    finally:
+        service.close()
+    assert store.objects == {"clips/a.mp4": b"clip"}
+    assert sleeps == [0.5, 1.0]
+    stats = service.stats()
+    assert (stats["uploaded"], stats["retried"], stats["failed"]) == (1, 2, 0)
+
+
+def test_upload_fails_once_retries_run_out(monkeypatch):
+    monkeypatch.setattr("cygnus_ai.storage.time.sleep", lambda seconds: None)
+    store = FakeObjectStore(failures=10)
+    service = UploadService(client=store, workers=1, retries=2)
+    try:
+        service.submit("clips", "a.mp4", b"clip")
+        service.join()
+    finally:
+        service.close()
+    assert store.attempts == 3
+    assert (service.stats()["uploaded"], service.stats()["failed"]) == (0, 1)
+
+
+def test_per_stream_limit_drops_without_blocking():
+    store = FakeObjectStore()
+    store.gate.clear()
+    service = UploadService(client=store, workers=1, per_stream_limit=2)
+    try:
+        assert service.submit("clips", "a1.mp4", b"1", stream="a")
+        assert service.submit("clips", "a2.mp4", b"2", stream="a")
+        assert not service.submit("clips", "a3.mp4", b"3", stream="a")
+        # Other streams still get through
+        assert service.submit("clips", "b1.mp4", b"1", stream="b")
+        assert service.stats()["streams_in_flight"] == {"a": 2, "b": 1}
+        store.gate.set()
+        service.join()
+        # Slots are given back once the uploads finish
+        assert service.submit("clips", "a3.mp4", b"3", stream="a")
+        service.join()
+    finally:
+        store.gate.set()
+        service.close()
+    assert sorted(store.objects) == ["clips/a1.mp4", "clips/a2.mp4", "clips/a3.mp4", "clips/b1.mp4"]
+    assert service.stats()["rejected"] == 1
+    assert service.stats()["streams_in_flight"] == {}
+
+
+def test_full_queue_rejects_and_releases_the_stream_slot():
+    store = FakeObjectStore()
+    store.gate.clear()
+    service = UploadService(client=store, workers=1, queue_size=1, per_stream_limit=0)
+    started = threading.Event()
+    try:
+        # The worker takes the first upload and holds it; the second fills the queue
+        assert service.submit("clips", "1.mp4", lambda: started.set() or b"1")
+        assert started.wait(5)
+        assert service.submit("clips", "2.mp4", b"2")
+        assert not service.submit("clips", "3.mp4", b"3", stream="a")
+        assert service.stats()["streams_in_flight"] == {}
+        store.gate.set()
+        service.join()
+    finally:
+        store.gate.set()
+        service.close()
+    assert sorted(store.objects) == ["clips/1.mp4", "clips/2.mp4"]
+    assert service.stats()["rejected"] == 1
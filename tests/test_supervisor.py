@@ -0,0 +1,78 @@
+import time
+import pytest
+from cygnus_ai import registry
+from cygnus_ai.supervisor import StreamSupervisor, StreamStartError
+
+
+class _Histogram:
+    count = 0
+
+
+class _Metrics:
+    histograms = {"process_frame": _Histogram()}
+
+
+class FakeProcessor:
+    """Just enough of CygnusStreamProcessor for a worker; `run_s` is how long its stream lasts."""
+
+    def __init__(self, run_s: float):
+        self.run_s = run_s
+        self.metrics = _Metrics()
+
+    def process_video(self):
+        time.sleep(self.run_s)
+
+    def input_stats(self):
+        return {"state": "running"}
+
+    def stop_app(self):
+        pass
+
+
+def build(data):
+    if data.get("algorithm") not in registry.list_algorithms():
+        raise ValueError(f"unknown algorithm {data.get('algorithm')}")
+    return FakeProcessor(data.get("runS", 60))
+
+
+def wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def test_workers_get_registrations_and_restart_after_backoff(monkeypatch):
+    # Registered in this process only: the worker starts from the fork server without it
+    monkeypatch.setitem(registry._algorithm_registry, "FakeAlgorithm", "tests:Unused")
+    supervisor = StreamSupervisor(build, check_interval_s=3600, restart_backoff_s=30)
+    try:
+        flapping = supervisor.start({"algorithm": "FakeAlgorithm", "runS": 0})
+        steady = supervisor.start({"algorithm": "FakeAlgorithm"})
+        workers = supervisor._workers
+        assert wait_for(lambda: not workers[flapping].alive())
+
+        started = time.monotonic()
+        for worker in list(workers.values()):
+            supervisor._check(worker)
+        # The backoff is scheduled, not slept through
+        assert time.monotonic() - started < 5
+        assert workers[flapping].restart_at is not None
+        assert workers[flapping].restarts == 0
+        assert workers[steady].alive()
+
+        workers[flapping].restart_at = time.monotonic()
+        supervisor._check(workers[flapping])
+        assert workers[flapping].restarts == 1
+        assert workers[flapping].restart_at is None
+    finally:
+        supervisor.stop_all()
+
+
+def test_start_reports_build_errors():
+    supervisor = StreamSupervisor(build, check_interval_s=3600)
+    with pytest.raises(StreamStartError, match="unknown algorithm Missing") as error:
+        supervisor.start({"algorithm": "Missing"})
+    assert error.value.invalid
@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+import supervision as sv
+from cygnus_ai.tiling import Tiler, merge_regions, tile_grid
+
+
+def detections(boxes, classes=None, confidence=None):
+    return sv.Detections(xyxy=np.array(boxes, dtype=np.float32).reshape(-1, 4),
+                         confidence=np.array(confidence if confidence is not None else [0.9] * len(boxes),
+                                             dtype=np.float32),
+                         class_id=np.array(classes if classes is not None else [0] * len(boxes)))
+
+
+def test_grid_covers_the_frame_and_ends_on_the_border():
+    tiles = tile_grid(3000, 1000, 1024, 0.2)
+    assert [(x0, x1) for x0, _, x1, _ in tiles] == [(0, 1024), (659, 1683), (1317, 2341), (1976, 3000)]
+    assert {(y0, y1) for _, y0, _, y1 in tiles} == {(0, 1000)}
+
+
+def test_small_frame_is_one_tile():
+    assert tile_grid(640, 480, 1024, 0.2) == [(0, 0, 640, 480)]
+
+
+def test_box_cut_by_a_tile_border_comes_out_whole():
+    regions = [(0, 0, 100, 100), (80, 0, 180, 100)]
+    # One object from x=70 to x=120: each tile sees a part of it
+    parts = [detections([[70, 10, 100, 50]], confidence=[0.9]), detections([[0, 10, 40, 50]], confidence=[0.8])]
+    merged = merge_regions(parts, regions)
+    assert len(merged) == 1
+    np.testing.assert_allclose(merged.xyxy, [[70, 10, 120, 50]])
+    assert merged.confidence[0] == pytest.approx(0.9)
+
+
+def test_other_classes_and_separate_objects_are_kept():
+    regions = [(0, 0, 100, 100), (80, 0, 180, 100)]
+    parts = [detections([[70, 10, 100, 50]], classes=[0]),
+             detections([[0, 10, 40, 50], [60, 60, 90, 90]], classes=[1, 0])]
+    merged = merge_regions(parts, regions)
+    assert len(merged) == 3
+
+
+def test_no_detections_anywhere():
+    empty = sv.Detections.empty()
+    assert len(merge_regions([empty, empty], [(0, 0, 10, 10), (5, 0, 15, 10)])) == 0
+
+
+class _Server:
+    def __init__(self):
+        self.batches = []
+
+    def infer_many(self, crops):
+        self.batches.append([crop.shape[:2] for crop in crops])
+        return [None] * len(crops)
+
+
+def test_detect_runs_all_regions_as_one_batch():
+    tiler = Tiler(tile_size=1024, overlap=0.2)
+    server = _Server()
+    frame = np.zeros((1000, 3000, 3), dtype=np.uint8)
+    tiler.detect(frame, server, lambda result: sv.Detections.empty())
+    # The full frame and four tiles
+    assert server.batches == [[(1000, 3000)] + [(1000, 1024)] * 4]
+    assert tiler.stats()["regions_per_run"] == 5
+
+
+def test_focus_rescans_only_the_tiles_around_previous_detections():
+    tiler = Tiler(tile_size=1024, overlap=0.2, focus=True, full_scan_every=3)
+    frame = np.zeros((1000, 3000, 3), dtype=np.uint8)
+    found = detections([[2500, 100, 2550, 150]])
+    tiler.detect(frame, _Server(), lambda result: found)
+    # Full frame plus the right-hand tile only, until the next full scan
+    assert tiler.regions(3000, 1000) == [(0, 0, 3000, 1000), (1976, 0, 3000, 1000)]
+    assert len(tiler.regions(3000, 1000)) == 2
+    assert len(tiler.regions(3000, 1000)) == 5
+    assert tiler.stats()["full_scans"] == 2
+
+
+@pytest.mark.parametrize("kwargs", [{"tile_size": 16}, {"overlap": 1.0}, {"full_scan_every": 0}])
+def test_invalid_configuration(kwargs):
+    with pytest.raises(ValueError):
+        Tiler(**kwargs)
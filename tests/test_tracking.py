@@ -0,0 +1,59 @@
+import numpy as np
+import supervision as sv
+from cygnus_ai.tracking import BoxTracker, box_iou
+
+
+def detections(boxes, classes=None):
+    return sv.Detections(xyxy=np.array(boxes, dtype=np.float32).reshape(-1, 4),
+                         confidence=np.ones(len(boxes), dtype=np.float32),
+                         class_id=np.array(classes if classes is not None else [0] * len(boxes)))
+
+
+def test_box_iou():
+    iou = box_iou([[0, 0, 10, 10]], [[0, 0, 10, 10], [5, 0, 15, 10], [20, 20, 30, 30]])
+    np.testing.assert_allclose(iou, [[1.0, 1 / 3, 0.0]], rtol=1e-5)
+
+
+def test_boxes_move_along_their_velocity():
+    tracker = BoxTracker()
+    tracker.update(detections([[0, 0, 10, 10]]), 0)
+    # Detector every 4 frames: 1 px per frame to the right
+    tracker.update(detections([[4, 0, 14, 10]]), 4)
+    np.testing.assert_allclose(tracker.predict(6).xyxy, [[6, 0, 16, 10]])
+
+
+def test_unmatched_boxes_stay_put():
+    tracker = BoxTracker()
+    tracker.update(detections([[0, 0, 10, 10]]), 0)
+    # Too far from the last box to be the same object
+    tracker.update(detections([[30, 0, 40, 10]]), 1)
+    np.testing.assert_allclose(tracker.predict(3).xyxy, [[30, 0, 40, 10]])
+
+
+def test_first_detection_stays_put():
+    tracker = BoxTracker()
+    assert tracker.empty
+    tracker.update(detections([[0, 0, 10, 10]]), 0)
+    np.testing.assert_allclose(tracker.predict(5).xyxy, [[0, 0, 10, 10]])
+
+
+def test_boxes_of_other_classes_are_not_matched():
+    tracker = BoxTracker()
+    tracker.update(detections([[0, 0, 10, 10]], [1]), 0)
+    tracker.update(detections([[2, 0, 12, 10]], [2]), 1)
+    np.testing.assert_allclose(tracker.predict(3).xyxy, [[2, 0, 12, 10]])
+
+
+def test_prediction_is_clipped_to_the_frame():
+    tracker = BoxTracker()
+    tracker.update(detections([[80, 0, 90, 10]]), 0)
+    tracker.update(detections([[85, 0, 95, 10]]), 1)
+    np.testing.assert_allclose(tracker.predict(3, shape=(50, 100, 3)).xyxy, [[95, 0, 100, 10]])
+
+
+def test_reset_forgets_the_detections():
+    tracker = BoxTracker()
+    tracker.update(detections([[0, 0, 10, 10]]), 0)
+    tracker.reset()
+    assert tracker.empty
+    assert tracker.predict(1) is None